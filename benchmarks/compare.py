@@ -0,0 +1,60 @@
+"""Compare two benchmark result files and flag regressions.
+
+Usage::
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.2
+
+Exits with status 1 if a latency metric (``*_s``/``p50``/``p99``) grew, or a
+throughput metric (``*_per_s``) shrank, by more than ``threshold``.
+"""
+
+import argparse
+import json
+import sys
+
+
+def _flatten(node, prefix=""):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, float(node)
+
+
+def _direction(path: str) -> int:
+    """+1 if bigger is worse, -1 if smaller is worse, 0 if not compared."""
+    if "_per_s" in path:
+        return -1
+    if path.endswith((".p50", ".p99")) or path.endswith("_s"):
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = dict(_flatten(json.load(f)["results"]))
+    with open(args.current) as f:
+        current = dict(_flatten(json.load(f)["results"]))
+
+    regressions = 0
+    for path, before in sorted(baseline.items()):
+        direction = _direction(path)
+        after = current.get(path)
+        if not direction or after is None or before <= 0:
+            continue
+        change = (after - before) / before
+        regressed = change * direction > args.threshold
+        regressions += regressed
+        flag = "REGRESSION" if regressed else ""
+        print(f"{path:60} {before:12.6g} -> {after:12.6g} {change:+8.1%} {flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Benchmark the SDK against a local stand-in backend.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.run --out results.json
+
+Measures per-call SDK overhead for ``generate()`` (against raw httpx calls to
+the same server), time-to-first-token and tokens/sec for ``stream()``,
+throughput at several concurrency levels, memory for long streams and the
+cost of the per-request hot path (normalization and provider resolution).
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.server import BenchServer, ServerConfig
+from src import generate, stream
+from src.config.resolve_provider import resolve_provider
+from src.normalize import normalize_request
+from src.types import GenerateRequest, Message, RuntimeConfig
+
+
+def _summary(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    n = len(samples)
+    return {
+        "n": n,
+        "mean": statistics.fmean(samples),
+        "p50": samples[n // 2],
+        "p99": samples[min(n - 1, int(n * 0.99))],
+        "min": samples[0],
+        "max": samples[-1],
+    }
+
+
+def _request(runtime: RuntimeConfig, content: str = "benchmark") -> GenerateRequest:
+    return GenerateRequest(
+        model="bench", messages=[Message(role="user", content=content)], runtime=runtime
+    )
+
+
+def _runtimes(base_url: str) -> dict[str, RuntimeConfig]:
+    return {
+        "generic-url": RuntimeConfig(type="url", endpoint=f"{base_url}/v1/generate"),
+        "ollama": RuntimeConfig(type="url", endpoint=base_url, provider="ollama"),
+    }
+
+
+def bench_generate_overhead(base_url: str, iterations: int) -> dict:
+    runtime = _runtimes(base_url)["generic-url"]
+    req = _request(runtime)
+    payload = {"model": "bench", "messages": [{"role": "user", "content": "benchmark"}]}
+
+    raw, sdk = [], []
+    with httpx.Client() as client:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            client.post(runtime.endpoint, json=payload).json()
+            raw.append(time.perf_counter() - start)
+    generate(req)  # warm the provider cache and connection pool
+    for _ in range(iterations):
+        start = time.perf_counter()
+        generate(req)
+        sdk.append(time.perf_counter() - start)
+
+    raw_s, sdk_s = _summary(raw), _summary(sdk)
+    return {
+        "raw_httpx_s": raw_s,
+        "sdk_s": sdk_s,
+        "overhead_p50_s": sdk_s["p50"] - raw_s["p50"],
+    }
+
+
+def bench_stream(base_url: str, iterations: int) -> dict:
+    results = {}
+    for name, runtime in _runtimes(base_url).items():
+        req = _request(runtime)
+        ttft, rates = [], []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            first = None
+            tokens = 0
+            for chunk in stream(req):
+                if chunk.type == "token":
+                    if first is None:
+                        first = time.perf_counter() - start
+                    tokens += 1
+            elapsed = time.perf_counter() - start
+            ttft.append(first if first is not None else elapsed)
+            rates.append(tokens / elapsed if elapsed else 0.0)
+        results[name] = {"ttft_s": _summary(ttft), "tokens_per_s": _summary(rates)}
+    return results
+
+
+def bench_concurrency(base_url: str, levels: list[int], calls: int) -> dict:
+    req = _request(_runtimes(base_url)["generic-url"])
+    results = {}
+    for level in levels:
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            start = time.perf_counter()
+            list(pool.map(lambda _: generate(req), range(calls)))
+            elapsed = time.perf_counter() - start
+        results[str(level)] = {"calls": calls, "calls_per_s": calls / elapsed}
+    return results
+
+
+def bench_long_stream_memory(base_url: str) -> dict:
+    results = {}
+    for name, runtime in _runtimes(base_url).items():
+        req = _request(runtime)
+        # Provider, transport and import caches are built outside the trace
+        for _ in stream(req):
+            pass
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            tokens = sum(1 for chunk in stream(req) if chunk.type == "token")
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        # Only what the stream itself allocated and left behind
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = after.filter_traces(ignore).compare_to(
+            before.filter_traces(ignore), "filename"
+        )
+        results[name] = {
+            "tokens": tokens,
+            "peak_bytes": peak,
+            "current_bytes": current,
+            "retained_blocks": sum(stat.count_diff for stat in diff),
+            "retained_bytes": sum(stat.size_diff for stat in diff),
+        }
+    return results
+
+
+def bench_hot_path(base_url: str, number: int) -> dict:
+    runtime = _runtimes(base_url)["generic-url"]
+    req = _request(runtime, content="x" * 1024)
+    resolve_provider(runtime, req.model)
+    return {
+        "normalize_request_s": timeit.timeit(
+            lambda: normalize_request(req), number=number
+        )
+        / number,
+        "resolve_provider_s": timeit.timeit(
+            lambda: resolve_provider(runtime, req.model), number=number
+        )
+        / number,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--token-rate", type=float, default=0.0)
+    parser.add_argument("--chunk-tokens", type=int, default=1)
+    parser.add_argument("--tokens", type=int, default=256)
+    parser.add_argument("--long-stream-tokens", type=int, default=20000)
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    args = parser.parse_args(argv)
+
+    config = ServerConfig(
+        latency_ms=args.latency_ms,
+        token_rate=args.token_rate,
+        chunk_tokens=args.chunk_tokens,
+        tokens=args.tokens,
+    )
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = {}
+    with BenchServer(config) as server:
+        results["generate_overhead"] = bench_generate_overhead(
+            server.url, args.iterations
+        )
+        results["stream"] = bench_stream(server.url, max(1, args.iterations // 10))
+        results["concurrency"] = bench_concurrency(server.url, levels, args.iterations)
+        results["hot_path"] = bench_hot_path(server.url, args.iterations * 10)
+
+    long_config = ServerConfig(
+        chunk_tokens=args.chunk_tokens, tokens=args.long_stream_tokens
+    )
+    with BenchServer(long_config) as server:
+        results["long_stream_memory"] = bench_long_stream_memory(server.url)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "httpx": httpx.__version__,
+            "server": asdict(config),
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    encoded = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""A local stand-in for model backends, used by the benchmark harness.
+
+Emulates the Generic URL endpoint (any path, newline-framed streams) and the
+Ollama endpoints (``/api/generate`` and ``/api/stream``, NDJSON streams) with a
+configurable first-byte latency, token rate and chunk size.
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class ServerConfig:
+    latency_ms: float = 0.0  # delay before the first byte of every response
+    token_rate: float = 0.0  # tokens per second while streaming; 0 = unthrottled
+    chunk_tokens: int = 1  # tokens written per network chunk
+    tokens: int = 256  # tokens per response
+    token_text: str = "tok "
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients can reuse sockets
+    disable_nagle_algorithm = True
+    config: ServerConfig
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(body or b"{}")
+        except ValueError:
+            return {}
+
+    def do_POST(self):
+        payload = self._read_json()
+        cfg = self.config
+        if cfg.latency_ms:
+            time.sleep(cfg.latency_ms / 1000)
+
+        ollama = self.path.startswith("/api/")
+        streaming = self.path.endswith("/stream") or payload.get("stream") is True
+        if streaming:
+            self._stream(ollama)
+            return
+
+        text = cfg.token_text * cfg.tokens
+        if ollama:
+            body = {"response": text, "done": True, "eval_count": cfg.tokens}
+        else:
+            body = {"output": text}
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _frame(self, ollama: bool, token: str) -> bytes:
+        if ollama:
+            doc = {"message": {"role": "assistant", "content": token}, "done": False}
+            return (json.dumps(doc) + "\n").encode("utf-8")
+        return (token + "\n").encode("utf-8")
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _stream(self, ollama: bool) -> None:
+        cfg = self.config
+        self.send_response(200)
+        self.send_header(
+            "Content-Type", "application/x-ndjson" if ollama else "text/plain"
+        )
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        interval = cfg.chunk_tokens / cfg.token_rate if cfg.token_rate else 0.0
+        sent = 0
+        while sent < cfg.tokens:
+            n = min(cfg.chunk_tokens, cfg.tokens - sent)
+            self._write_chunk(
+                b"".join(self._frame(ollama, cfg.token_text) for _ in range(n))
+            )
+            sent += n
+            if interval:
+                time.sleep(interval)
+        if ollama:
+            self._write_chunk(b'{"done": true, "eval_count": %d}\n' % cfg.tokens)
+        else:
+            self._write_chunk(b"DONE\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class BenchServer:
+    def __init__(self, config: ServerConfig, host: str = "127.0.0.1", port: int = 0):
+        handler = type("Handler", (_Handler,), {"config": config})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "BenchServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,4 +1,43 @@
-from .core.generate import generate
-from .core.stream import stream
+from importlib import import_module
+from typing import TYPE_CHECKING
 
-__all__ = ["generate", "stream"]
+# The public API is loaded on first use, so importing the package (e.g. for
+# its types, or to run local kernels) doesn't pull in the HTTP stack.
+_LAZY = {
+    "generate": ".core.generate",
+    "agenerate": ".core.generate",
+    "stream": ".core.stream",
+    "astream": ".core.stream",
+    "generate_many": ".core.batch",
+    "stream_many": ".core.batch",
+    "warm_up": ".core.warmup",
+}
+
+__all__ = [
+    "generate",
+    "stream",
+    "agenerate",
+    "astream",
+    "generate_many",
+    "stream_many",
+    "warm_up",
+]
+
+if TYPE_CHECKING:
+    from .core.generate import generate, agenerate
+    from .core.stream import stream, astream
+    from .core.batch import generate_many, stream_many
+    from .core.warmup import warm_up
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
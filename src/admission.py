@@ -0,0 +1,390 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Optional
+from .errors import AdmissionRejectedError
+from .instrumentation import get_instrumentation
+from .tokens import estimate_messages
+from .types import (
+    AdmissionConfig,
+    GenerateRequest,
+    InternalRequest,
+    RuntimeConfig,
+    StreamChunk,
+)
+
+
+@dataclass(frozen=True)
+class AdmissionStats:
+    in_flight: int
+    queued: int
+    admitted: int
+    rejected_queue_full: int
+    rejected_timeout: int
+    wait_s_total: float
+    wait_s_max: float
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: Optional[int]):
+        self.rate = rate
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_for(self, cost: float, now: float) -> float:
+        """Seconds until ``cost`` tokens are available (0 if they are now)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # A request bigger than the bucket is admitted once the bucket is full
+        cost = min(cost, self.capacity)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def take(self, cost: float) -> None:
+        self.tokens -= min(cost, self.capacity)
+
+
+class _Waiter:
+    __slots__ = ("key", "cost", "start", "granted", "future")
+
+    def __init__(self, key: tuple, cost: float, start: float, future=None):
+        self.key = key
+        self.cost = cost
+        self.start = start
+        self.granted = False
+        # Async waiters are woken through their event loop, not the condition
+        self.future = future
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return self.key < other.key
+
+
+def _wake(future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """Limits how hard one provider/endpoint is hit.
+
+    A request is admitted when a concurrency slot is free and the request-rate
+    and token-rate buckets can pay for it. Otherwise it waits in a bounded
+    queue ordered by priority (higher first), then arrival; it is rejected
+    with AdmissionRejectedError if the queue is full or it waits too long.
+    Slots are handed to waiters by whoever frees them, so neither sync nor
+    async waiters need a thread of their own.
+    """
+
+    def __init__(self, config: AdmissionConfig):
+        self.config = config
+        self._cond = threading.Condition()
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._requests = (
+            _TokenBucket(config.requests_per_s, config.request_burst)
+            if config.requests_per_s is not None
+            else None
+        )
+        self._tokens = (
+            _TokenBucket(config.tokens_per_s, config.token_burst)
+            if config.tokens_per_s is not None
+            else None
+        )
+        self._stats = {
+            "admitted": 0,
+            "rejected_queue_full": 0,
+            "rejected_timeout": 0,
+            "wait_s_total": 0.0,
+            "wait_s_max": 0.0,
+        }
+
+    def _wait_needed(self, cost: float) -> Optional[float]:
+        """0 if a request costing ``cost`` may start now, else how long to wait
+        (None: until a slot is released)."""
+        max_in_flight = self.config.max_in_flight
+        if max_in_flight is not None and self._in_flight >= max_in_flight:
+            return None
+        now = time.monotonic()
+        wait = 0.0
+        if self._requests is not None:
+            wait = max(wait, self._requests.wait_for(1, now))
+        if self._tokens is not None:
+            wait = max(wait, self._tokens.wait_for(cost, now))
+        return wait
+
+    def _grant(self, cost: float, waited: float) -> None:
+        self._in_flight += 1
+        if self._requests is not None:
+            self._requests.take(1)
+        if self._tokens is not None:
+            self._tokens.take(cost)
+        self._stats["admitted"] += 1
+        self._stats["wait_s_total"] += waited
+        self._stats["wait_s_max"] = max(self._stats["wait_s_max"], waited)
+
+    def _dispatch(self) -> Optional[float]:
+        """Admit queued waiters in order while they fit; caller holds the lock.
+
+        Returns how long the head of the queue still has to wait (None: until
+        a slot is released, 0: the queue is empty).
+        """
+        granted = False
+        wait: Optional[float] = 0.0
+        while self._queue:
+            waiter = self._queue[0]
+            wait = self._wait_needed(waiter.cost)
+            if wait != 0:
+                break
+            heapq.heappop(self._queue)
+            self._grant(waiter.cost, time.monotonic() - waiter.start)
+            waiter.granted = True
+            granted = True
+            if waiter.future is not None:
+                try:
+                    waiter.future.get_loop().call_soon_threadsafe(_wake, waiter.future)
+                except RuntimeError:
+                    # Its event loop is closed, so nobody will use the slot
+                    self._in_flight -= 1
+        if granted:
+            self._cond.notify_all()
+        return wait
+
+    def _remove(self, waiter: _Waiter) -> None:
+        self._queue.remove(waiter)
+        heapq.heapify(self._queue)
+        # The head may have changed
+        self._dispatch()
+        self._cond.notify_all()
+
+    def _expire(self, waiter: _Waiter, timeout_s: Optional[float]) -> None:
+        self._remove(waiter)
+        self._stats["rejected_timeout"] += 1
+        raise AdmissionRejectedError(
+            f"waited more than {timeout_s}s for admission", "timeout"
+        )
+
+    def _acquire(self, waiter: _Waiter, timeout_s: Optional[float]) -> None:
+        expires = waiter.start + timeout_s if timeout_s is not None else None
+        with self._cond:
+            while True:
+                wait = self._dispatch()
+                if waiter.granted:
+                    return
+                if expires is not None:
+                    left = expires - time.monotonic()
+                    if left <= 0:
+                        self._expire(waiter, timeout_s)
+                    wait = left if wait is None else min(wait, left)
+                self._cond.wait(wait)
+
+    async def _aacquire(self, waiter: _Waiter, timeout_s: Optional[float]) -> None:
+        import asyncio
+
+        expires = waiter.start + timeout_s if timeout_s is not None else None
+        while True:
+            with self._cond:
+                wait = self._dispatch()
+                if waiter.granted:
+                    return
+                if expires is not None:
+                    left = expires - time.monotonic()
+                    if left <= 0:
+                        self._expire(waiter, timeout_s)
+                    wait = left if wait is None else min(wait, left)
+            try:
+                # Shielded: a timeout only ends this wait, the future stays
+                # usable for the next one
+                await asyncio.wait_for(asyncio.shield(waiter.future), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def _enqueue(self, priority: int, cost: float, future=None) -> Optional[_Waiter]:
+        """Admit immediately (None) or return the queued waiter; caller holds the lock."""
+        if not self._queue and self._wait_needed(cost) == 0:
+            self._grant(cost, 0.0)
+            return None
+        if len(self._queue) >= self.config.max_queue:
+            self._stats["rejected_queue_full"] += 1
+            raise AdmissionRejectedError(
+                f"admission queue is full ({self.config.max_queue} waiting)",
+                "queue_full",
+            )
+        waiter = _Waiter((-priority, next(self._seq)), cost, time.monotonic(), future)
+        heapq.heappush(self._queue, waiter)
+        return waiter
+
+    def _timeout(self, deadline) -> Optional[float]:
+        timeout_ms = self.config.queue_timeout_ms
+        timeout = timeout_ms / 1000 if timeout_ms is not None else None
+        left = deadline.remaining() if deadline is not None else None
+        if left is not None and (timeout is None or left < timeout):
+            return left
+        return timeout
+
+    def acquire(self, priority: int = 0, cost: float = 0, deadline=None) -> None:
+        start = time.monotonic()
+        timeout = self._timeout(deadline)
+        with self._cond:
+            waiter = self._enqueue(priority, cost)
+        if waiter is not None:
+            self._acquire(waiter, timeout)
+            self._record_wait(start)
+
+    async def aacquire(self, priority: int = 0, cost: float = 0, deadline=None) -> None:
+        import asyncio  # not needed by sync-only callers
+
+        start = time.monotonic()
+        timeout = self._timeout(deadline)
+        with self._cond:
+            waiter = self._enqueue(
+                priority, cost, asyncio.get_running_loop().create_future()
+            )
+        if waiter is None:
+            return
+        try:
+            await self._aacquire(waiter, timeout)
+        except asyncio.CancelledError:
+            # Withdraw from the queue, or give back a slot granted meanwhile
+            with self._cond:
+                if waiter.granted:
+                    self._release_locked()
+                elif waiter in self._queue:
+                    self._remove(waiter)
+            raise
+        self._record_wait(start)
+
+    def _record_wait(self, start: float) -> None:
+        instr = get_instrumentation()
+        if instr.enabled:
+            instr.timing("queue_wait", time.monotonic() - start)
+
+    def _release_locked(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+        self._cond.notify_all()
+
+    def release(self) -> None:
+        with self._cond:
+            self._release_locked()
+
+    @contextmanager
+    def slot(self, priority: int = 0, cost: float = 0, deadline=None):
+        self.acquire(priority, cost, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, priority: int = 0, cost: float = 0, deadline=None):
+        await self.aacquire(priority, cost, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> AdmissionStats:
+        with self._cond:
+            return AdmissionStats(
+                in_flight=self._in_flight, queued=len(self._queue), **self._stats
+            )
+
+
+_controllers: dict[tuple, AdmissionController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_admission(
+    provider: Any, runtime: Optional[RuntimeConfig]
+) -> Optional[AdmissionController]:
+    """The admission controller of ``provider``'s backend, if the runtime sets one.
+
+    Controllers are shared by every runtime resolving to the same provider id
+    and endpoint with an equal AdmissionConfig; runtimes with different
+    configs get controllers of their own, so none resets another's counts.
+    """
+    config = runtime.admission if runtime is not None else None
+    if config is None:
+        return None
+    key = (provider.id, getattr(provider, "endpoint", None), config)
+    controller = _controllers.get(key)
+    if controller is None:
+        with _controllers_lock:
+            controller = _controllers.get(key)
+            if controller is None:
+                controller = _controllers[key] = AdmissionController(config)
+    return controller
+
+
+def admission_stats() -> dict:
+    """AdmissionStats of every controller, keyed by ``"provider@endpoint"``.
+
+    Further controllers of the same endpoint (other configs) get a ``#2``,
+    ``#3``... suffix in creation order.
+    """
+    with _controllers_lock:
+        controllers = list(_controllers.items())
+    stats = {}
+    for (pid, endpoint, _), controller in controllers:
+        name = label = f"{pid}@{endpoint}"
+        n = 1
+        while label in stats:
+            n += 1
+            label = f"{name}#{n}"
+        stats[label] = controller.stats()
+    return stats
+
+
+def reset_admission() -> None:
+    with _controllers_lock:
+        _controllers.clear()
+
+
+def request_cost(controller: AdmissionController, req: InternalRequest) -> float:
+    """Tokens a request is charged against the token-rate bucket."""
+    if controller.config.tokens_per_s is None:
+        return 0
+    max_tokens = req.options.max_tokens if req.options is not None else None
+    return estimate_messages(req.messages) + (max_tokens or 0)
+
+
+@contextmanager
+def admitted(provider: Any, request: GenerateRequest, internal: InternalRequest):
+    """Hold an admission slot for ``provider`` (a no-op without admission config)."""
+    controller = get_admission(provider, request.runtime)
+    if controller is None:
+        yield
+        return
+    with controller.slot(
+        request.priority, request_cost(controller, internal), internal.deadline
+    ):
+        yield
+
+
+@asynccontextmanager
+async def aadmitted(provider: Any, request: GenerateRequest, internal: InternalRequest):
+    controller = get_admission(provider, request.runtime)
+    if controller is None:
+        yield
+        return
+    async with controller.aslot(
+        request.priority, request_cost(controller, internal), internal.deadline
+    ):
+        yield
+
+
+def admitted_stream(
+    provider: Any,
+    request: GenerateRequest,
+    internal: InternalRequest,
+    open_stream: Callable[[], Iterable[StreamChunk]],
+) -> Iterator[StreamChunk]:
+    """Open a stream once admitted, holding the slot until the stream ends."""
+    with admitted(provider, request, internal):
+        yield from open_stream()
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Optional
+from .types import GenerateRequest, GenerateResult, InternalRequest, RuntimeConfig
+
+if TYPE_CHECKING:
+    import sqlite3
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    disk_hits: int = 0
+
+
+def request_key(req: InternalRequest, runtime: Optional[RuntimeConfig]) -> str:
+    """Stable hash of a normalized request and the identity of its runtime.
+
+    Runtime headers are deliberately left out: they usually carry credentials,
+    not anything that changes the model's answer.
+    """
+    doc = {
+        "model": req.model,
+        "messages": [[m.role, m.content] for m in req.messages],
+        "tools": req.tools,
+        "options": asdict(req.options) if req.options is not None else None,
+        "runtime": (
+            [runtime.type, runtime.provider, runtime.endpoint, runtime.endpoints]
+            if runtime is not None
+            else None
+        ),
+    }
+    encoded = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(req: InternalRequest) -> bool:
+    # Only greedy decoding is deterministic; anything sampled must not be replayed
+    return req.options is not None and req.options.temperature == 0
+
+
+class ResponseCache:
+    """Two-tier cache of GenerateResults: an in-memory LRU and optional SQLite file.
+
+    The disk tier survives restarts and can be shared by worker processes
+    pointing at the same ``path``. Entries older than ``ttl_s`` are ignored.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: Optional[float] = None,
+        path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.path = path
+        self._entries: OrderedDict[str, tuple[Optional[float], GenerateResult]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        # Disk I/O is serialized separately, so memory hits never wait on it
+        self._db_lock = threading.Lock()
+        self._stats = {name: 0 for name in CacheStats.__dataclass_fields__}
+        self._db: Optional["sqlite3.Connection"] = None
+        if path is not None:
+            # Only the disk tier needs sqlite3
+            import sqlite3
+
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, expires REAL, output TEXT, tokens INTEGER, metadata TEXT)"
+            )
+            self._db.commit()
+
+    def _expiry(self) -> Optional[float]:
+        return time.time() + self.ttl_s if self.ttl_s is not None else None
+
+    def get(self, key: str) -> Optional[GenerateResult]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, result = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return result
+                del self._entries[key]
+                self._stats["expirations"] += 1
+
+        row = self._disk_get(key)
+        with self._lock:
+            if row is not None:
+                expires, result = row
+                if expires is None or expires > now:
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    # Promoted with the expiry it has on disk, not a fresh TTL
+                    self._remember(key, result, expires)
+                    return result
+                self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, result: GenerateResult) -> None:
+        expires = self._expiry()
+        with self._lock:
+            self._remember(key, result, expires)
+        self._disk_set(key, result, expires)
+
+    def _remember(
+        self, key: str, result: GenerateResult, expires: Optional[float]
+    ) -> None:
+        self._entries[key] = (expires, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_get(self, key: str) -> Optional[tuple[Optional[float], GenerateResult]]:
+        """The disk entry of ``key`` and its expiry, expired or not."""
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT expires, output, tokens, metadata FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        expires, output, tokens, metadata = row
+        return expires, GenerateResult(
+            output=output,
+            tokens=tokens,
+            metadata=json.loads(metadata) if metadata is not None else None,
+        )
+
+    def _disk_set(
+        self, key: str, result: GenerateResult, expires: Optional[float]
+    ) -> None:
+        if self._db is None:
+            return
+        try:
+            metadata = (
+                json.dumps(result.metadata) if result.metadata is not None else None
+            )
+        except (TypeError, ValueError):
+            # Not representable on disk; the memory tier still has it
+            return
+        with self._db_lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, expires, result.output, result.tokens, metadata),
+            )
+            self._db.commit()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**self._stats)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def configure_cache(cache: Optional[ResponseCache]) -> None:
+    """Install the cache used by requests with ``cache=True`` (None resets it)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def get_cache() -> ResponseCache:
+    global _cache
+    cache = _cache
+    if cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+            cache = _cache
+    return cache
+
+
+def cache_for(
+    request: GenerateRequest, internal: InternalRequest
+) -> Optional[ResponseCache]:
+    """The cache to use for this request, or None if it must not be cached."""
+    if not request.cache or not is_cacheable(internal):
+        return None
+    return get_cache()
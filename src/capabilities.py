@@ -1,11 +1,155 @@
-from .types import Provider, InternalRequest
+import threading
+import time
+import weakref
+from typing import Optional
+from .types import Capabilities, Provider, InternalRequest
 from .errors import UnsupportedCapabilityError
 
+# Providers that can ask their backend about a model implement
+# ``discover_capabilities(model) -> Capabilities``. Its results are cached per
+# provider instance and model: fresh for _ttl_s, then served stale while a
+# single background refresh runs. The first probe of a model runs on a
+# background thread too: concurrent first requests share it, and each waits
+# at most until its own deadline. A failed probe (unreachable backend, or a
+# reply it can't make sense of) falls back to the static ``capabilities()``;
+# failed probes are retried after _failure_ttl_s.
+_ttl_s = 300.0
+_failure_ttl_s = 30.0
+
+
+class _Entry:
+    __slots__ = ("caps", "expires", "refreshing")
+
+    def __init__(self, caps: Capabilities, expires: float):
+        self.caps = caps
+        self.expires = expires
+        self.refreshing = False
+
+
+class _Probe:
+    __slots__ = ("done", "entry")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry: Optional[_Entry] = None
+
+
+_cache: "weakref.WeakKeyDictionary[Provider, dict[str, _Entry]]" = (
+    weakref.WeakKeyDictionary()
+)
+_probes: "weakref.WeakKeyDictionary[Provider, dict[str, _Probe]]" = (
+    weakref.WeakKeyDictionary()
+)
+_lock = threading.Lock()
+
+
+def configure_capability_cache(
+    ttl_s: Optional[float] = None, failure_ttl_s: Optional[float] = None
+) -> None:
+    global _ttl_s, _failure_ttl_s
+    if ttl_s is not None:
+        _ttl_s = ttl_s
+    if failure_ttl_s is not None:
+        _failure_ttl_s = failure_ttl_s
+
+
+def reset_capabilities() -> None:
+    global _ttl_s, _failure_ttl_s
+    with _lock:
+        _cache.clear()
+        _probes.clear()
+    _ttl_s, _failure_ttl_s = 300.0, 30.0
+
+
+def _discover(
+    provider: Provider, model: str, fallback: Optional[Capabilities] = None
+) -> _Entry:
+    try:
+        caps = provider.discover_capabilities(model)
+        ttl = _ttl_s
+    except Exception:
+        # Unreachable, or a reply that isn't what we expect (not JSON, odd
+        # fields). A refresh keeps what it knew; a first probe uses the
+        # static values.
+        caps = fallback if fallback is not None else provider.capabilities()
+        ttl = _failure_ttl_s
+    return _Entry(caps, time.monotonic() + ttl)
+
+
+def _refresh(provider: Provider, model: str, stale: _Entry) -> None:
+    entry = _discover(provider, model, stale.caps)
+    with _lock:
+        _cache.setdefault(provider, {})[model] = entry
+
+
+def _first_probe(provider: Provider, model: str, probe: _Probe) -> None:
+    try:
+        entry = _discover(provider, model)
+    except Exception:  # provider.capabilities() itself failed
+        entry = None
+    with _lock:
+        if entry is not None:
+            _cache.setdefault(provider, {})[model] = entry
+        _probes.get(provider, {}).pop(model, None)
+    probe.entry = entry
+    probe.done.set()
+
+
+def _await_probe(provider: Provider, model: str, deadline) -> Capabilities:
+    with _lock:
+        entry = _cache.get(provider, {}).get(model)
+        if entry is not None:
+            return entry.caps
+        in_flight = _probes.setdefault(provider, {})
+        probe = in_flight.get(model)
+        start = probe is None
+        if start:
+            probe = in_flight[model] = _Probe()
+    if start:
+        threading.Thread(
+            target=_first_probe,
+            args=(provider, model, probe),
+            name="capability-probe",
+            daemon=True,
+        ).start()
+    # Deadline.remaining() raises TimeoutError once the call's time is up;
+    # the probe goes on and fills the cache for later requests
+    while not probe.done.wait(deadline.remaining() if deadline is not None else None):
+        pass
+    if probe.entry is None:
+        return provider.capabilities()
+    return probe.entry.caps
+
+
+def get_capabilities(
+    provider: Provider, model: Optional[str], deadline=None
+) -> Capabilities:
+    """The capabilities of ``provider`` for ``model``, discovered if it can.
+
+    A first probe is waited for until ``deadline`` (a src.deadline.Deadline)
+    at most, then TimeoutError is raised.
+    """
+    if model is None or not hasattr(provider, "discover_capabilities"):
+        return provider.capabilities()
+    per_model = _cache.get(provider)
+    entry = per_model.get(model) if per_model is not None else None
+    if entry is None:
+        return _await_probe(provider, model, deadline)
+    if time.monotonic() >= entry.expires and not entry.refreshing:
+        with _lock:
+            start = not entry.refreshing
+            entry.refreshing = True
+        if start:
+            threading.Thread(
+                target=_refresh, args=(provider, model, entry), daemon=True
+            ).start()
+    return entry.caps
+
 
 def ensure_capabilities(
     provider: Provider, req: InternalRequest, needs_streaming: bool = False
-) -> None:
-    caps = provider.capabilities()
+) -> Capabilities:
+    caps = get_capabilities(provider, req.model, req.deadline)
     if needs_streaming and not caps.streaming:
         raise UnsupportedCapabilityError(
             f"Provider '{provider.id}' does not support streaming", provider.id
@@ -21,3 +165,4 @@ def ensure_capabilities(
                 f"Requested max_tokens ({req.options.max_tokens}) exceeds provider '{provider.id}' max of {caps.max_tokens}",
                 provider.id,
             )
+    return caps
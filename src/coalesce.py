@@ -0,0 +1,142 @@
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, TypeVar
+from .errors import TimeoutError
+from .types import StreamChunk
+
+if TYPE_CHECKING:
+    from .deadline import Deadline
+
+T = TypeVar("T")
+
+
+class _StreamFlight:
+    """One upstream stream shared by any number of subscribers.
+
+    Chunks are appended to a buffer; a subscriber that catches up with the
+    buffer pulls the next chunk from upstream itself, so the stream advances at
+    the pace of its fastest subscriber and late joiners replay the prefix.
+    """
+
+    def __init__(self, source: Iterable[StreamChunk], on_finish: Callable[[], None]):
+        self._source = iter(source)
+        self._on_finish = on_finish
+        self._buffer: list[StreamChunk] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._pull_lock = threading.Lock()
+        self._subscribers = 0
+
+    def _finish(self) -> None:
+        self._done = True
+        self._on_finish()
+
+    def _close_source(self) -> None:
+        close = getattr(self._source, "close", None)
+        if close is not None:
+            close()
+
+    def subscribe(self) -> Iterator[StreamChunk]:
+        with self._pull_lock:
+            self._subscribers += 1
+        i = 0
+        try:
+            while True:
+                if i < len(self._buffer):
+                    yield self._buffer[i]
+                    i += 1
+                    continue
+                if self._done:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                with self._pull_lock:
+                    if i < len(self._buffer) or self._done:
+                        continue
+                    try:
+                        chunk = next(self._source)
+                    except StopIteration:
+                        self._finish()
+                    except BaseException as e:
+                        self._error = e
+                        self._finish()
+                    else:
+                        self._buffer.append(chunk)
+        finally:
+            with self._pull_lock:
+                self._subscribers -= 1
+                abandoned = self._subscribers == 0 and not self._done
+                if abandoned:
+                    # Last subscriber left early: stop the upstream generation
+                    self._finish()
+                    self._close_source()
+
+
+class SingleFlight:
+    """Coalesces identical in-flight calls onto a single upstream call."""
+
+    def __init__(self):
+        self._calls: dict[str, Future] = {}
+        self._streams: dict[str, _StreamFlight] = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self, key: str, fn: Callable[[], T], deadline: Optional["Deadline"] = None
+    ) -> T:
+        """Run ``fn``, or wait for the identical call already running.
+
+        A follower waits no longer than its own ``deadline`` allows, even if
+        the leader's call runs longer.
+        """
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+        if not leader:
+            timeout = deadline.remaining() if deadline is not None else None
+            try:
+                return fut.result(timeout)
+            except FutureTimeoutError:
+                raise TimeoutError(
+                    f"deadline of {deadline.timeout_s}s exceeded "
+                    "waiting for a coalesced call"
+                ) from None
+
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stream(
+        self, key: str, fn: Callable[[], Iterable[StreamChunk]]
+    ) -> Iterator[StreamChunk]:
+        with self._lock:
+            flight = self._streams.get(key)
+            if flight is None:
+
+                def forget() -> None:
+                    with self._lock:
+                        if self._streams.get(key) is flight:
+                            del self._streams[key]
+
+                flight = self._streams[key] = _StreamFlight(fn(), forget)
+        return flight.subscribe()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._streams)
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _single_flight
@@ -0,0 +1,136 @@
+import threading
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    TypeVar,
+    Union,
+    overload,
+)
+from .types import Message
+
+T = TypeVar("T")
+
+
+class _Log:
+    # Append-only storage shared by every Conversation snapshot built from it.
+    # A prefix of the list never changes, so facts about it (``validated``:
+    # how many leading messages passed validation) hold for all snapshots.
+    # ``memos`` holds per-message values computed from the log's prefix
+    # (encoded JSON, token estimates), by name.
+    __slots__ = ("messages", "validated", "memos", "lock")
+
+    def __init__(self, messages: List[Message]):
+        self.messages = messages
+        self.validated = 0
+        self.memos: dict[str, list] = {}
+        self.lock = threading.Lock()
+
+
+class Conversation(Sequence[Message]):
+    """An immutable, cheaply extended message history.
+
+    ``append`` returns a new Conversation and leaves this one unchanged, but
+    both share storage: extending the latest snapshot is O(1). Appending to
+    an older snapshot (branching) copies its prefix once. Validation results
+    are remembered per prefix, so each message is validated only once however
+    many requests it is sent with. Pass a Conversation as
+    ``GenerateRequest.messages``; it is handed to providers without copying.
+    """
+
+    __slots__ = ("_log", "_length")
+
+    def __init__(self, messages: Iterable[Message] = ()):
+        self._log = _Log(list(messages))
+        self._length = len(self._log.messages)
+
+    @classmethod
+    def _view(cls, log: _Log, length: int) -> "Conversation":
+        conv = cls.__new__(cls)
+        conv._log = log
+        conv._length = length
+        return conv
+
+    def append(self, message: Message) -> "Conversation":
+        log = self._log
+        with log.lock:
+            if len(log.messages) == self._length:
+                log.messages.append(message)
+                return self._view(log, self._length + 1)
+        # Someone already extended this snapshot differently: branch off
+        branch = _Log(log.messages[: self._length])
+        branch.validated = min(log.validated, self._length)
+        branch.memos = {k: v[: self._length] for k, v in log.memos.items()}
+        branch.messages.append(message)
+        return self._view(branch, self._length + 1)
+
+    def extend(self, messages: Iterable[Message]) -> "Conversation":
+        conv = self
+        for message in messages:
+            conv = conv.append(message)
+        return conv
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> Message: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Message]: ...
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return self._log.messages[: self._length][index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Conversation index out of range")
+        return self._log.messages[index]
+
+    def __iter__(self) -> Iterator[Message]:
+        messages = self._log.messages
+        for i in range(self._length):
+            yield messages[i]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Conversation):
+            if other._log is self._log:
+                return other._length == self._length
+            return len(other) == self._length and list(other) == list(self)
+        if isinstance(other, list):
+            return other == list(self)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Conversation({list(self)!r})"
+
+    def unvalidated(self) -> List[Message]:
+        """The messages of this snapshot not yet known to be valid."""
+        start = min(self._log.validated, self._length)
+        return self._log.messages[start : self._length]
+
+    def mark_validated(self) -> None:
+        log = self._log
+        with log.lock:
+            log.validated = max(log.validated, self._length)
+
+    def memo(self, name: str, fn: Callable[[Message], T]) -> List[T]:
+        """``fn`` of each message of this snapshot, computed once per message.
+
+        Values are kept with the shared storage, so every later snapshot
+        (each turn of a chat) only computes them for its new messages, and
+        they go away with the conversation.
+        """
+        log = self._log
+        values = log.memos.get(name)
+        if values is None or len(values) < self._length:
+            with log.lock:
+                values = log.memos.setdefault(name, [])
+                for i in range(len(values), self._length):
+                    values.append(fn(log.messages[i]))
+        return values[: self._length]
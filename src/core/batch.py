@@ -0,0 +1,174 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, Optional, Tuple
+from ..types import BatchResult, GenerateRequest, StreamChunk
+from .generate import generate
+from .stream import stream
+
+_END = object()
+
+
+# Batch items go through the same pipeline as single calls: caching,
+# coalescing, capabilities, admission, deadlines, stop sequences, delivery,
+# read-ahead and instrumentation all apply per item.
+def _generate_one(index: int, request: GenerateRequest) -> BatchResult:
+    try:
+        return BatchResult(index=index, result=generate(request))
+    except Exception as e:
+        return BatchResult(index=index, error=e)
+
+
+def generate_many(
+    requests: Iterable[GenerateRequest],
+    concurrency: int = 8,
+    ordered: bool = True,
+) -> Iterator[BatchResult]:
+    """Run many generate requests with at most ``concurrency`` in flight.
+
+    Requests are pulled from ``requests`` lazily, so the input may be an
+    arbitrarily long generator. Results are yielded in input order when
+    ``ordered`` is true, otherwise as they complete. A failing request yields a
+    ``BatchResult`` carrying the exception instead of aborting the batch.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+
+    inputs = enumerate(requests)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+
+        def submit_next() -> Optional[Future]:
+            item = next(inputs, None)
+            if item is None:
+                return None
+            return pool.submit(_generate_one, item[0], item[1])
+
+        if ordered:
+            # Keep a bounded window of submitted futures; results finished out
+            # of order wait in the window until everything before them is out.
+            window: deque = deque()
+            exhausted = False
+            while True:
+                while not exhausted and len(window) < concurrency * 2:
+                    fut = submit_next()
+                    if fut is None:
+                        exhausted = True
+                    else:
+                        window.append(fut)
+                if not window:
+                    return
+                yield window.popleft().result()
+        else:
+            pending: set = set()
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < concurrency:
+                    fut = submit_next()
+                    if fut is None:
+                        exhausted = True
+                    else:
+                        pending.add(fut)
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield fut.result()
+
+
+def _stream_one(
+    index: int,
+    request: GenerateRequest,
+    out: queue.Queue,
+    cancelled: threading.Event,
+) -> None:
+    def put(item) -> bool:
+        while not cancelled.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        it = iter(stream(request))
+        try:
+            for chunk in it:
+                if not put((index, chunk)):
+                    return
+        finally:
+            it.close()
+    except Exception as e:
+        put((index, StreamChunk(type="error", value=e)))
+    finally:
+        put((index, _END))
+
+
+def stream_many(
+    requests: Iterable[GenerateRequest],
+    concurrency: int = 8,
+    ordered: bool = False,
+    buffer_size: int = 256,
+) -> Iterator[Tuple[int, StreamChunk]]:
+    """Run many stream requests with at most ``concurrency`` open at once.
+
+    Yields ``(index, chunk)`` pairs. With ``ordered`` false chunks from
+    different streams interleave as they arrive; with ``ordered`` true each
+    stream is yielded contiguously in input order, buffering the chunks of
+    streams that are ahead of the current one. A failing stream yields a
+    ``StreamChunk(type="error")`` carrying the exception.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+
+    inputs = enumerate(requests)
+    out: queue.Queue = queue.Queue(maxsize=buffer_size)
+    cancelled = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        active = 0
+        exhausted = False
+        next_index = 0  # next stream to emit in ordered mode
+        buffered: dict[int, list] = {}
+        finished: set = set()
+        while True:
+            while not exhausted and active < concurrency:
+                item = next(inputs, None)
+                if item is None:
+                    exhausted = True
+                    break
+                if ordered:
+                    buffered[item[0]] = []
+                pool.submit(_stream_one, item[0], item[1], out, cancelled)
+                active += 1
+            if active == 0:
+                return
+
+            index, chunk = out.get()
+            if chunk is not _END:
+                if not ordered or index == next_index:
+                    yield index, chunk
+                else:
+                    buffered[index].append(chunk)
+                continue
+
+            active -= 1
+            if not ordered:
+                continue
+            finished.add(index)
+            # The current stream ended: flush the streams queued behind it
+            # that have already completed, then move on to the next one.
+            while next_index in finished:
+                finished.discard(next_index)
+                for pending_chunk in buffered.pop(next_index):
+                    yield next_index, pending_chunk
+                next_index += 1
+            if next_index in buffered:
+                pending_chunks = buffered[next_index]
+                buffered[next_index] = []
+                for pending_chunk in pending_chunks:
+                    yield next_index, pending_chunk
+    finally:
+        cancelled.set()
+        pool.shutdown(wait=True)
@@ -1,15 +1,92 @@
+import time
 from ..types import GenerateRequest, GenerateResult
 from ..normalize import normalize_request
 import src.config.resolve_provider as resolve_provider_module
 from ..capabilities import ensure_capabilities
+from ..tokens import fit_context
+from ..admission import aadmitted, admitted
+from ..stop import apply_stop
+from ..cache import cache_for, request_key
+from ..coalesce import get_single_flight
+from ..instrumentation import get_instrumentation
+from ..providers.threaded import as_async_provider
 
 
 def generate(request: GenerateRequest) -> GenerateResult:
-    internal = normalize_request(request)
+    instr = get_instrumentation()
+    start = time.perf_counter()
 
-    provider = resolve_provider_module.resolve_provider(request.runtime, request.model)
+    with instr.span("validate"):
+        internal = normalize_request(request)
 
-    ensure_capabilities(provider, internal, needs_streaming=False)
+    cache = cache_for(request, internal)
+    key = (
+        request_key(internal, request.runtime)
+        if cache is not None or request.coalesce
+        else None
+    )
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
-    result = provider.generate(internal)
+    with instr.span("resolve"):
+        provider = resolve_provider_module.resolve_provider(
+            request.runtime, request.model
+        )
+
+    with instr.span("capabilities", provider.id):
+        caps = ensure_capabilities(provider, internal, needs_streaming=False)
+        internal = fit_context(internal, request.trim, caps.context_window)
+
+    stops = internal.options.stop if internal.options is not None else None
+
+    def call() -> GenerateResult:
+        with admitted(provider, request, internal):
+            return apply_stop(provider.generate(internal), stops)
+
+    # Coalesced followers wait on the leader and don't take admission slots
+    if request.coalesce:
+        result = get_single_flight().do(key, call, internal.deadline)
+    else:
+        result = call()
+    if cache is not None:
+        cache.set(key, result)
+    if instr.enabled:
+        instr.timing("total", time.perf_counter() - start, provider.id)
+    return result
+
+
+async def agenerate(request: GenerateRequest) -> GenerateResult:
+    instr = get_instrumentation()
+    start = time.perf_counter()
+
+    with instr.span("validate"):
+        internal = normalize_request(request)
+
+    cache = cache_for(request, internal)
+    key = request_key(internal, request.runtime) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    with instr.span("resolve"):
+        provider = resolve_provider_module.resolve_provider(
+            request.runtime, request.model
+        )
+
+    with instr.span("capabilities", provider.id):
+        caps = ensure_capabilities(provider, internal, needs_streaming=False)
+        internal = fit_context(internal, request.trim, caps.context_window)
+
+    stops = internal.options.stop if internal.options is not None else None
+    # Sync-only providers are offloaded to a worker thread
+    async with aadmitted(provider, request, internal):
+        result = await as_async_provider(provider).agenerate(internal)
+    result = apply_stop(result, stops)
+    if cache is not None:
+        cache.set(key, result)
+    if instr.enabled:
+        instr.timing("total", time.perf_counter() - start, provider.id)
     return result
@@ -1,17 +1,111 @@
-from typing import Iterable
+import time
+from typing import AsyncIterator, Iterable
 from ..types import GenerateRequest, StreamChunk
 from ..normalize import normalize_request
 import src.config.resolve_provider as resolve_provider_module
 from ..capabilities import ensure_capabilities
+from ..tokens import fit_context
+from ..admission import aadmitted, admitted_stream
+from ..providers.threaded import as_async_provider
+from ..cache import request_key
+from ..coalesce import get_single_flight
+from ..deadline import awith_deadline, with_deadline
+from ..stop import astop_at, stop_at
+from ..delivery import acoalesce_tokens, coalesce_tokens
+from ..readahead import aread_ahead, read_ahead
+from ..instrumentation import (
+    ainstrument_stream,
+    get_instrumentation,
+    instrument_stream,
+)
 
 
 def stream(request: GenerateRequest) -> Iterable[StreamChunk]:
-    internal = normalize_request(request)
+    instr = get_instrumentation()
+    start = time.perf_counter()
 
-    provider = resolve_provider_module.resolve_provider(request.runtime, request.model)
+    with instr.span("validate"):
+        internal = normalize_request(request)
 
-    ensure_capabilities(provider, internal, needs_streaming=True)
+    with instr.span("resolve"):
+        provider = resolve_provider_module.resolve_provider(
+            request.runtime, request.model
+        )
+
+    with instr.span("capabilities", provider.id):
+        caps = ensure_capabilities(provider, internal, needs_streaming=True)
+        internal = fit_context(internal, request.trim, caps.context_window)
 
     # Provider.stream returns an iterable/generator of StreamChunk
-    for chunk in provider.stream(internal):
-        yield chunk
+    def open_stream() -> Iterable[StreamChunk]:
+        # The admission slot is held until the stream ends or is closed
+        return admitted_stream(
+            provider, request, internal, lambda: provider.stream(internal)
+        )
+
+    if request.coalesce:
+        chunks = get_single_flight().stream(
+            request_key(internal, request.runtime), open_stream
+        )
+    else:
+        chunks = open_stream()
+    if internal.deadline is not None:
+        chunks = with_deadline(chunks, internal.deadline)
+    stops = internal.options.stop if internal.options is not None else None
+    if stops:
+        chunks = stop_at(chunks, stops)
+    if request.delivery is not None and not getattr(provider, "merges_tokens", False):
+        chunks = coalesce_tokens(chunks, request.delivery)
+    if request.read_ahead is not None:
+        chunks = read_ahead(chunks, request.read_ahead)
+    if instr.enabled:
+        chunks = instrument_stream(chunks, instr, provider.id, start)
+    it = iter(chunks)
+    try:
+        for chunk in it:
+            yield chunk
+    finally:
+        # A caller leaving the loop early closes the upstream response now,
+        # not whenever the abandoned generators are collected
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
+
+
+async def astream(request: GenerateRequest) -> AsyncIterator[StreamChunk]:
+    instr = get_instrumentation()
+    start = time.perf_counter()
+
+    with instr.span("validate"):
+        internal = normalize_request(request)
+
+    with instr.span("resolve"):
+        provider = resolve_provider_module.resolve_provider(
+            request.runtime, request.model
+        )
+
+    with instr.span("capabilities", provider.id):
+        caps = ensure_capabilities(provider, internal, needs_streaming=True)
+        internal = fit_context(internal, request.trim, caps.context_window)
+
+    # Sync-only providers are offloaded to a worker thread chunk by chunk
+    chunks = as_async_provider(provider).astream(internal)
+    if internal.deadline is not None:
+        chunks = awith_deadline(chunks, internal.deadline)
+    stops = internal.options.stop if internal.options is not None else None
+    if stops:
+        chunks = astop_at(chunks, stops)
+    if request.delivery is not None and not getattr(provider, "merges_tokens", False):
+        chunks = acoalesce_tokens(chunks, request.delivery)
+    if request.read_ahead is not None:
+        chunks = aread_ahead(chunks, request.read_ahead)
+    if instr.enabled:
+        chunks = ainstrument_stream(chunks, instr, provider.id, start)
+    async with aadmitted(provider, request, internal):
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
@@ -0,0 +1,24 @@
+from typing import Sequence
+from ..types import RuntimeConfig
+from ..capabilities import get_capabilities
+import src.config.resolve_provider as resolve_provider_module
+
+
+def warm_up(
+    runtime: RuntimeConfig, models: Sequence[str] = (), connections: int = 1
+) -> dict:
+    """Prepare a runtime for traffic: open connections and preload ``models``.
+
+    Meant for deploy time, so that the first user request doesn't pay for
+    connection setup or a cold model load. Returns the seconds each model took
+    to load (empty for providers without model loading).
+    """
+    provider = resolve_provider_module.resolve_provider(
+        runtime, models[0] if models else None
+    )
+    warm = getattr(provider, "warm_up", None)
+    loaded = warm(models, connections) if warm is not None else {}
+    # Prime the capability cache so first requests don't wait on a probe
+    for model in models:
+        get_capabilities(provider, model)
+    return loaded
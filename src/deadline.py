@@ -0,0 +1,110 @@
+import time
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Optional
+from .errors import TimeoutError
+from .types import GenerateRequest, StreamChunk
+
+
+class Deadline:
+    """End-to-end time budget of one call, shared by every phase and attempt.
+
+    ``timeout_s`` bounds the whole call; ``connect_timeout_s`` and
+    ``idle_timeout_s`` additionally bound establishing a connection and the
+    wait for each next chunk of a response. Any of them may be None (unbounded).
+    """
+
+    def __init__(
+        self,
+        timeout_s: Optional[float] = None,
+        connect_timeout_s: Optional[float] = None,
+        idle_timeout_s: Optional[float] = None,
+    ):
+        self.timeout_s = timeout_s
+        self.connect_timeout_s = connect_timeout_s
+        self.idle_timeout_s = idle_timeout_s
+        self.expires_at = (
+            time.monotonic() + timeout_s if timeout_s is not None else None
+        )
+
+    @classmethod
+    def for_request(cls, request: GenerateRequest) -> Optional["Deadline"]:
+        runtime = request.runtime
+        timeout_ms = request.timeout_ms
+        if timeout_ms is None and runtime is not None:
+            timeout_ms = runtime.timeout_ms
+        connect_ms = runtime.connect_timeout_ms if runtime is not None else None
+        idle_ms = runtime.idle_timeout_ms if runtime is not None else None
+        if timeout_ms is None and connect_ms is None and idle_ms is None:
+            return None
+        return cls(
+            timeout_s=timeout_ms / 1000 if timeout_ms is not None else None,
+            connect_timeout_s=connect_ms / 1000 if connect_ms is not None else None,
+            idle_timeout_s=idle_ms / 1000 if idle_ms is not None else None,
+        )
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None if unbounded. Raises TimeoutError once expired."""
+        if self.expires_at is None:
+            return None
+        left = self.expires_at - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"deadline of {self.timeout_s}s exceeded")
+        return left
+
+    def check(self) -> None:
+        self.remaining()
+
+    def _bounded(self, phase: Optional[float], left: Optional[float]):
+        if phase is None:
+            return left
+        if left is None:
+            return phase
+        return min(phase, left)
+
+    def phase_timeouts(self) -> dict:
+        """Per-phase timeouts (connect, read, write, pool) for the next request."""
+        left = self.remaining()
+        return {
+            "connect": self._bounded(self.connect_timeout_s, left),
+            "read": self._bounded(self.idle_timeout_s, left),
+            "write": left,
+            "pool": left,
+        }
+
+
+def with_deadline(
+    chunks: Iterable[StreamChunk], deadline: Deadline
+) -> Iterator[StreamChunk]:
+    """Re-yield ``chunks``, failing with TimeoutError once ``deadline`` passes."""
+    it = iter(chunks)
+    try:
+        for chunk in it:
+            deadline.check()
+            yield chunk
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
+
+
+async def awith_deadline(
+    chunks: AsyncIterable[StreamChunk], deadline: Deadline
+) -> AsyncIterator[StreamChunk]:
+    """Async ``with_deadline``; the wait for each chunk is cut off at the deadline too."""
+    import asyncio  # not needed by sync-only callers
+
+    it = chunks.__aiter__()
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(it.__anext__(), deadline.remaining())
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"deadline of {deadline.timeout_s}s exceeded"
+                ) from None
+            yield chunk
+    finally:
+        aclose = getattr(it, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,279 @@
+import queue
+import time
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
+from .readahead import BackgroundReader
+from .types import DeliveryConfig, StreamChunk
+
+F = TypeVar("F")
+
+# What a stream item stands for: token text (the only thing merged), any
+# other chunk, or None for an item carrying nothing
+Part = Union[str, StreamChunk, None]
+
+
+class _Coalescer:
+    """Accumulates token text and decides when the pending delta is due.
+
+    Only token text is merged; every other chunk flushes the pending text
+    first and is then delivered unchanged, so the concatenated output and the
+    order of non-token chunks are exactly those of per-token delivery.
+    """
+
+    def __init__(self, config: DeliveryConfig):
+        self.max_bytes = config.max_bytes
+        self.max_tokens = config.max_tokens
+        self.max_delay_s = (
+            config.max_delay_ms / 1000 if config.max_delay_ms is not None else None
+        )
+        self.parts: List[str] = []
+        self.nbytes = 0
+        self.started = 0.0
+
+    def add(self, text: str) -> bool:
+        """Buffer ``text``; True if the pending delta should be flushed now."""
+        if not self.parts and self.max_delay_s is not None:
+            self.started = time.monotonic()
+        self.parts.append(text)
+        self.nbytes += len(text) if text.isascii() else len(text.encode("utf-8"))
+        return (
+            (self.max_bytes is not None and self.nbytes >= self.max_bytes)
+            or (self.max_tokens is not None and len(self.parts) >= self.max_tokens)
+            or (
+                self.max_delay_s is not None
+                and time.monotonic() - self.started >= self.max_delay_s
+            )
+        )
+
+    def due_in(self) -> Optional[float]:
+        """Seconds until pending text must go out by max_delay_ms (None: never)."""
+        if not self.parts or self.max_delay_s is None:
+            return None
+        return max(0.0, self.started + self.max_delay_s - time.monotonic())
+
+    def flush(self) -> Optional[StreamChunk]:
+        if not self.parts:
+            return None
+        chunk = StreamChunk(type="token", value="".join(self.parts))
+        self.parts = []
+        self.nbytes = 0
+        return chunk
+
+
+def _close(it) -> None:
+    close = getattr(it, "close", None)
+    if close is not None:
+        close()
+
+
+_DUE = object()
+
+
+def _items(it: Iterator[F], pending: _Coalescer) -> Iterator[Union[F, object]]:
+    """``it``, plus a ``_DUE`` marker whenever pending text times out.
+
+    Without max_delay_ms this is ``it`` itself. With it, ``it`` is read on a
+    background thread so the wait for the next item can time out.
+    """
+    if pending.max_delay_s is None:
+        yield from it
+        return
+    reader = BackgroundReader(it, 64, "stream-delivery")
+    try:
+        while True:
+            try:
+                item = reader.get(pending.due_in())
+            except queue.Empty:
+                yield _DUE
+                continue
+            if item is BackgroundReader.END:
+                return
+            yield item
+    finally:
+        reader.close()
+
+
+def merge_tokens(
+    items: Iterable[F],
+    parse: Callable[[F], Part],
+    config: Optional[DeliveryConfig],
+) -> Iterator[StreamChunk]:
+    """The chunks of ``items``, with consecutive token texts merged by ``config``.
+
+    ``parse`` tells what each item stands for. Providers call this from their
+    frame loop, so merged tokens never become chunks of their own; without a
+    config every token text becomes one chunk. Pending text is flushed once a
+    limit is reached, when max_delay_ms expires even if no item arrives, and
+    before any other chunk, error or the end of ``items``.
+    """
+    it = iter(items)
+    if config is None:
+        try:
+            for item in it:
+                part = parse(item)
+                if part is None:
+                    continue
+                yield (
+                    StreamChunk(type="token", value=part)
+                    if isinstance(part, str)
+                    else part
+                )
+        finally:
+            _close(it)
+        return
+
+    pending = _Coalescer(config)
+    stream = _items(it, pending)
+    try:
+        for item in stream:
+            if item is _DUE:
+                delta = pending.flush()
+                if delta is not None:
+                    yield delta
+                continue
+            part = parse(item)
+            if part is None:
+                continue
+            if isinstance(part, str):
+                if pending.add(part):
+                    yield pending.flush()
+                continue
+            delta = pending.flush()
+            if delta is not None:
+                yield delta
+            yield part
+        delta = pending.flush()
+        if delta is not None:
+            yield delta
+    except Exception:
+        # Deliver what arrived before the failure, as per-token mode would have
+        delta = pending.flush()
+        if delta is not None:
+            yield delta
+        raise
+    finally:
+        # Closes ``it``, on the background reader's thread if there is one
+        stream.close()
+
+
+async def _aitems(it: AsyncIterator[F], pending: _Coalescer):
+    """Async ``_items``: a timed wait on the next item instead of a thread."""
+    import asyncio
+
+    if pending.max_delay_s is None:
+        async for item in it:
+            yield item
+        return
+    nxt: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if nxt is None:
+                nxt = asyncio.ensure_future(it.__anext__())
+            try:
+                # Shielded: a timeout only flushes, the wait for the same
+                # item goes on
+                item = await asyncio.wait_for(asyncio.shield(nxt), pending.due_in())
+            except asyncio.TimeoutError:
+                yield _DUE
+                continue
+            except StopAsyncIteration:
+                nxt = None
+                return
+            nxt = None
+            yield item
+    finally:
+        if nxt is not None and not nxt.done():
+            nxt.cancel()
+            try:
+                await nxt
+            except (Exception, asyncio.CancelledError):
+                pass
+
+
+async def amerge_tokens(
+    items: AsyncIterable[F],
+    parse: Callable[[F], Part],
+    config: Optional[DeliveryConfig],
+) -> AsyncIterator[StreamChunk]:
+    """Async counterpart of ``merge_tokens``."""
+    it = items.__aiter__()
+    aclose = getattr(it, "aclose", None)
+    if config is None:
+        try:
+            async for item in it:
+                part = parse(item)
+                if part is None:
+                    continue
+                yield (
+                    StreamChunk(type="token", value=part)
+                    if isinstance(part, str)
+                    else part
+                )
+        finally:
+            if aclose is not None:
+                await aclose()
+        return
+
+    pending = _Coalescer(config)
+    stream = _aitems(it, pending)
+    try:
+        async for item in stream:
+            if item is _DUE:
+                delta = pending.flush()
+                if delta is not None:
+                    yield delta
+                continue
+            part = parse(item)
+            if part is None:
+                continue
+            if isinstance(part, str):
+                if pending.add(part):
+                    yield pending.flush()
+                continue
+            delta = pending.flush()
+            if delta is not None:
+                yield delta
+            yield part
+        delta = pending.flush()
+        if delta is not None:
+            yield delta
+    except Exception:
+        delta = pending.flush()
+        if delta is not None:
+            yield delta
+        raise
+    finally:
+        await stream.aclose()
+        if aclose is not None:
+            await aclose()
+
+
+def _chunk_part(chunk: StreamChunk) -> Part:
+    if chunk.type == "token" and isinstance(chunk.value, str):
+        return chunk.value
+    return chunk
+
+
+def coalesce_tokens(
+    chunks: Iterable[StreamChunk], config: DeliveryConfig
+) -> Iterator[StreamChunk]:
+    """Re-yield ``chunks`` with consecutive text tokens merged into deltas.
+
+    For providers that don't merge tokens in their own frame loop.
+    """
+    return merge_tokens(chunks, _chunk_part, config)
+
+
+def acoalesce_tokens(
+    chunks: AsyncIterator[StreamChunk], config: DeliveryConfig
+) -> AsyncIterator[StreamChunk]:
+    return amerge_tokens(chunks, _chunk_part, config)
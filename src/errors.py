@@ -38,8 +38,34 @@ class ProviderError(SDKError):
 
 
 class TransportError(SDKError):
-    def __init__(self, message: str):
+    status_code: int | None
+
+    def __init__(self, message: str, status_code: int | None = None):
         super().__init__(message, "transport_error")
+        self.status_code = status_code
+
+
+class CircuitOpenError(TransportError):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class ContextWindowExceededError(SDKError):
+    prompt_tokens: int
+    context_window: int
+
+    def __init__(self, message: str, prompt_tokens: int, context_window: int):
+        super().__init__(message, "context_window_exceeded")
+        self.prompt_tokens = prompt_tokens
+        self.context_window = context_window
+
+
+class AdmissionRejectedError(SDKError):
+    reason: str  # "queue_full" or "timeout"
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message, "admission_rejected")
+        self.reason = reason
 
 
 class TimeoutError(SDKError):
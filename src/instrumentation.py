@@ -0,0 +1,201 @@
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import AsyncIterator, ContextManager, Iterable, Iterator, Optional
+from .types import StreamChunk
+
+# Timing names emitted by the SDK (all in seconds):
+#   validate, resolve, capabilities  - per-call setup phases
+#   connect                          - TCP connect + TLS handshake of a new connection
+#   ttfb                             - request sent until response headers arrived
+#   ttft                             - call start until the first token chunk
+#   inter_token                      - gap between consecutive token chunks
+#   total                            - whole generate()/stream() call
+#   queue_wait                       - time spent queued for admission
+#   compress                         - compressing a request body
+# Counter names: bytes_received, chunks, retries
+
+
+class Instrumentation:
+    """Receives timings and counters from the call path.
+
+    This base class is the no-op default. Hot paths check ``enabled`` before
+    doing any timing work, so leaving it installed costs a single attribute read.
+    """
+
+    enabled = False
+
+    def timing(self, name: str, seconds: float, provider: Optional[str] = None) -> None:
+        pass
+
+    def count(self, name: str, value: int, provider: Optional[str] = None) -> None:
+        pass
+
+    def span(self, name: str, provider: Optional[str] = None) -> ContextManager:
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, provider)
+
+    @contextmanager
+    def _span(self, name: str, provider: Optional[str]):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timing(name, time.perf_counter() - start, provider)
+
+
+_NULL_SPAN = nullcontext()
+
+
+class _Histogram:
+    # Log-scaled buckets: each is 5% wider than the previous, so percentiles
+    # are accurate to ~2.5% whatever the magnitude of the values.
+    GAMMA = 1.05
+
+    def __init__(self):
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        index = math.ceil(math.log(value, self.GAMMA)) if value > 0 else -(10**9)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                value = self.GAMMA**index if index > -(10**9) else 0.0
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p99": self.percentile(0.99),
+        }
+
+
+class HistogramAggregator(Instrumentation):
+    """In-process aggregation of timings into histograms and counters into sums.
+
+    ``snapshot()`` returns ``{"timings": {name: {count, sum, min, max, p50,
+    p90, p99}}, "counters": {name: total}}``. Timings recorded with a provider
+    id are additionally aggregated under ``"<name>/<provider>"``.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings: dict[str, _Histogram] = {}
+        self._counters: dict[str, int] = {}
+
+    def timing(self, name: str, seconds: float, provider: Optional[str] = None) -> None:
+        with self._lock:
+            for key in (name, f"{name}/{provider}") if provider else (name,):
+                hist = self._timings.get(key)
+                if hist is None:
+                    hist = self._timings[key] = _Histogram()
+                hist.add(seconds)
+
+    def count(self, name: str, value: int, provider: Optional[str] = None) -> None:
+        with self._lock:
+            for key in (name, f"{name}/{provider}") if provider else (name,):
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "timings": {k: h.summary() for k, h in self._timings.items()},
+                "counters": dict(self._counters),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+
+_instrumentation: Instrumentation = Instrumentation()
+
+
+def set_instrumentation(instrumentation: Optional[Instrumentation]) -> None:
+    """Install an instrumentation sink (None restores the no-op default)."""
+    global _instrumentation
+    _instrumentation = instrumentation or Instrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    return _instrumentation
+
+
+def instrument_stream(
+    chunks: Iterable[StreamChunk],
+    instr: Instrumentation,
+    provider: Optional[str],
+    start: float,
+) -> Iterator[StreamChunk]:
+    """Re-yield ``chunks`` while recording ttft, inter_token, chunks and total."""
+    last_token = None
+    count = 0
+    it = iter(chunks)
+    try:
+        for chunk in it:
+            count += 1
+            if chunk.type == "token":
+                now = time.perf_counter()
+                if last_token is None:
+                    instr.timing("ttft", now - start, provider)
+                else:
+                    instr.timing("inter_token", now - last_token, provider)
+                last_token = now
+            yield chunk
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
+        instr.count("chunks", count, provider)
+        instr.timing("total", time.perf_counter() - start, provider)
+
+
+async def ainstrument_stream(
+    chunks: AsyncIterator[StreamChunk],
+    instr: Instrumentation,
+    provider: Optional[str],
+    start: float,
+) -> AsyncIterator[StreamChunk]:
+    last_token = None
+    count = 0
+    try:
+        async for chunk in chunks:
+            count += 1
+            if chunk.type == "token":
+                now = time.perf_counter()
+                if last_token is None:
+                    instr.timing("ttft", now - start, provider)
+                else:
+                    instr.timing("inter_token", now - last_token, provider)
+                last_token = now
+            yield chunk
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        instr.count("chunks", count, provider)
+        instr.timing("total", time.perf_counter() - start, provider)
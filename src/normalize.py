@@ -1,17 +1,27 @@
 from .types import GenerateRequest, InternalRequest, Message
 from .validate import validate_messages, validate_generation_options
+from .deadline import Deadline
+from .conversation import Conversation
 
 
 def normalize_request(request: GenerateRequest) -> InternalRequest:
     validate_messages(request.messages)
     validate_generation_options(request.options)
 
+    messages = request.messages
+    if not isinstance(messages, Conversation):
+        # Copy plain lists so later mutation by the caller can't leak in;
+        # a Conversation snapshot is immutable and is passed through as is
+        messages = [Message(role=m.role, content=m.content) for m in messages]
+
     # Create an InternalRequest copy and make it immutable via dataclass frozen type
     internal = InternalRequest(
         model=request.model,
-        messages=[Message(role=m.role, content=m.content) for m in request.messages],
+        messages=messages,
         tools=request.tools,
         options=request.options,
+        deadline=Deadline.for_request(request),
+        delivery=request.delivery,
     )
 
     return internal
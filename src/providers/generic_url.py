@@ -1,50 +1,190 @@
-from typing import Iterable
+from typing import Any, AsyncIterator, Iterable, List, Optional, Sequence, Union
 from ..types import (
+    BalancerConfig,
+    CompressionConfig,
+    RetryPolicy,
     Provider,
     InternalRequest,
     GenerateResult,
     StreamChunk,
     Capabilities,
 )
-from ..transport.http import post_json, post_stream
+from ..transport.http import (
+    AsyncHTTPTransport,
+    HTTPTransport,
+    get_async_transport,
+    get_transport,
+)
+from ..delivery import amerge_tokens, merge_tokens
+from ..tokens import usage_tokens
+from ..transport.balancer import EndpointPool
+from ..transport.compression import request_compressor
+from ..transport.codec import encode_request
+from ..transport.resilience import (
+    aretry_call,
+    aretry_stream,
+    retry_call,
+    retry_stream,
+)
+from ..transport.framing import FramingMode, SSEEvent, aiter_frames, iter_frames
+
+_DONE = StreamChunk(type="done")
 
 
 class GenericURLProvider(Provider):
-    def __init__(self, id: str, endpoint: str, headers: dict | None = None):
+    # How streamed response bodies are split into frames; one chunk per frame
+    framing: FramingMode = "lines"
+    # stream() applies InternalRequest.delivery while parsing frames
+    merges_tokens = True
+
+    def __init__(
+        self,
+        id: str,
+        endpoint: str,
+        headers: dict | None = None,
+        transport: Optional[HTTPTransport] = None,
+        async_transport: Optional[AsyncHTTPTransport] = None,
+        framing: Optional[FramingMode] = None,
+        endpoints: Optional[List[str]] = None,
+        balancing: Optional[BalancerConfig] = None,
+        retry: Optional[RetryPolicy] = None,
+        compression: Optional[CompressionConfig] = None,
+    ):
         self.id = id
         self.endpoint = endpoint
         self.headers = headers
+        # Replicas serving the same model; a single endpoint is a pool of one
+        self.pool = EndpointPool(list(endpoints or [endpoint]), balancing)
+        self._transports = {
+            ep: transport or get_transport(ep) for ep in self.pool.endpoints
+        }
+        self.transport = transport or get_transport(endpoint)
+        self.async_transport = async_transport
+        self.retry = retry or RetryPolicy()
+        self.compressor = request_compressor(compression)
+        if framing is not None:
+            self.framing = framing
 
     def capabilities(self) -> Capabilities:
         return Capabilities(streaming=True, tools=False, json=False)
 
+    def _payload(self, req: InternalRequest, stream: bool = False) -> bytes:
+        fields: dict = {"stream": True} if stream else {}
+        stop = req.options.stop if req.options is not None else None
+        if stop:
+            # Lets the backend stop by itself; the SDK also enforces it
+            fields["stop"] = list(stop)
+        return encode_request(req.model, req.messages, **fields)
+
+    def _body(self, payload: bytes) -> tuple[bytes, Optional[dict], Optional[dict]]:
+        """The body and headers to send, plus compression stats if compressed."""
+        if self.compressor is None:
+            return payload, self.headers, None
+        return self.compressor(payload, self.headers)
+
+    def _result(self, resp: dict, compression: Optional[dict] = None) -> GenerateResult:
+        output = resp.get("output") or resp.get("text") or ""
+        return GenerateResult(
+            output=str(output),
+            tokens=usage_tokens(resp),
+            metadata=(
+                resp if compression is None else {**resp, "compression": compression}
+            ),
+        )
+
+    def _part(self, frame: Any) -> Union[str, StreamChunk]:
+        """The token text of a frame, or the chunk of a non-token frame."""
+        if isinstance(frame, dict):
+            if frame.get("done"):
+                return _DONE
+            text = frame.get("token") or frame.get("text") or frame.get("output")
+            return str(text or "")
+        if isinstance(frame, SSEEvent):
+            frame = frame.data
+        if frame.strip().upper() in ("DONE", "[DONE]"):
+            return _DONE
+        return frame
+
     def generate(self, req: InternalRequest) -> GenerateResult:
-        payload = {
-            "model": req.model,
-            "messages": [{"role": m.role, "content": m.content} for m in req.messages],
-        }
-        resp = post_json(
-            self.endpoint, headers=self.headers, json=payload, timeout=None
+        payload, headers, compression = self._body(self._payload(req))
+        resp = retry_call(
+            lambda: self.pool.call(
+                lambda endpoint: self._transports[endpoint].post_json(
+                    endpoint,
+                    headers=headers,
+                    content=payload,
+                    timeout=req.deadline,
+                )
+            ),
+            self.retry,
+            req.deadline,
         )
-        output = resp.get("output") or resp.get("text") or ""
-        return GenerateResult(output=str(output), tokens=None, metadata=resp)
+        return self._result(resp, compression)
 
     def stream(self, req: InternalRequest) -> Iterable[StreamChunk]:
-        payload = {
-            "model": req.model,
-            "messages": [{"role": m.role, "content": m.content} for m in req.messages],
-            "stream": True,
-        }
-        for raw in post_stream(
-            self.endpoint, headers=self.headers, json=payload, timeout=None
-        ):
-            try:
-                text = raw.decode("utf-8")
-            except Exception:
-                text = ""
-            for line in text.splitlines():
-                if line.strip().upper() == "DONE":
-                    yield StreamChunk(type="done")
-                else:
-                    yield StreamChunk(type="token", value=line)
+        payload, headers, _ = self._body(self._payload(req, stream=True))
+        chunks = retry_stream(
+            lambda: self.pool.stream(
+                lambda endpoint: self._transports[endpoint].post_stream(
+                    endpoint,
+                    headers=headers,
+                    content=payload,
+                    timeout=req.deadline,
+                )
+            ),
+            self.retry,
+            req.deadline,
+        )
+        yield from merge_tokens(
+            iter_frames(chunks, self.framing), self._part, req.delivery
+        )
+        yield StreamChunk(type="done")
+
+    def _async_transport(self, endpoint: str) -> AsyncHTTPTransport:
+        return self.async_transport or get_async_transport(endpoint)
+
+    async def agenerate(self, req: InternalRequest) -> GenerateResult:
+        payload, headers, compression = self._body(self._payload(req))
+        resp = await aretry_call(
+            lambda: self.pool.acall(
+                lambda endpoint: self._async_transport(endpoint).post_json(
+                    endpoint,
+                    headers=headers,
+                    content=payload,
+                    timeout=req.deadline,
+                )
+            ),
+            self.retry,
+            req.deadline,
+        )
+        return self._result(resp, compression)
+
+    async def astream(self, req: InternalRequest) -> AsyncIterator[StreamChunk]:
+        payload, headers, _ = self._body(self._payload(req, stream=True))
+        chunks = aretry_stream(
+            lambda: self.pool.astream(
+                lambda endpoint: self._async_transport(endpoint).post_stream(
+                    endpoint,
+                    headers=headers,
+                    content=payload,
+                    timeout=req.deadline,
+                )
+            ),
+            self.retry,
+            req.deadline,
+        )
+        chunks = amerge_tokens(
+            aiter_frames(chunks, self.framing), self._part, req.delivery
+        )
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
         yield StreamChunk(type="done")
+
+    def warm_up(self, models: Sequence[str] = (), connections: int = 1) -> dict:
+        """Preconnect to every endpoint; a generic backend has no model loading."""
+        for endpoint in self.pool.endpoints:
+            self._transports[endpoint].preconnect(endpoint, connections)
+        return {}
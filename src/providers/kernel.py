@@ -1,15 +1,260 @@
-from ..types import Provider, InternalRequest, GenerateResult, Capabilities
+import atexit
+import inspect
+import queue
+import threading
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    TimeoutError as FutureTimeoutError,
+)
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Iterable, Literal, Optional
+from ..errors import ProviderError, SDKError, TimeoutError
+from ..types import Provider, InternalRequest, GenerateResult, StreamChunk, Capabilities
+
+# A kernel maps a request to its output: a str or GenerateResult, or (for
+# streaming kernels) an iterable of str tokens / StreamChunks.
+KernelFn = Callable[[InternalRequest], Any]
+ExecutorKind = Literal["thread", "process"]
+
+
+@dataclass(frozen=True)
+class _Kernel:
+    fn: KernelFn
+    capabilities: Capabilities
+    executor: ExecutorKind
+
+
+_kernels: dict[str, _Kernel] = {}
+_kernels_lock = threading.Lock()
+
+
+def register_kernel(
+    model: str,
+    fn: KernelFn,
+    capabilities: Optional[Capabilities] = None,
+    executor: ExecutorKind = "thread",
+) -> None:
+    """Serve ``model`` on the kernel runtime with the local callable ``fn``.
+
+    Generator functions stream their tokens as they are produced. Kernels run
+    on a shared thread pool, or with ``executor="process"`` on a process pool
+    so CPU-bound work doesn't hold the GIL (``fn`` must then be picklable,
+    i.e. defined at module level). ``capabilities`` defaults to streaming iff
+    ``fn`` is a generator function.
+    """
+    if capabilities is None:
+        capabilities = Capabilities(
+            streaming=inspect.isgeneratorfunction(fn), tools=False, json=False
+        )
+    with _kernels_lock:
+        _kernels[model] = _Kernel(fn, capabilities, executor)
+
+
+def unregister_kernel(model: str) -> None:
+    with _kernels_lock:
+        _kernels.pop(model, None)
+
+
+_pools: dict[str, Executor] = {}
+_pool_sizes: dict[str, Optional[int]] = {"thread": None, "process": None}
+_pools_lock = threading.Lock()
+
+
+def configure_kernel_pools(
+    threads: Optional[int] = None, processes: Optional[int] = None
+) -> None:
+    """Set the worker counts of the kernel pools, replacing existing pools."""
+    with _pools_lock:
+        _pool_sizes.update(thread=threads, process=processes)
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False)
+
+
+def _pool(kind: ExecutorKind) -> Executor:
+    pool = _pools.get(kind)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(kind)
+            if pool is None:
+                size = _pool_sizes[kind]
+                pool = _pools[kind] = (
+                    ProcessPoolExecutor(max_workers=size)
+                    if kind == "process"
+                    else ThreadPoolExecutor(
+                        max_workers=size, thread_name_prefix="kernel"
+                    )
+                )
+    return pool
+
+
+def shutdown_kernel_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown_kernel_pools)
+
+
+def _as_result(value: Any) -> GenerateResult:
+    if isinstance(value, GenerateResult):
+        return value
+    if isinstance(value, str):
+        return GenerateResult(output=value)
+    # A streaming kernel called through generate(): join its tokens
+    parts = []
+    for item in value:
+        if isinstance(item, StreamChunk):
+            if item.type == "token":
+                parts.append(str(item.value))
+        else:
+            parts.append(str(item))
+    return GenerateResult(output="".join(parts))
+
+
+def _run(fn: KernelFn, req: InternalRequest) -> GenerateResult:
+    return _as_result(fn(req))
+
+
+_END = ("end", None)
+
+
+def _put(out, stop, message) -> bool:
+    """Hand ``message`` to the consumer; False once it has gone away.
+
+    Waits for room in ``out`` in short steps, so a worker never blocks on a
+    full queue that nobody reads anymore.
+    """
+    while not stop.is_set():
+        try:
+            out.put(message, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _pump(fn: KernelFn, req: InternalRequest, out, stop) -> None:
+    """Run a streaming kernel on a worker, forwarding each item to ``out``."""
+    try:
+        value = fn(req)
+        items = [value] if isinstance(value, (str, GenerateResult)) else value
+        for item in items:
+            if isinstance(item, GenerateResult):
+                item = item.output
+            if not _put(out, stop, ("item", item)):
+                return
+        _put(out, stop, _END)
+    except BaseException as e:
+        _put(out, stop, ("error", e))
+
+
+def _chunk(item: Any) -> StreamChunk:
+    if isinstance(item, StreamChunk):
+        return item
+    return StreamChunk(type="token", value=str(item))
 
 
 class KernelProvider(Provider):
-    def __init__(self):
+    """Runs kernels registered with ``register_kernel`` in-process.
+
+    One instance serves one model (the registry builds it per model), so
+    ``capabilities()`` can report what that kernel declared.
+    """
+
+    def __init__(self, model: Optional[str] = None):
         self.id = "kernel"
+        self.model = model
+        self._manager = None
+        self._manager_lock = threading.Lock()
+
+    def _kernel(self, model: Optional[str]) -> _Kernel:
+        kernel = _kernels.get(model) if model is not None else None
+        if kernel is None:
+            raise ProviderError(
+                f"no kernel registered for model {model!r}", provider_id=self.id
+            )
+        return kernel
 
     def capabilities(self) -> Capabilities:
-        return Capabilities(streaming=False, tools=False, json=False, max_tokens=None)
+        kernel = _kernels.get(self.model) if self.model is not None else None
+        if kernel is None:
+            return Capabilities(streaming=False, tools=False, json=False)
+        return kernel.capabilities
+
+    def _portable(self, kernel: _Kernel, req: InternalRequest) -> InternalRequest:
+        if kernel.executor != "process":
+            return req
+        # Crossing a process boundary: plain picklable data only. The deadline
+        # is enforced on this side.
+        return replace(req, messages=list(req.messages), deadline=None)
 
     def generate(self, req: InternalRequest) -> GenerateResult:
-        raise NotImplementedError("Kernel provider is a stub. Implement later.")
+        kernel = self._kernel(req.model)
+        future = _pool(kernel.executor).submit(
+            _run, kernel.fn, self._portable(kernel, req)
+        )
+        try:
+            return future.result(
+                timeout=req.deadline.remaining() if req.deadline is not None else None
+            )
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"kernel for {req.model!r} exceeded the deadline")
+        except SDKError:
+            raise
+        except Exception as e:
+            raise ProviderError(
+                f"kernel for {req.model!r} failed: {e!r}", provider_id=self.id
+            ) from e
+
+    def _queues(self, kernel: _Kernel):
+        if kernel.executor != "process":
+            return queue.Queue(maxsize=64), threading.Event()
+        with self._manager_lock:
+            if self._manager is None:
+                import multiprocessing
+
+                self._manager = multiprocessing.Manager()
+            return self._manager.Queue(maxsize=64), self._manager.Event()
 
-    def stream(self, req: InternalRequest):
-        raise NotImplementedError("Kernel provider is a stub. Implement later.")
+    def stream(self, req: InternalRequest) -> Iterable[StreamChunk]:
+        kernel = self._kernel(req.model)
+        out, stop = self._queues(kernel)
+        _pool(kernel.executor).submit(
+            _pump, kernel.fn, self._portable(kernel, req), out, stop
+        )
+        done = False
+        try:
+            while True:
+                timeout = req.deadline.remaining() if req.deadline is not None else None
+                try:
+                    kind, item = out.get(timeout=timeout)
+                except queue.Empty:
+                    req.deadline.check()
+                    continue
+                if kind == "end":
+                    break
+                if kind == "error":
+                    if isinstance(item, SDKError):
+                        raise item
+                    raise ProviderError(
+                        f"kernel for {req.model!r} failed: {item!r}",
+                        provider_id=self.id,
+                    ) from item
+                chunk = _chunk(item)
+                done = chunk.type == "done"
+                yield chunk
+                if done:
+                    break
+            if not done:
+                yield StreamChunk(type="done")
+        finally:
+            # Tell a kernel still producing that nobody is listening anymore
+            stop.set()
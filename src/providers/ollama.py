@@ -1,53 +1,263 @@
-from typing import Iterable
-from ..types import Provider, InternalRequest, GenerateResult, StreamChunk, Capabilities
-from ..transport.http import post_json, post_stream
+import time
+from typing import AsyncIterator, Iterable, List, Optional, Sequence, Union
+from ..types import (
+    BalancerConfig,
+    CompressionConfig,
+    RetryPolicy,
+    Provider,
+    InternalRequest,
+    GenerateResult,
+    StreamChunk,
+    Capabilities,
+)
+from ..transport.http import (
+    AsyncHTTPTransport,
+    HTTPTransport,
+    get_async_transport,
+    get_transport,
+)
+from ..delivery import amerge_tokens, merge_tokens
+from ..tokens import usage_tokens
+from ..transport.balancer import EndpointPool
+from ..transport.compression import request_compressor
+from ..transport.codec import encode_request, loads
+from ..transport.resilience import (
+    aretry_call,
+    aretry_stream,
+    retry_call,
+    retry_stream,
+)
+from ..transport.framing import FramingMode, aiter_frames, iter_frames
+
+_DONE = StreamChunk(type="done")
+
+# Seconds allowed for a /api/show capability probe
+PROBE_TIMEOUT_S = 5.0
+
+
+def _context_window(info: dict) -> Optional[int]:
+    """The context window in an /api/show reply: num_ctx if set, else the model's."""
+    parameters = info.get("parameters")
+    for line in parameters.splitlines() if isinstance(parameters, str) else ():
+        name, _, value = line.partition(" ")
+        if name == "num_ctx" and value.strip().isdigit():
+            return int(value)
+    model_info = info.get("model_info")
+    for key, value in model_info.items() if isinstance(model_info, dict) else ():
+        if key.endswith(".context_length") and isinstance(value, int):
+            return value
+    return None
 
 
 class OllamaProvider(Provider):
+    framing: FramingMode = "lines"
+    # stream() applies InternalRequest.delivery while parsing frames
+    merges_tokens = True
+
     def __init__(
-        self, endpoint: str = "http://localhost:11434", headers: dict | None = None
+        self,
+        endpoint: str = "http://localhost:11434",
+        headers: dict | None = None,
+        transport: Optional[HTTPTransport] = None,
+        async_transport: Optional[AsyncHTTPTransport] = None,
+        endpoints: Optional[List[str]] = None,
+        balancing: Optional[BalancerConfig] = None,
+        retry: Optional[RetryPolicy] = None,
+        keep_alive: Optional[Union[str, int]] = None,
+        compression: Optional[CompressionConfig] = None,
     ):
         self.id = "ollama"
         self.endpoint = endpoint
         self.headers = headers or {}
+        self.pool = EndpointPool(list(endpoints or [endpoint]), balancing)
+        self._transports = {
+            ep: transport or get_transport(ep) for ep in self.pool.endpoints
+        }
+        self.transport = transport or get_transport(endpoint)
+        self.async_transport = async_transport
+        self.retry = retry or RetryPolicy()
+        self.compressor = request_compressor(compression)
+        self.keep_alive = keep_alive
 
     def capabilities(self) -> Capabilities:
         # Ollama supports streaming and JSON models by design in this integration
         return Capabilities(streaming=True, tools=False, json=True, max_tokens=None)
 
-    def generate(self, req: InternalRequest) -> GenerateResult:
-        payload = {
-            "model": req.model,
-            "messages": [{"role": m.role, "content": m.content} for m in req.messages],
-        }
-        resp = post_json(
-            f"{self.endpoint}/api/generate",
+    def discover_capabilities(self, model: str) -> Capabilities:
+        """Ask Ollama about ``model`` (``/api/show``); cached by src.capabilities."""
+        endpoint = self.pool.endpoints[0]
+        info = self._transports[endpoint].post_json(
+            f"{endpoint}/api/show",
             headers=self.headers,
-            json=payload,
-            timeout=None,
+            json={"model": model},
+            timeout=PROBE_TIMEOUT_S,
+        )
+        return Capabilities(
+            streaming=True,
+            tools="tools" in (info.get("capabilities") or ()),
+            json=True,
+            max_tokens=None,
+            context_window=_context_window(info),
         )
-        output = resp.get("output") or resp.get("text") or ""
-        return GenerateResult(output=str(output), tokens=None, metadata=resp)
 
-    def stream(self, req: InternalRequest) -> Iterable[StreamChunk]:
-        payload = {
-            "model": req.model,
-            "messages": [{"role": m.role, "content": m.content} for m in req.messages],
-            "stream": True,
-        }
-        for raw in post_stream(
-            f"{self.endpoint}/api/stream",
-            headers=self.headers,
-            json=payload,
-            timeout=None,
-        ):
+    def _payload(self, req: InternalRequest, stream: bool = False) -> bytes:
+        # Ollama streams unless told otherwise, so always say which we want
+        fields: dict = {"stream": stream}
+        if self.keep_alive is not None:
+            fields["keep_alive"] = self.keep_alive
+        stop = req.options.stop if req.options is not None else None
+        if stop:
+            fields["options"] = {"stop": list(stop)}
+        return encode_request(req.model, req.messages, **fields)
+
+    def _text(self, resp: dict) -> Optional[str]:
+        # /api/generate answers in "response", /api/chat in "message.content"
+        message = resp.get("message")
+        if isinstance(message, dict) and message.get("content") is not None:
+            return message["content"]
+        for key in ("response", "output", "text"):
+            if resp.get(key) is not None:
+                return resp[key]
+        return None
+
+    def _body(self, payload: bytes) -> tuple[bytes, Optional[dict], Optional[dict]]:
+        """The body and headers to send, plus compression stats if compressed."""
+        if self.compressor is None:
+            return payload, self.headers, None
+        return self.compressor(payload, self.headers)
+
+    def _result(self, resp: dict, compression: Optional[dict] = None) -> GenerateResult:
+        return GenerateResult(
+            output=str(self._text(resp) or ""),
+            tokens=usage_tokens(resp),
+            metadata=(
+                resp if compression is None else {**resp, "compression": compression}
+            ),
+        )
+
+    def _part(self, line: str) -> Union[str, StreamChunk, None]:
+        """The token text of one NDJSON line, the done chunk, or None for a
+        line carrying no text."""
+        if line.startswith("{"):
             try:
-                text = raw.decode("utf-8")
-            except Exception:
-                text = ""
-            for line in text.splitlines():
-                if line.strip().upper() == "DONE":
-                    yield StreamChunk(type="done")
-                else:
-                    yield StreamChunk(type="token", value=line)
-        yield StreamChunk(type="done")
+                frame = loads(line)
+            except ValueError:
+                frame = None
+            if isinstance(frame, dict):
+                if frame.get("done"):
+                    return _DONE
+                return self._text(frame) or None
+        # Plain-text lines, as sent by simple Ollama-compatible stand-ins
+        if line.strip().upper() == "DONE":
+            return _DONE
+        return line
+
+    def generate(self, req: InternalRequest) -> GenerateResult:
+        payload, headers, compression = self._body(self._payload(req))
+        resp = retry_call(
+            lambda: self.pool.call(
+                lambda endpoint: self._transports[endpoint].post_json(
+                    f"{endpoint}/api/generate",
+                    headers=headers,
+                    content=payload,
+                    timeout=req.deadline,
+                )
+            ),
+            self.retry,
+            req.deadline,
+        )
+        return self._result(resp, compression)
+
+    def stream(self, req: InternalRequest) -> Iterable[StreamChunk]:
+        payload, headers, _ = self._body(self._payload(req, stream=True))
+        chunks = retry_stream(
+            lambda: self.pool.stream(
+                lambda endpoint: self._transports[endpoint].post_stream(
+                    f"{endpoint}/api/stream",
+                    headers=headers,
+                    content=payload,
+                    timeout=req.deadline,
+                )
+            ),
+            self.retry,
+            req.deadline,
+        )
+        chunks = merge_tokens(
+            iter_frames(chunks, self.framing), self._part, req.delivery
+        )
+        try:
+            for chunk in chunks:
+                if chunk is _DONE:
+                    break
+                yield chunk
+        finally:
+            # Release the connection before reporting done
+            chunks.close()
+        yield _DONE
+
+    def _async_transport(self, endpoint: str) -> AsyncHTTPTransport:
+        return self.async_transport or get_async_transport(endpoint)
+
+    async def agenerate(self, req: InternalRequest) -> GenerateResult:
+        payload, headers, compression = self._body(self._payload(req))
+        resp = await aretry_call(
+            lambda: self.pool.acall(
+                lambda endpoint: self._async_transport(endpoint).post_json(
+                    f"{endpoint}/api/generate",
+                    headers=headers,
+                    content=payload,
+                    timeout=req.deadline,
+                )
+            ),
+            self.retry,
+            req.deadline,
+        )
+        return self._result(resp, compression)
+
+    async def astream(self, req: InternalRequest) -> AsyncIterator[StreamChunk]:
+        payload, headers, _ = self._body(self._payload(req, stream=True))
+        chunks = aretry_stream(
+            lambda: self.pool.astream(
+                lambda endpoint: self._async_transport(endpoint).post_stream(
+                    f"{endpoint}/api/stream",
+                    headers=headers,
+                    content=payload,
+                    timeout=req.deadline,
+                )
+            ),
+            self.retry,
+            req.deadline,
+        )
+        chunks = amerge_tokens(
+            aiter_frames(chunks, self.framing), self._part, req.delivery
+        )
+        try:
+            async for chunk in chunks:
+                if chunk is _DONE:
+                    break
+                yield chunk
+        finally:
+            await chunks.aclose()
+        yield _DONE
+
+    def warm_up(self, models: Sequence[str] = (), connections: int = 1) -> dict:
+        """Preconnect to every endpoint and load ``models`` ahead of traffic.
+
+        Loading uses this provider's ``keep_alive``, so pinned models stay
+        resident afterwards. Returns the seconds each model took to load.
+        """
+        for endpoint in self.pool.endpoints:
+            self._transports[endpoint].preconnect(endpoint, connections)
+        loaded = {}
+        for model in models:
+            start = time.perf_counter()
+            body = {"model": model, "stream": False}
+            if self.keep_alive is not None:
+                body["keep_alive"] = self.keep_alive
+            for endpoint in self.pool.endpoints:
+                # A generate request without a prompt just loads the model
+                self._transports[endpoint].post_json(
+                    f"{endpoint}/api/generate", headers=self.headers, json=body
+                )
+            loaded[model] = time.perf_counter() - start
+        return loaded
@@ -1,9 +1,93 @@
-from typing import Optional
-from .generic_url import GenericURLProvider
-from .ollama import OllamaProvider
-from .kernel import KernelProvider
+import threading
+from typing import Callable, Optional
+from ..errors import ValidationError
 from ..types import Provider, RuntimeConfig
 
+ProviderFactory = Callable[[RuntimeConfig, Optional[str]], Provider]
+
+# Third-party packages can expose provider factories under this entry point
+# group; they are only loaded the first time their provider id is requested.
+ENTRY_POINT_GROUP = "imrabo_ai_sdk.providers"
+
+MAX_CACHED_PROVIDERS = 256
+
+_factories: dict[str, ProviderFactory] = {}
+_providers: dict[tuple, Provider] = {}
+_lock = threading.Lock()
+
+
+def register_provider(provider_id: str, factory: ProviderFactory) -> None:
+    """Register a factory building the provider for ``RuntimeConfig.provider == provider_id``."""
+    with _lock:
+        _factories[provider_id] = factory
+        # Cached instances may have been built by a previous factory
+        _providers.clear()
+
+
+def clear_provider_cache() -> None:
+    with _lock:
+        _providers.clear()
+
+
+def runtime_key(runtime: Optional[RuntimeConfig]) -> Optional[tuple]:
+    """A hashable canonical form of a RuntimeConfig (its headers are a dict).
+
+    Only fields providers are built from are part of it: ``timeout_ms``
+    reaches them through each request's deadline, so runtimes differing only
+    in timeouts share one provider and its endpoint state.
+    """
+    if runtime is None:
+        return None
+    headers = tuple(sorted(runtime.headers.items())) if runtime.headers else ()
+    return (
+        runtime.type,
+        runtime.provider,
+        runtime.endpoint,
+        tuple(runtime.endpoints) if runtime.endpoints else None,
+        runtime.balancing,
+        runtime.retry,
+        runtime.keep_alive,
+        runtime.compression,
+        runtime.record,
+        runtime.replay,
+        headers,
+    )
+
+
+def _default_provider_id(runtime: RuntimeConfig) -> str:
+    # A replay runtime is built like the URL runtime it was recorded from
+    if runtime.type in ("url", "replay"):
+        # Heuristic: if endpoint contains 'ollama' use OllamaProvider
+        endpoint = runtime.endpoint or (runtime.endpoints or [""])[0]
+        if "ollama" in endpoint:
+            return "ollama"
+        # Default to GenericURLProvider
+        return "generic-url"
+
+    if runtime.type == "kernel":
+        return "kernel"
+
+    raise NotImplementedError(f"Unsupported runtime type: {runtime.type}")
+
+
+def entry_points(group: str):
+    # importlib.metadata is slow to import; only unknown ids need it
+    from importlib import metadata
+
+    return metadata.entry_points(group=group)
+
+
+def _get_factory(provider_id: str) -> ProviderFactory:
+    factory = _factories.get(provider_id)
+    if factory is None:
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            if ep.name == provider_id:
+                factory = _factories[provider_id] = ep.load()
+                break
+    if factory is None:
+        raise NotImplementedError(f"Unknown provider: {provider_id}")
+    return factory
+
 
 def get_provider_for_runtime(
     runtime: Optional[RuntimeConfig], model: Optional[str]
@@ -13,17 +97,104 @@ def get_provider_for_runtime(
             "No runtime provided; provider resolution requires runtime config"
         )
 
-    if runtime.type == "url":
-        endpoint = runtime.endpoint or ""
-        # Heuristic: if endpoint contains 'ollama' use OllamaProvider
-        if "ollama" in (endpoint or ""):
-            return OllamaProvider(endpoint=endpoint, headers=runtime.headers)
-        # Default to GenericURLProvider
-        return GenericURLProvider(
-            id="generic-url", endpoint=endpoint, headers=runtime.headers
+    key = runtime_key(runtime)
+    if runtime.type == "kernel":
+        # Kernel providers are per model: capabilities depend on its kernel
+        key = (key, model)
+    provider = _providers.get(key)
+    if provider is not None:
+        return provider
+
+    with _lock:
+        provider = _providers.get(key)
+        if provider is None:
+            factory = _get_factory(runtime.provider or _default_provider_id(runtime))
+            provider = factory(runtime, model)
+            if len(_providers) >= MAX_CACHED_PROVIDERS:
+                # Evict the oldest entry (dicts keep insertion order)
+                del _providers[next(iter(_providers))]
+            _providers[key] = provider
+    return provider
+
+
+def _transports(runtime: RuntimeConfig) -> dict:
+    """Transport overrides of a URL provider: replaying or recording traffic."""
+    if runtime.type == "replay":
+        if runtime.replay is None:
+            raise ValidationError("A replay runtime needs RuntimeConfig.replay")
+        from ..transport.replay import AsyncReplayTransport, ReplayTransport, open_log
+
+        log = open_log(runtime.replay.path)
+        return {
+            "transport": ReplayTransport(log, runtime.replay.speed),
+            "async_transport": AsyncReplayTransport(log, runtime.replay.speed),
+        }
+    if runtime.record is not None:
+        from ..transport.replay import (
+            AsyncRecordingTransport,
+            RecordingTransport,
+            get_writer,
         )
 
-    if runtime.type == "kernel":
-        return KernelProvider()
+        writer = get_writer(runtime.record)
+        return {
+            "transport": RecordingTransport(writer),
+            "async_transport": AsyncRecordingTransport(writer),
+        }
+    return {}
 
-    raise NotImplementedError(f"Unsupported runtime type: {runtime.type}")
+
+# Built-in factories import their provider module on first use, so httpx and
+# the transport stack are only loaded once a URL runtime is resolved. The
+# providers they build share one HTTP transport per origin (get_transport)
+# rather than owning one, so evicting a cached provider closes nothing.
+def _generic_url_factory(runtime: RuntimeConfig, model: Optional[str]) -> Provider:
+    from .generic_url import GenericURLProvider
+
+    endpoints = runtime.endpoints or None
+    return GenericURLProvider(
+        id="generic-url",
+        endpoint=runtime.endpoint or (endpoints[0] if endpoints else ""),
+        headers=runtime.headers,
+        endpoints=endpoints,
+        balancing=runtime.balancing,
+        retry=runtime.retry,
+        compression=runtime.compression,
+        **_transports(runtime),
+    )
+
+
+def _ollama_factory(runtime: RuntimeConfig, model: Optional[str]) -> Provider:
+    from .ollama import OllamaProvider
+
+    endpoints = runtime.endpoints or None
+    endpoint = runtime.endpoint or (endpoints[0] if endpoints else None)
+    if endpoint:
+        return OllamaProvider(
+            endpoint=endpoint,
+            headers=runtime.headers,
+            endpoints=endpoints,
+            balancing=runtime.balancing,
+            retry=runtime.retry,
+            keep_alive=runtime.keep_alive,
+            compression=runtime.compression,
+            **_transports(runtime),
+        )
+    return OllamaProvider(
+        headers=runtime.headers,
+        retry=runtime.retry,
+        keep_alive=runtime.keep_alive,
+        compression=runtime.compression,
+        **_transports(runtime),
+    )
+
+
+def _kernel_factory(runtime: RuntimeConfig, model: Optional[str]) -> Provider:
+    from .kernel import KernelProvider
+
+    return KernelProvider(model)
+
+
+register_provider("generic-url", _generic_url_factory)
+register_provider("ollama", _ollama_factory)
+register_provider("kernel", _kernel_factory)
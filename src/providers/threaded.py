@@ -0,0 +1,55 @@
+from typing import AsyncIterator, Union
+from ..types import (
+    AsyncProvider,
+    Capabilities,
+    GenerateResult,
+    InternalRequest,
+    Provider,
+    StreamChunk,
+)
+
+_EXHAUSTED = object()
+
+# asyncio is imported inside the coroutines: they only run under an event
+# loop, and sync-only callers shouldn't pay for loading it.
+
+
+class ThreadedAsyncProvider(AsyncProvider):
+    """Adapts a sync-only Provider to the AsyncProvider protocol.
+
+    Blocking calls run on the default executor. A stream only occupies a worker
+    thread while it waits for its next chunk, never between chunks.
+    """
+
+    def __init__(self, provider: Provider):
+        self.provider = provider
+        self.id = provider.id
+
+    def capabilities(self) -> Capabilities:
+        return self.provider.capabilities()
+
+    async def agenerate(self, req: InternalRequest) -> GenerateResult:
+        import asyncio
+
+        return await asyncio.to_thread(self.provider.generate, req)
+
+    async def astream(self, req: InternalRequest) -> AsyncIterator[StreamChunk]:
+        import asyncio
+
+        it = iter(self.provider.stream(req))
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, it, _EXHAUSTED)
+                if chunk is _EXHAUSTED:
+                    break
+                yield chunk
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                await asyncio.to_thread(close)
+
+
+def as_async_provider(provider: Union[Provider, AsyncProvider]) -> AsyncProvider:
+    if hasattr(provider, "agenerate") and hasattr(provider, "astream"):
+        return provider
+    return ThreadedAsyncProvider(provider)
@@ -0,0 +1,131 @@
+import queue
+import threading
+from typing import AsyncIterator, Iterable, Iterator, Optional, TypeVar
+from .transport.aborts import AbortScope
+
+T = TypeVar("T")
+
+_END = object()
+_POLL_S = 0.1  # how often a blocked reader re-checks whether to stop
+
+
+class BackgroundReader:
+    """Consumes ``chunks`` on a background thread into a bounded buffer.
+
+    ``get`` returns the next item, ``END`` once ``chunks`` is exhausted, or
+    re-raises what ``chunks`` raised; with a ``timeout`` it raises
+    ``queue.Empty`` when nothing arrived in time. ``chunks`` is iterated and
+    closed on the reader's thread only (generators can only be closed by the
+    thread running them); ``close`` tells the reader to stop and aborts the
+    responses it has open, so a read blocked on a stalled backend ends at
+    once.
+    """
+
+    END = _END
+
+    def __init__(self, chunks: Iterable[T], size: int, name: str = "stream-reader"):
+        self._buffer: queue.Queue = queue.Queue(maxsize=size)
+        self._stop = threading.Event()
+        self._chunks = chunks
+        self._scope = AbortScope()
+        threading.Thread(target=self._read, name=name, daemon=True).start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._buffer.put(item, timeout=_POLL_S)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(self) -> None:
+        with self._scope.active():
+            it = iter(self._chunks)
+            try:
+                for chunk in it:
+                    if not self._put((True, chunk)):
+                        return
+                self._put((True, _END))
+            except BaseException as e:
+                self._put((False, e))
+            finally:
+                close = getattr(it, "close", None)
+                if close is not None:
+                    close()
+
+    def get(self, timeout: Optional[float] = None):
+        ok, item = self._buffer.get(timeout=timeout)
+        if not ok:
+            raise item
+        return item
+
+    def close(self) -> None:
+        self._stop.set()
+        self._scope.abort()
+        # Unblock a reader waiting for room in the buffer
+        while True:
+            try:
+                self._buffer.get_nowait()
+            except queue.Empty:
+                break
+
+
+def read_ahead(chunks: Iterable[T], size: int) -> Iterator[T]:
+    """Re-yield ``chunks``, consuming them on a background thread.
+
+    Up to ``size`` items are buffered ahead of the consumer, so a slow
+    consumer no longer stalls the network read; once the buffer is full the
+    reader blocks (backpressure). An exception raised by ``chunks`` is
+    delivered after the items that preceded it. Closing this iterator early
+    stops the reader, which then closes ``chunks`` on its own thread.
+    """
+    if size < 1:
+        raise ValueError("read_ahead size must be >= 1")
+    reader = BackgroundReader(chunks, size, "stream-read-ahead")
+    try:
+        while True:
+            item = reader.get()
+            if item is _END:
+                return
+            yield item
+    finally:
+        reader.close()
+
+
+async def aread_ahead(chunks: AsyncIterator[T], size: int) -> AsyncIterator[T]:
+    """Async counterpart of ``read_ahead`` using a background task."""
+    import asyncio  # not needed by sync-only callers
+
+    if size < 1:
+        raise ValueError("read_ahead size must be >= 1")
+    buffer: asyncio.Queue = asyncio.Queue(maxsize=size)
+
+    async def reader() -> None:
+        try:
+            async for chunk in chunks:
+                await buffer.put((True, chunk))
+            await buffer.put((True, _END))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await buffer.put((False, e))
+
+    task = asyncio.ensure_future(reader())
+    try:
+        while True:
+            ok, item = await buffer.get()
+            if not ok:
+                raise item
+            if item is _END:
+                return
+            yield item
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
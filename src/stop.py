@@ -0,0 +1,139 @@
+from dataclasses import replace
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Sequence
+from .types import GenerateResult, StreamChunk
+
+
+def truncate_at_stop(text: str, stops: Sequence[str]) -> Optional[str]:
+    """``text`` up to its earliest stop sequence, or None if it has none."""
+    cut = -1
+    for stop in stops:
+        if stop:
+            i = text.find(stop)
+            if i != -1 and (cut == -1 or i < cut):
+                cut = i
+    return text[:cut] if cut != -1 else None
+
+
+def apply_stop(
+    result: GenerateResult, stops: Optional[Sequence[str]]
+) -> GenerateResult:
+    """``result`` with its output cut at the earliest stop sequence, if any."""
+    if not stops:
+        return result
+    output = truncate_at_stop(result.output, stops)
+    if output is None:
+        return result
+    return replace(result, output=output)
+
+
+class StopScanner:
+    """Finds stop sequences in text that arrives in pieces.
+
+    ``feed`` returns the text that is safe to deliver. The longest tail that
+    could still grow into a stop sequence is held back until the next piece
+    shows whether it does, so a match split across chunks is found and
+    nothing past it is ever delivered.
+    """
+
+    def __init__(self, stops: Sequence[str]):
+        self.stops: List[str] = [s for s in stops if s]
+        self._hold = max((len(s) for s in self.stops), default=1) - 1
+        self._pending = ""
+        self.matched = False
+
+    def _partial(self, text: str) -> int:
+        """Length of the longest suffix of ``text`` that starts a stop sequence."""
+        for n in range(min(self._hold, len(text)), 0, -1):
+            tail = text[-n:]
+            if any(s.startswith(tail) for s in self.stops):
+                return n
+        return 0
+
+    def feed(self, text: str) -> str:
+        text = self._pending + text
+        # Earlier pieces had no match, so scanning the held tail plus the new
+        # text finds every match that ends in this piece
+        cut = truncate_at_stop(text, self.stops)
+        if cut is not None:
+            self._pending = ""
+            self.matched = True
+            return cut
+        keep = self._partial(text)
+        self._pending = text[len(text) - keep :] if keep else ""
+        return text[: len(text) - keep]
+
+    def flush(self) -> str:
+        """The held-back tail, once no more text will arrive."""
+        text, self._pending = self._pending, ""
+        return text
+
+
+def _close(it) -> None:
+    close = getattr(it, "close", None)
+    if close is not None:
+        close()
+
+
+def stop_at(
+    chunks: Iterable[StreamChunk], stops: Sequence[str]
+) -> Iterator[StreamChunk]:
+    """Re-yield ``chunks`` up to the first stop sequence in their text.
+
+    On a match the output is cut right before it, the upstream stream is
+    closed at once (so the backend stops generating) and ``done`` follows.
+    """
+    scanner = StopScanner(stops)
+    it = iter(chunks)
+    try:
+        for chunk in it:
+            if chunk.type == "token" and isinstance(chunk.value, str):
+                text = scanner.feed(chunk.value)
+                if scanner.matched:
+                    _close(it)
+                    if text:
+                        yield StreamChunk(type="token", value=text)
+                    yield StreamChunk(type="done")
+                    return
+                if text:
+                    yield StreamChunk(type="token", value=text)
+                continue
+            tail = scanner.flush()
+            if tail:
+                yield StreamChunk(type="token", value=tail)
+            yield chunk
+        tail = scanner.flush()
+        if tail:
+            yield StreamChunk(type="token", value=tail)
+    finally:
+        _close(it)
+
+
+async def astop_at(
+    chunks: AsyncIterator[StreamChunk], stops: Sequence[str]
+) -> AsyncIterator[StreamChunk]:
+    scanner = StopScanner(stops)
+    aclose = getattr(chunks, "aclose", None)
+    try:
+        async for chunk in chunks:
+            if chunk.type == "token" and isinstance(chunk.value, str):
+                text = scanner.feed(chunk.value)
+                if scanner.matched:
+                    if aclose is not None:
+                        await aclose()
+                    if text:
+                        yield StreamChunk(type="token", value=text)
+                    yield StreamChunk(type="done")
+                    return
+                if text:
+                    yield StreamChunk(type="token", value=text)
+                continue
+            tail = scanner.flush()
+            if tail:
+                yield StreamChunk(type="token", value=tail)
+            yield chunk
+        tail = scanner.flush()
+        if tail:
+            yield StreamChunk(type="token", value=tail)
+    finally:
+        if aclose is not None:
+            await aclose()
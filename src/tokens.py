@@ -0,0 +1,197 @@
+import re
+import threading
+import warnings
+from dataclasses import replace
+from functools import lru_cache
+from typing import Any, List, Literal, Optional, Sequence
+from .conversation import Conversation
+from .errors import ContextWindowExceededError
+from .types import InternalRequest, Message
+
+TrimStrategy = Literal["drop_oldest"]
+
+# Tokens a chat template spends on each message besides its content
+MESSAGE_OVERHEAD = 4
+
+# Context windows (in tokens) of common model families, guessed from the model
+# name: a request that exceeds one is sent with a warning, see fit_context.
+_family_windows: dict[str, int] = {
+    "llama2": 4096,
+    "llama3": 8192,
+    "llama3.1": 131072,
+    "llama3.2": 131072,
+    "llama3.3": 131072,
+    "mistral": 32768,
+    "mistral-nemo": 131072,
+    "mixtral": 32768,
+    "gemma": 8192,
+    "gemma2": 8192,
+    "qwen2": 32768,
+    "qwen2.5": 32768,
+    "phi3": 4096,
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+}
+# Windows registered with register_context_window; enforced like a window
+# reported by the backend.
+_context_windows: dict[str, int] = {}
+_windows_lock = threading.Lock()
+
+# A context size in the name ("gpt-4-32k", "phi3:14b-medium-128k-instruct")
+_SIZE_SUFFIX = re.compile(r"[-:_](\d+)k(?=[-_.:]|$)")
+
+
+def register_context_window(model_prefix: str, tokens: int) -> None:
+    with _windows_lock:
+        _context_windows[model_prefix] = tokens
+
+
+def _lookup(name: str, windows: dict[str, int]) -> Optional[int]:
+    """Window of the longest prefix that ``name`` is, or continues with "-".
+
+    "gpt-4-0613" is a gpt-4, but "gpt-4.1" and "gemma3" are families of their
+    own and don't inherit the window of "gpt-4" or "gemma".
+    """
+    best = None
+    for prefix, tokens in windows.items():
+        if name.startswith(prefix) and name[len(prefix) : len(prefix) + 1] in ("", "-"):
+            if best is None or len(prefix) > len(best[0]):
+                best = (prefix, tokens)
+    return best[1] if best is not None else None
+
+
+def _guessed_window(model: str) -> Optional[int]:
+    size = _SIZE_SUFFIX.search(model)
+    if size is not None:
+        return int(size.group(1)) * 1024
+    return _lookup(model.split(":", 1)[0], _family_windows)
+
+
+def context_window(model: str) -> Optional[int]:
+    """The context window of ``model`` in tokens, or None if unknown.
+
+    Registered windows come first; otherwise it is guessed from a size in the
+    name or the model's family, matched on the name without its ":tag".
+    """
+    window = _lookup(model.split(":", 1)[0], _context_windows)
+    return window if window is not None else _guessed_window(model)
+
+
+def estimate_tokens(text: str) -> int:
+    """A fast, slightly pessimistic token count for ``text``.
+
+    BPE vocabularies average about four characters per token on English
+    text; other scripts are closer to one token per character.
+    """
+    if text.isascii():
+        return (len(text) + 3) // 4
+    wide = sum(1 for c in text if ord(c) > 127)
+    return (len(text) - wide + 3) // 4 + wide
+
+
+def _estimate(message: Message) -> int:
+    return estimate_tokens(message.content) + MESSAGE_OVERHEAD
+
+
+# Estimates of a Conversation's messages are kept with it; for plain lists
+# only short messages are cached, so long contexts aren't kept alive.
+CACHE_MAX_CHARS = 4096
+_estimate_cached = lru_cache(maxsize=1024)(_estimate)
+
+
+def estimate_message(message: Message) -> int:
+    if len(message.content) <= CACHE_MAX_CHARS:
+        return _estimate_cached(message)
+    return _estimate(message)
+
+
+def estimate_messages(messages: Sequence[Message]) -> int:
+    if isinstance(messages, Conversation):
+        return sum(messages.memo("tokens", _estimate))
+    return sum(estimate_message(m) for m in messages)
+
+
+def usage_tokens(resp: Any) -> Optional[int]:
+    """Generated-token count reported in a backend response, if any."""
+    if not isinstance(resp, dict):
+        return None
+    usage = resp.get("usage")
+    if isinstance(usage, dict):
+        for key in ("completion_tokens", "output_tokens"):
+            if isinstance(usage.get(key), int):
+                return usage[key]
+    # Ollama reports the generated tokens as eval_count
+    for key in ("eval_count", "tokens"):
+        if isinstance(resp.get(key), int):
+            return resp[key]
+    return None
+
+
+def _drop_oldest(messages: Sequence[Message], budget: int) -> Optional[List[Message]]:
+    # Keep every system message and the latest turn; drop the oldest others
+    last = len(messages) - 1
+    kept = {i for i, m in enumerate(messages) if m.role == "system" or i == last}
+    droppable = [i for i in range(len(messages)) if i not in kept]
+    used = sum(estimate_message(messages[i]) for i in kept)
+    if used > budget:
+        return None
+    keep_from = len(droppable)
+    for j in range(len(droppable) - 1, -1, -1):
+        cost = estimate_message(messages[droppable[j]])
+        if used + cost > budget:
+            break
+        used += cost
+        keep_from = j
+    selected = kept.union(droppable[keep_from:])
+    return [m for i, m in enumerate(messages) if i in selected]
+
+
+def fit_context(
+    req: InternalRequest,
+    strategy: Optional[TrimStrategy] = None,
+    window: Optional[int] = None,
+) -> InternalRequest:
+    """Check ``req`` against its model's context window before dispatch.
+
+    The prompt estimate plus ``options.max_tokens`` must fit. Without a
+    strategy an oversized request raises ContextWindowExceededError;
+    ``"drop_oldest"`` drops the oldest non-system turns until it fits.
+    ``window`` is the window reported by the backend, if known; otherwise a
+    registered window is used. A window only guessed from the model name is
+    not enforced: an oversized request is trimmed if a strategy asks for it,
+    and otherwise sent with a warning. Unknown windows are not checked.
+    """
+    guessed = False
+    if window is None:
+        window = _lookup(req.model.split(":", 1)[0], _context_windows)
+    if window is None:
+        window = _guessed_window(req.model)
+        guessed = True
+    if window is None:
+        return req
+    reserved = (req.options.max_tokens if req.options is not None else None) or 0
+    budget = window - reserved
+    prompt = estimate_messages(req.messages)
+    if prompt <= budget:
+        return req
+    if strategy == "drop_oldest":
+        trimmed = _drop_oldest(req.messages, budget)
+        if trimmed is not None:
+            return replace(req, messages=trimmed)
+    if guessed:
+        warnings.warn(
+            f"prompt of ~{prompt} tokens plus {reserved} for the reply may "
+            f"exceed the ~{window}-token context window guessed for "
+            f"{req.model!r}; register_context_window sets the real one",
+            stacklevel=2,
+        )
+        return req
+    raise ContextWindowExceededError(
+        f"prompt of ~{prompt} tokens plus {reserved} for the reply exceeds "
+        f"the {window}-token context window of {req.model!r}",
+        prompt_tokens=prompt,
+        context_window=window,
+    )
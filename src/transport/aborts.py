@@ -0,0 +1,61 @@
+"""Aborting responses that another thread is reading.
+
+A background reader (``src.readahead``) runs the stream inside an
+``AbortScope``. Transports register an abort callback for every response
+they open on that thread, so a consumer that goes away can drop the
+connection at once instead of after the reader's pending read returns.
+Only the standard library is used: the core imports this without the HTTP
+stack.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+Abort = Callable[[], None]
+
+_local = threading.local()
+
+
+class AbortScope:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._aborts: List[Abort] = []
+        self.aborted = False
+
+    def add(self, abort: Abort) -> None:
+        with self._lock:
+            if not self.aborted:
+                self._aborts.append(abort)
+                return
+        abort()  # the consumer is already gone
+
+    def remove(self, abort: Abort) -> None:
+        with self._lock:
+            if abort in self._aborts:
+                self._aborts.remove(abort)
+
+    def abort(self) -> None:
+        """Run every registered callback; later registrations run at once."""
+        with self._lock:
+            self.aborted = True
+            aborts, self._aborts = self._aborts, []
+        for abort in aborts:
+            try:
+                abort()
+            except Exception:
+                pass  # the reader sees the connection fail either way
+
+    @contextmanager
+    def active(self) -> Iterator["AbortScope"]:
+        """Make this the scope of the current thread while the block runs."""
+        previous = getattr(_local, "scope", None)
+        _local.scope = self
+        try:
+            yield self
+        finally:
+            _local.scope = previous
+
+
+def current_scope() -> Optional[AbortScope]:
+    return getattr(_local, "scope", None)
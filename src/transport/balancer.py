@@ -0,0 +1,334 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+from ..types import BalancerConfig
+from .resilience import is_backend_failure
+
+T = TypeVar("T")
+
+_EMPTY = object()  # marks a stream that ended before its first chunk
+_EWMA_ALPHA = 0.3
+
+
+class _Replica:
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.outstanding = 0
+        self.ewma: Optional[float] = None
+        self.failures = 0
+        self.ejected_until = 0.0
+
+
+class EndpointPool:
+    """Balances calls across replica endpoints, with optional hedging.
+
+    ``call``/``stream`` take a function of the chosen endpoint. Replicas are
+    picked by least outstanding requests or by EWMA latency weighted by load;
+    replicas failing repeatedly are ejected for a while. With hedging enabled a
+    second replica is tried when the first has not answered (generate) or
+    produced its first chunk (stream) within a percentile of recent latencies;
+    the first to answer wins. A losing stream is closed and a losing async
+    call cancelled; a losing sync call can't be interrupted, so it runs to
+    completion on its thread (still counted as outstanding on its replica)
+    and its result is dropped.
+    """
+
+    def __init__(self, endpoints: List[str], config: Optional[BalancerConfig] = None):
+        if not endpoints:
+            raise ValueError("EndpointPool requires at least one endpoint")
+        self.config = config or BalancerConfig()
+        self._replicas = [_Replica(endpoint) for endpoint in endpoints]
+        self._lock = threading.Lock()
+        self._latencies = {"generate": deque(maxlen=512), "stream": deque(maxlen=512)}
+        self._hedges = 0
+
+    @property
+    def endpoints(self) -> List[str]:
+        return [r.endpoint for r in self._replicas]
+
+    def _pick(self, exclude: Optional[_Replica] = None) -> _Replica:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [r for r in self._replicas if r is not exclude]
+            healthy = [r for r in candidates if r.ejected_until <= now]
+            # With every replica ejected, keep serving rather than failing
+            candidates = healthy or candidates
+            if self.config.strategy == "ewma":
+                replica = min(
+                    candidates, key=lambda r: (r.ewma or 0.0) * (r.outstanding + 1)
+                )
+            else:
+                replica = min(candidates, key=lambda r: (r.outstanding, r.ewma or 0.0))
+            replica.outstanding += 1
+            return replica
+
+    def _release(self, replica: _Replica) -> None:
+        with self._lock:
+            replica.outstanding -= 1
+
+    def _record(self, replica: _Replica, kind: str, latency: Optional[float]) -> None:
+        with self._lock:
+            if latency is None:
+                replica.failures += 1
+                if replica.failures >= self.config.eject_after_failures:
+                    replica.ejected_until = (
+                        time.monotonic() + self.config.eject_ms / 1000
+                    )
+                return
+            replica.failures = 0
+            replica.ejected_until = 0.0
+            if replica.ewma is None:
+                replica.ewma = latency
+            else:
+                replica.ewma = _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * replica.ewma
+            self._latencies[kind].append(latency)
+
+    def _hedge_delay(self, kind: str) -> Optional[float]:
+        if not self.config.hedge or len(self._replicas) < 2:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies[kind])
+        if len(samples) < self.config.hedge_min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * self.config.hedge_percentile))
+        return samples[index]
+
+    def _attempt(self, replica: _Replica, kind: str, attempt: Callable[[str], T]) -> T:
+        start = time.monotonic()
+        try:
+            value = attempt(replica.endpoint)
+        except BaseException as e:
+            # A 4xx says the request was wrong, not that the replica is sick
+            if is_backend_failure(e):
+                self._record(replica, kind, None)
+            raise
+        self._record(replica, kind, time.monotonic() - start)
+        return value
+
+    def _race(
+        self,
+        kind: str,
+        attempt: Callable[[str], T],
+        discard: Callable[[_Replica, T], None],
+    ) -> tuple:
+        """Run ``attempt`` on one replica, hedging to a second if it is slow.
+
+        Returns ``(replica, value)`` of the winner. The replica stays acquired;
+        the caller releases it. A losing value is passed to ``discard``.
+        """
+        first = self._pick()
+        delay = self._hedge_delay(kind)
+        if delay is None:
+            try:
+                return first, self._attempt(first, kind, attempt)
+            except BaseException:
+                self._release(first)
+                raise
+
+        results: queue.Queue = queue.Queue()
+        claim = threading.Lock()
+        won = []
+
+        def run(replica: _Replica) -> None:
+            try:
+                value = self._attempt(replica, kind, attempt)
+            except BaseException as e:
+                self._release(replica)
+                results.put((False, replica, e))
+                return
+            with claim:
+                winner = not won
+                won.append(replica)
+            if winner:
+                results.put((True, replica, value))
+            else:
+                discard(replica, value)
+
+        threading.Thread(target=run, args=(first,), daemon=True).start()
+        launched, failures, hedged = 1, [], False
+        while True:
+            try:
+                ok, replica, value = results.get(timeout=None if hedged else delay)
+            except queue.Empty:
+                hedged = True
+                with self._lock:
+                    self._hedges += 1
+                second = self._pick(exclude=first)
+                threading.Thread(target=run, args=(second,), daemon=True).start()
+                launched += 1
+                continue
+            if ok:
+                return replica, value
+            failures.append(value)
+            if len(failures) == launched:
+                raise failures[0]
+
+    def call(self, attempt: Callable[[str], T]) -> T:
+        def discard(replica: _Replica, value: T) -> None:
+            self._release(replica)
+
+        replica, value = self._race("generate", attempt, discard)
+        self._release(replica)
+        return value
+
+    def stream(self, attempt: Callable[[str], Iterable[T]]) -> Iterator[T]:
+        def open_stream(endpoint: str):
+            it = iter(attempt(endpoint))
+            return next(it, _EMPTY), it
+
+        def discard(replica: _Replica, opened) -> None:
+            close = getattr(opened[1], "close", None)
+            if close is not None:
+                close()
+            self._release(replica)
+
+        replica, (first, it) = self._race("stream", open_stream, discard)
+        try:
+            if first is _EMPTY:
+                return
+            yield first
+            yield from it
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+            self._release(replica)
+
+    async def _aattempt(
+        self, replica: _Replica, kind: str, attempt: Callable[[str], Awaitable[T]]
+    ) -> T:
+        import asyncio  # not needed by sync-only callers
+
+        start = time.monotonic()
+        try:
+            value = await attempt(replica.endpoint)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            if is_backend_failure(e):
+                self._record(replica, kind, None)
+            raise
+        self._record(replica, kind, time.monotonic() - start)
+        return value
+
+    async def _arace(
+        self,
+        kind: str,
+        attempt: Callable[[str], Awaitable[T]],
+        discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    ) -> tuple:
+        import asyncio
+
+        first = self._pick()
+        delay = self._hedge_delay(kind)
+        if delay is None:
+            try:
+                return first, await self._aattempt(first, kind, attempt)
+            except BaseException:
+                self._release(first)
+                raise
+
+        tasks = {asyncio.ensure_future(self._aattempt(first, kind, attempt)): first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                with self._lock:
+                    self._hedges += 1
+                second = self._pick(exclude=first)
+                tasks[asyncio.ensure_future(self._aattempt(second, kind, attempt))] = (
+                    second
+                )
+            pending = set(tasks)
+            failures = []
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return tasks.pop(task), task.result()
+                    failures.append(task.exception())
+                    self._release(tasks.pop(task))
+            raise failures[0]
+        finally:
+            # Cancel and release the losers (or everything, if we were cancelled)
+            for task, replica in tasks.items():
+                if not task.done():
+                    task.cancel()
+                elif (
+                    discard is not None
+                    and not task.cancelled()
+                    and task.exception() is None
+                ):
+                    await discard(task.result())
+                self._release(replica)
+
+    async def acall(self, attempt: Callable[[str], Awaitable[T]]) -> T:
+        replica, value = await self._arace("generate", attempt)
+        self._release(replica)
+        return value
+
+    async def astream(
+        self, attempt: Callable[[str], AsyncIterable[T]]
+    ) -> AsyncIterator[T]:
+        import asyncio
+
+        async def open_stream(endpoint: str):
+            it = attempt(endpoint).__aiter__()
+            try:
+                return await it.__anext__(), it
+            except StopAsyncIteration:
+                return _EMPTY, it
+            except BaseException:
+                # Cancelled as the losing hedge, or failed: close the response
+                aclose = getattr(it, "aclose", None)
+                if aclose is not None:
+                    await asyncio.shield(aclose())
+                raise
+
+        async def discard(opened) -> None:
+            aclose = getattr(opened[1], "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+        replica, (first, it) = await self._arace("stream", open_stream, discard)
+        try:
+            if first is _EMPTY:
+                return
+            yield first
+            async for item in it:
+                yield item
+        finally:
+            aclose = getattr(it, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            self._release(replica)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "hedges": self._hedges,
+                "replicas": [
+                    {
+                        "endpoint": r.endpoint,
+                        "outstanding": r.outstanding,
+                        "ewma_s": r.ewma,
+                        "failures": r.failures,
+                        "ejected": r.ejected_until > now,
+                    }
+                    for r in self._replicas
+                ],
+            }
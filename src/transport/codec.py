@@ -0,0 +1,69 @@
+import json
+from functools import lru_cache
+from typing import Any, Sequence
+from ..conversation import Conversation
+from ..types import Message
+
+# orjson is several times faster than the stdlib for both directions; it is
+# used when installed (pip install imrabo-ai-sdk[fast-json]).
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+else:  # pragma: no cover - depends on the environment
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+    def loads(data: bytes | str) -> Any:
+        return json.loads(data)
+
+
+# Messages repeat across the turns of a chat. A Conversation keeps each
+# message's encoding with its history, so a request re-sending it only joins
+# bytes. Plain lists share a small cache of short messages (system prompts,
+# short turns); long ones, like retrieved documents, are encoded per request
+# rather than kept alive by a cache.
+CACHE_MAX_CHARS = 4096
+
+
+def _encode(message: Message) -> bytes:
+    return dumps({"role": message.role, "content": message.content})
+
+
+_encode_cached = lru_cache(maxsize=1024)(_encode)
+
+
+def encode_message(message: Message) -> bytes:
+    if len(message.content) <= CACHE_MAX_CHARS:
+        return _encode_cached(message)
+    return _encode(message)
+
+
+def encode_messages(messages: Sequence[Message]) -> bytes:
+    if isinstance(messages, Conversation):
+        parts = messages.memo("json", _encode)
+    else:
+        parts = [encode_message(m) for m in messages]
+    return b"[" + b",".join(parts) + b"]"
+
+
+def encode_request(model: str, messages: Sequence[Message], **fields: Any) -> bytes:
+    """The JSON body ``{"model": ..., "messages": [...], **fields}`` as bytes."""
+    body = b'{"model":' + dumps(model) + b',"messages":' + encode_messages(messages)
+    if fields:
+        body += b"," + dumps(fields)[1:-1]
+    return body + b"}"
@@ -0,0 +1,76 @@
+import gzip
+import time
+from typing import Callable, Optional
+from ..instrumentation import get_instrumentation
+from ..types import CompressionConfig
+
+# Levels favouring speed: a prompt is compressed once per call, on the hot
+# path. gzip level 1 compresses a JSON prompt about twice as fast as zlib's
+# default of 6, for a body a few percent larger; zstd's default of 3 is fast.
+DEFAULT_LEVELS = {"gzip": 1, "zstd": 3}
+
+
+def _gzip(level: int) -> Callable[[bytes], bytes]:
+    # mtime=0 keeps the output (and so retried bodies) byte-identical
+    return lambda data: gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _zstd(level: int) -> Callable[[bytes], bytes]:
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "zstd compression needs the zstandard package "
+            "(pip install imrabo-ai-sdk[zstd])"
+        ) from e
+    # ZstdCompressor objects must not be shared between threads
+    return lambda data: zstandard.ZstdCompressor(level=level).compress(data)
+
+
+class RequestCompressor:
+    """Compresses request bodies per a CompressionConfig.
+
+    Bodies under ``min_bytes`` are sent as is: for short prompts the CPU time
+    outweighs the bytes saved.
+    """
+
+    def __init__(self, config: CompressionConfig):
+        self.config = config
+        level = config.level
+        if level is None:
+            level = DEFAULT_LEVELS[config.algorithm]
+        factory = {"gzip": _gzip, "zstd": _zstd}.get(config.algorithm)
+        if factory is None:
+            raise ValueError(f"Unsupported compression: {config.algorithm!r}")
+        self._compress = factory(level)
+
+    def __call__(
+        self, content: bytes, headers: Optional[dict]
+    ) -> tuple[bytes, Optional[dict], Optional[dict]]:
+        """``(body, headers, stats)`` to send; stats is None when not compressed."""
+        config = self.config
+        if config.accept_encoding is not None:
+            headers = {**(headers or {}), "Accept-Encoding": config.accept_encoding}
+        if len(content) < config.min_bytes:
+            return content, headers, None
+        start = time.perf_counter()
+        compressed = self._compress(content)
+        seconds = time.perf_counter() - start
+        instr = get_instrumentation()
+        if instr.enabled:
+            instr.timing("compress", seconds)
+        headers = {**(headers or {}), "Content-Encoding": config.algorithm}
+        stats = {
+            "encoding": config.algorithm,
+            "original_bytes": len(content),
+            "compressed_bytes": len(compressed),
+            "ratio": len(content) / max(1, len(compressed)),
+            "seconds": seconds,
+        }
+        return compressed, headers, stats
+
+
+def request_compressor(
+    config: Optional[CompressionConfig],
+) -> Optional[RequestCompressor]:
+    return RequestCompressor(config) if config is not None else None
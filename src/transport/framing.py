@@ -0,0 +1,173 @@
+"""Incremental framing of streamed response bodies.
+
+``post_stream`` yields raw network chunks whose boundaries are arbitrary: a
+line, a JSON document or a multi-byte UTF-8 character may straddle two chunks.
+The framers here keep a persistent decoder and buffer across chunks so every
+byte is scanned once, and emit complete frames only.
+"""
+
+import codecs
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    Literal,
+    Optional,
+)
+from .codec import loads
+
+FramingMode = Literal["lines", "ndjson", "sse"]
+
+
+@dataclass(frozen=True)
+class SSEEvent:
+    data: str
+    event: Optional[str] = None
+    id: Optional[str] = None
+
+
+class LineFramer:
+    """Splits a byte stream into text lines (``\\n`` or ``\\r\\n`` terminated)."""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        # Fragments of the current, not yet terminated line. Kept as a list so
+        # a long line arriving in many chunks is joined once, not per chunk.
+        self._partial: list[str] = []
+
+    def _split(self, text: str) -> list[str]:
+        if not text:
+            return []
+        lines = text.split("\n")
+        if len(lines) == 1:
+            self._partial.append(text)
+            return []
+        if self._partial:
+            self._partial.append(lines[0])
+            lines[0] = "".join(self._partial)
+            self._partial = []
+        tail = lines.pop()
+        if tail:
+            self._partial.append(tail)
+        return [line[:-1] if line.endswith("\r") else line for line in lines]
+
+    def feed(self, data: bytes) -> list[str]:
+        return self._split(self._decoder.decode(data))
+
+    def flush(self) -> list[str]:
+        lines = self._split(self._decoder.decode(b"", final=True))
+        if self._partial:
+            last = "".join(self._partial)
+            self._partial = []
+            lines.append(last[:-1] if last.endswith("\r") else last)
+        return lines
+
+
+class NDJSONFramer:
+    """Newline-delimited JSON: one decoded document per non-blank line."""
+
+    def __init__(self):
+        self._lines = LineFramer()
+
+    def _decode(self, lines: list[str]) -> list[Any]:
+        return [loads(line) for line in lines if line.strip()]
+
+    def feed(self, data: bytes) -> list[Any]:
+        return self._decode(self._lines.feed(data))
+
+    def flush(self) -> list[Any]:
+        return self._decode(self._lines.flush())
+
+
+class SSEFramer:
+    """Server-Sent Events: one ``SSEEvent`` per blank-line terminated block."""
+
+    def __init__(self):
+        self._lines = LineFramer()
+        self._data: list[str] = []
+        self._event: Optional[str] = None
+        self._id: Optional[str] = None
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        if not self._data:
+            self._event = None
+            return None
+        event = SSEEvent(data="\n".join(self._data), event=self._event, id=self._id)
+        self._data = []
+        self._event = None
+        return event
+
+    def _events(self, lines: list[str]) -> list[SSEEvent]:
+        events = []
+        for line in lines:
+            if not line:
+                event = self._dispatch()
+                if event is not None:
+                    events.append(event)
+                continue
+            if line.startswith(":"):
+                continue
+            name, _, value = line.partition(":")
+            if value.startswith(" "):
+                value = value[1:]
+            if name == "data":
+                self._data.append(value)
+            elif name == "event":
+                self._event = value
+            elif name == "id":
+                self._id = value
+        return events
+
+    def feed(self, data: bytes) -> list[SSEEvent]:
+        return self._events(self._lines.feed(data))
+
+    def flush(self) -> list[SSEEvent]:
+        events = self._events(self._lines.flush())
+        event = self._dispatch()
+        if event is not None:
+            events.append(event)
+        return events
+
+
+_FRAMERS = {"lines": LineFramer, "ndjson": NDJSONFramer, "sse": SSEFramer}
+
+
+def make_framer(mode: FramingMode):
+    try:
+        return _FRAMERS[mode]()
+    except KeyError:
+        raise ValueError(f"Unsupported framing mode: {mode}") from None
+
+
+def iter_frames(chunks: Iterable[bytes], mode: FramingMode) -> Iterator[Any]:
+    framer = make_framer(mode)
+    it = iter(chunks)
+    try:
+        for chunk in it:
+            yield from framer.feed(chunk)
+        yield from framer.flush()
+    finally:
+        # Propagate an early exit to the transport so the response is closed
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
+
+
+async def aiter_frames(
+    chunks: AsyncIterable[bytes], mode: FramingMode
+) -> AsyncIterator[Any]:
+    framer = make_framer(mode)
+    it = chunks.__aiter__()
+    try:
+        async for chunk in it:
+            for frame in framer.feed(chunk):
+                yield frame
+        for frame in framer.flush():
+            yield frame
+    finally:
+        aclose = getattr(it, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -1,41 +1,492 @@
+import atexit
+import socket
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, Optional, Union
+from urllib.parse import urlsplit
+
 import httpx
-from typing import Optional
+
+if TYPE_CHECKING:
+    import asyncio
+
+from ..deadline import Deadline
+from ..errors import SDKError, TimeoutError, TransportError
+from ..instrumentation import Instrumentation, get_instrumentation
+from .codec import dumps, loads
+from .aborts import current_scope
+from .resilience import get_breaker
+
+# A plain number of seconds, None for no timeout, or the Deadline of the call
+Timeout = Union[float, Deadline, None]
+
+
+@dataclass(frozen=True)
+class PoolLimits:
+    max_connections: Optional[int] = 100
+    max_keepalive_connections: Optional[int] = 20
+    keepalive_expiry: Optional[float] = 5.0
+
+
+def _timeout(timeout: Timeout):
+    if isinstance(timeout, Deadline):
+        return httpx.Timeout(**timeout.phase_timeouts())
+    return timeout
+
+
+def _body(
+    headers: Optional[dict], json: Optional[dict], content: Optional[bytes]
+) -> dict:
+    """httpx arguments sending ``content`` (an encoded JSON body) or ``json``."""
+    if content is None:
+        if json is None:
+            return {"headers": headers}
+        content = dumps(json)
+    if not any(k.lower() == "content-type" for k in headers or ()):
+        headers = {**(headers or {}), "Content-Type": "application/json"}
+    return {"headers": headers, "content": content}
+
+
+def _map_error(e: httpx.HTTPError, url: str) -> SDKError:
+    if isinstance(e, httpx.TimeoutException):
+        return TimeoutError(f"request to {url} timed out ({type(e).__name__})")
+    if isinstance(e, httpx.HTTPStatusError):
+        status = e.response.status_code
+        return TransportError(f"HTTP {status} from {url}", status_code=status)
+    return TransportError(f"request to {url} failed: {e!r}")
+
+
+def _abort(resp: httpx.Response) -> None:
+    """Drop ``resp``'s connection from a thread other than the one reading it.
+
+    Shutting an HTTP/1.1 socket down wakes the blocked read, which then fails
+    on the reading thread and releases the connection there. Other responses
+    (HTTP/2 shares its connection, test transports have no socket) are
+    closed directly.
+    """
+    stream = resp.extensions.get("network_stream")
+    sock = stream.get_extra_info("socket") if stream is not None else None
+    if sock is not None and resp.http_version == "HTTP/1.1":
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+            return
+        except OSError:
+            pass
+    resp.close()
+
+
+class _Trace:
+    """httpcore ``trace`` extension reporting connect and first-byte timings."""
+
+    def __init__(self, instr: Instrumentation):
+        self.instr = instr
+        self.start = time.perf_counter()
+        self._phase_start = 0.0
+        self._connect = 0.0
+        self._ttfb_recorded = False
+
+    def __call__(self, name: str, info: dict) -> None:
+        if name.endswith(("connect_tcp.started", "start_tls.started")):
+            self._phase_start = time.perf_counter()
+        elif name.endswith(("connect_tcp.complete", "start_tls.complete")):
+            self._connect += time.perf_counter() - self._phase_start
+        elif name.endswith("send_request_headers.started") and self._connect:
+            self.instr.timing("connect", self._connect)
+            self._connect = 0.0
+        elif name.endswith("receive_response_headers.complete"):
+            self.response_started()
+
+    async def acall(self, name: str, info: dict) -> None:
+        self(name, info)
+
+    def response_started(self) -> None:
+        if not self._ttfb_recorded:
+            self._ttfb_recorded = True
+            self.instr.timing("ttfb", time.perf_counter() - self.start)
+
+
+class HTTPTransport:
+    """A long-lived HTTP client backed by a thread-safe keep-alive connection pool.
+
+    The underlying ``httpx.Client`` is created on first use and shared by every
+    request made through this transport. ``close()`` releases the pooled
+    connections; a closed transport reconnects lazily if it is used again.
+    """
+
+    def __init__(self, limits: Optional[PoolLimits] = None, http2: bool = False):
+        self.limits = limits or PoolLimits()
+        self.http2 = http2
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    def _get_client(self) -> httpx.Client:
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=self.limits.max_connections,
+                            max_keepalive_connections=self.limits.max_keepalive_connections,
+                            keepalive_expiry=self.limits.keepalive_expiry,
+                        ),
+                        http2=self.http2,
+                        timeout=None,
+                    )
+                client = self._client
+        return client
+
+    def post_json(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> dict:
+        client = self._get_client()
+        instr = get_instrumentation()
+        trace = _Trace(instr) if instr.enabled else None
+        breaker = get_breaker(url)
+        breaker.allow()
+        try:
+            resp = client.post(
+                url,
+                **_body(headers, json, content),
+                timeout=_timeout(timeout),
+                extensions={"trace": trace} if trace else None,
+            )
+            resp.raise_for_status()
+            if trace:
+                instr.count("bytes_received", len(resp.content))
+            result = loads(resp.content)
+        except httpx.HTTPError as e:
+            error = _map_error(e, url)
+            breaker.record(error)
+            raise error from e
+        except BaseException:
+            breaker.abandon()
+            raise
+        breaker.record(None)
+        return result
+
+    def post_stream(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> Iterator[bytes]:
+        """A generator that yields bytes chunks from a POST request.
+
+        This keeps the transport layer dumb: it only yields raw bytes chunks. Providers decide how to interpret them.
+        """
+        client = self._get_client()
+        instr = get_instrumentation()
+        trace = _Trace(instr) if instr.enabled else None
+        received = 0
+        breaker = get_breaker(url)
+        breaker.allow()
+        settled = False
+        try:
+            with client.stream(
+                "POST",
+                url,
+                **_body(headers, json, content),
+                timeout=_timeout(timeout),
+                extensions={"trace": trace} if trace else None,
+            ) as resp:
+                if trace:
+                    trace.response_started()
+                resp.raise_for_status()
+                # A response arrived: the endpoint is up, whatever happens next
+                breaker.record(None)
+                settled = True
+                deadline = timeout if isinstance(timeout, Deadline) else None
+                scope = current_scope()
+                abort = (lambda: _abort(resp)) if scope is not None else None
+                if scope is not None:
+                    scope.add(abort)
+                try:
+                    for chunk in resp.iter_bytes():
+                        received += len(chunk)
+                        yield chunk
+                        if deadline is not None:
+                            deadline.check()
+                finally:
+                    if scope is not None:
+                        scope.remove(abort)
+        except httpx.HTTPError as e:
+            error = _map_error(e, url)
+            if not settled:
+                breaker.record(error)
+                settled = True
+            raise error from e
+        finally:
+            if not settled:
+                breaker.abandon()
+            if trace:
+                instr.count("bytes_received", received)
+
+    def preconnect(
+        self, url: str, connections: int = 1, timeout: Timeout = 10.0
+    ) -> None:
+        """Open up to ``connections`` pooled connections to ``url``'s origin.
+
+        Sends concurrent HEAD requests; any HTTP response, whatever its status,
+        leaves a warm keep-alive connection in the pool.
+        """
+        client = self._get_client()
+
+        def touch(_: int) -> None:
+            try:
+                client.request("HEAD", url, timeout=_timeout(timeout))
+            except httpx.HTTPError as e:
+                raise _map_error(e, url) from e
+
+        if connections <= 1:
+            touch(0)
+            return
+        with ThreadPoolExecutor(max_workers=connections) as pool:
+            list(pool.map(touch, range(connections)))
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    def __enter__(self) -> "HTTPTransport":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class AsyncHTTPTransport:
+    """Async counterpart of ``HTTPTransport`` backed by ``httpx.AsyncClient``.
+
+    An ``httpx.AsyncClient`` is bound to the event loop it is first used on, so
+    shared async transports are kept per loop (see ``get_async_transport``).
+    """
+
+    def __init__(self, limits: Optional[PoolLimits] = None, http2: bool = False):
+        self.limits = limits or PoolLimits()
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # No await between the check and the assignment, so this is atomic
+        # with respect to other tasks on the same loop.
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.limits.max_connections,
+                    max_keepalive_connections=self.limits.max_keepalive_connections,
+                    keepalive_expiry=self.limits.keepalive_expiry,
+                ),
+                http2=self.http2,
+                timeout=None,
+            )
+        return self._client
+
+    async def post_json(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> dict:
+        client = self._get_client()
+        instr = get_instrumentation()
+        trace = _Trace(instr) if instr.enabled else None
+        breaker = get_breaker(url)
+        breaker.allow()
+        try:
+            resp = await client.post(
+                url,
+                **_body(headers, json, content),
+                timeout=_timeout(timeout),
+                extensions={"trace": trace.acall} if trace else None,
+            )
+            resp.raise_for_status()
+            if trace:
+                instr.count("bytes_received", len(resp.content))
+            result = loads(resp.content)
+        except httpx.HTTPError as e:
+            error = _map_error(e, url)
+            breaker.record(error)
+            raise error from e
+        except BaseException:
+            breaker.abandon()
+            raise
+        breaker.record(None)
+        return result
+
+    async def post_stream(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> AsyncIterator[bytes]:
+        client = self._get_client()
+        instr = get_instrumentation()
+        trace = _Trace(instr) if instr.enabled else None
+        received = 0
+        breaker = get_breaker(url)
+        breaker.allow()
+        settled = False
+        try:
+            async with client.stream(
+                "POST",
+                url,
+                **_body(headers, json, content),
+                timeout=_timeout(timeout),
+                extensions={"trace": trace.acall} if trace else None,
+            ) as resp:
+                if trace:
+                    trace.response_started()
+                resp.raise_for_status()
+                # A response arrived: the endpoint is up, whatever happens next
+                breaker.record(None)
+                settled = True
+                deadline = timeout if isinstance(timeout, Deadline) else None
+                async for chunk in resp.aiter_bytes():
+                    received += len(chunk)
+                    yield chunk
+                    if deadline is not None:
+                        deadline.check()
+        except httpx.HTTPError as e:
+            error = _map_error(e, url)
+            if not settled:
+                breaker.record(error)
+                settled = True
+            raise error from e
+        finally:
+            if not settled:
+                breaker.abandon()
+            if trace:
+                instr.count("bytes_received", received)
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    async def __aenter__(self) -> "AsyncHTTPTransport":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+
+# Shared transports, one per origin (scheme, host, port), so every provider
+# talking to the same backend reuses the same connection pool.
+_transports: dict[tuple, HTTPTransport] = {}
+_transports_lock = threading.Lock()
+_default_limits = PoolLimits()
+_default_http2 = False
+
+
+def _origin(url: str) -> tuple:
+    parts = urlsplit(url)
+    return (parts.scheme, parts.hostname, parts.port)
+
+
+def configure_pool(
+    limits: Optional[PoolLimits] = None, http2: Optional[bool] = None
+) -> None:
+    """Set the pool settings used for shared transports created from now on."""
+    global _default_limits, _default_http2
+    if limits is not None:
+        _default_limits = limits
+    if http2 is not None:
+        _default_http2 = http2
+
+
+def get_transport(url: str) -> HTTPTransport:
+    key = _origin(url)
+    transport = _transports.get(key)
+    if transport is None:
+        with _transports_lock:
+            transport = _transports.get(key)
+            if transport is None:
+                transport = HTTPTransport(limits=_default_limits, http2=_default_http2)
+                _transports[key] = transport
+    return transport
+
+
+# Async clients are bound to the event loop they were created on, so each
+# loop keeps its own transports, keyed by origin
+_PerLoop = dict[tuple, AsyncHTTPTransport]
+_async_transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _PerLoop]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_transport(url: str) -> AsyncHTTPTransport:
+    """Return the shared async transport for ``url``'s origin on the running loop."""
+    import asyncio  # not needed by sync-only callers
+
+    loop = asyncio.get_running_loop()
+    per_loop = _async_transports.get(loop)
+    if per_loop is None:
+        per_loop = _async_transports[loop] = {}
+    key = _origin(url)
+    transport = per_loop.get(key)
+    if transport is None:
+        transport = per_loop[key] = AsyncHTTPTransport(
+            limits=_default_limits, http2=_default_http2
+        )
+    return transport
+
+
+async def aclose_all() -> None:
+    """Close the shared async transports of the running loop."""
+    import asyncio
+
+    per_loop = _async_transports.pop(asyncio.get_running_loop(), {})
+    for transport in per_loop.values():
+        await transport.aclose()
+
+
+def close_all() -> None:
+    with _transports_lock:
+        transports = list(_transports.values())
+        _transports.clear()
+    for transport in transports:
+        transport.close()
+
+
+atexit.register(close_all)
 
 
 def post_json(
     url: str,
     headers: Optional[dict] = None,
     json: Optional[dict] = None,
-    timeout: Optional[float] = None,
+    timeout: Timeout = None,
+    content: Optional[bytes] = None,
 ) -> dict:
-    try:
-        with httpx.Client(timeout=timeout) as client:
-            resp = client.post(url, headers=headers, json=json)
-            resp.raise_for_status()
-            return resp.json()
-    except httpx.TimeoutException as e:
-        raise RuntimeError("timeout") from e
-    except httpx.HTTPError as e:
-        raise RuntimeError("http error") from e
+    return get_transport(url).post_json(
+        url, headers=headers, json=json, timeout=timeout, content=content
+    )
 
 
 def post_stream(
     url: str,
     headers: Optional[dict] = None,
     json: Optional[dict] = None,
-    timeout: Optional[float] = None,
-):
-    """A generator that yields bytes chunks from a POST request.
-
-    This keeps the transport layer dumb: it only yields raw bytes chunks. Providers decide how to interpret them.
-    """
-    try:
-        with httpx.Client(timeout=timeout) as client:
-            with client.stream("POST", url, headers=headers, json=json) as resp:
-                resp.raise_for_status()
-                for chunk in resp.iter_bytes():
-                    yield chunk
-    except httpx.TimeoutException as e:
-        raise RuntimeError("timeout") from e
-    except httpx.HTTPError as e:
-        raise RuntimeError("http error") from e
+    timeout: Timeout = None,
+    content: Optional[bytes] = None,
+) -> Iterator[bytes]:
+    return get_transport(url).post_stream(
+        url, headers=headers, json=json, timeout=timeout, content=content
+    )
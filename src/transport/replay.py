@@ -0,0 +1,435 @@
+"""Recording of HTTP exchanges to an append-only file, and their replay.
+
+File layout: an 8-byte magic, then records appended one after another. Each
+record is a fixed header (see ``_RECORD``), the request URL, a table of
+``(size, delay_us)`` pairs with one entry per response chunk, and the chunk
+bytes back to back. ``delay_us`` is the time since the previous chunk (for
+the first one, since the request was sent), so replay reproduces both chunk
+boundaries and timing. A generate() exchange is a single chunk holding the
+JSON body. A stream the client closed early (a stop sequence, a consumer
+leaving the loop) is recorded up to that point and flagged, and replays end
+there too. Readers map the file and index it in one pass; a record cut short
+by a crash is ignored.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ..deadline import Deadline
+from ..errors import ProviderError, TransportError
+from .codec import dumps, loads
+from .http import Timeout, get_async_transport, get_transport
+
+MAGIC = b"IMRREC1\n"
+
+# body length, request key (sha256), HTTP status (0: success), flags, url
+# length, chunk count
+_RECORD = struct.Struct("<I32sHBHI")
+CLIENT_CLOSED = 0x01  # flag: the client closed the stream before its end
+_CHUNK = struct.Struct("<II")
+
+Chunks = List[Tuple[bytes, float]]
+
+
+def exchange_key(url: str, content: bytes) -> bytes:
+    """Identifies a request by URL path and body; replicas share recordings."""
+    return hashlib.sha256(urlsplit(url).path.encode() + b"\0" + content).digest()
+
+
+def _encode(content, json) -> bytes:
+    return content if content is not None else dumps(json)
+
+
+class ExchangeWriter:
+    """Appends exchanges to a recording file; safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+
+    def append(
+        self,
+        url: str,
+        content: bytes,
+        status: int,
+        chunks: Chunks,
+        client_closed: bool = False,
+    ) -> None:
+        url_bytes = url.encode()
+        table = b"".join(
+            _CHUNK.pack(len(data), min(int(delay * 1e6), 0xFFFFFFFF))
+            for data, delay in chunks
+        )
+        body = url_bytes + table + b"".join(data for data, _ in chunks)
+        header = _RECORD.pack(
+            len(body),
+            exchange_key(url, content),
+            status,
+            CLIENT_CLOSED if client_closed else 0,
+            len(url_bytes),
+            len(chunks),
+        )
+        # One write per record, so concurrent writers never interleave
+        with self._lock:
+            self._file.write(header + body)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Exchange:
+    __slots__ = ("url", "status", "chunks", "client_closed")
+
+    def __init__(
+        self,
+        url: str,
+        status: int,
+        chunks: List[Tuple[memoryview, float]],
+        client_closed: bool = False,
+    ):
+        self.url = url
+        self.status = status
+        self.chunks = chunks
+        self.client_closed = client_closed
+
+
+class ExchangeLog:
+    """A memory-mapped recording, indexed by request.
+
+    Chunk data stays in the mapping until it is replayed. Exchanges recorded
+    several times for the same request are served in turn.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index: dict[bytes, List[Exchange]] = {}
+        self._turns: dict[bytes, int] = {}
+        self._lock = threading.Lock()
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(MAGIC) or f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a recording")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._load(memoryview(self._map))
+
+    def _load(self, view: memoryview) -> None:
+        pos = len(MAGIC)
+        while pos + _RECORD.size <= len(view):
+            length, key, status, flags, url_len, count = _RECORD.unpack_from(view, pos)
+            start = pos + _RECORD.size
+            if start + length > len(view):
+                break  # the last record was cut short
+            url = bytes(view[start : start + url_len]).decode()
+            table = start + url_len
+            data = table + count * _CHUNK.size
+            chunks = []
+            for i in range(count):
+                size, delay_us = _CHUNK.unpack_from(view, table + i * _CHUNK.size)
+                chunks.append((view[data : data + size], delay_us / 1e6))
+                data += size
+            exchange = Exchange(url, status, chunks, bool(flags & CLIENT_CLOSED))
+            self._index.setdefault(key, []).append(exchange)
+            pos = start + length
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._index.values())
+
+    def __iter__(self) -> Iterator[Exchange]:
+        for exchanges in self._index.values():
+            yield from exchanges
+
+    def lookup(self, url: str, content: bytes) -> Exchange:
+        key = exchange_key(url, content)
+        exchanges = self._index.get(key)
+        if not exchanges:
+            raise ProviderError(
+                f"no recorded exchange for {urlsplit(url).path} in {self.path}",
+                "replay",
+            )
+        with self._lock:
+            turn = self._turns.get(key, 0)
+            self._turns[key] = turn + 1
+        return exchanges[turn % len(exchanges)]
+
+
+_writers: dict[str, ExchangeWriter] = {}
+_logs: dict[str, ExchangeLog] = {}
+_files_lock = threading.Lock()
+
+
+def get_writer(path: str) -> ExchangeWriter:
+    path = os.path.abspath(path)
+    with _files_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = ExchangeWriter(path)
+        return writer
+
+
+def open_log(path: str) -> ExchangeLog:
+    path = os.path.abspath(path)
+    with _files_lock:
+        log = _logs.get(path)
+        if log is None:
+            log = _logs[path] = ExchangeLog(path)
+        return log
+
+
+def close_recordings() -> None:
+    """Close recording files and forget loaded replays (they are re-read on next use)."""
+    with _files_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+        _logs.clear()
+    for writer in writers:
+        writer.close()
+
+
+def _close(it) -> None:
+    close = getattr(it, "close", None)
+    if close is not None:
+        close()
+
+
+def _status_error(status: int, url: str) -> TransportError:
+    return TransportError(f"HTTP {status} from {url}", status_code=status)
+
+
+class RecordingTransport:
+    """Passes requests to the shared transport of each URL and records them."""
+
+    def __init__(self, writer: ExchangeWriter):
+        self.writer = writer
+
+    def post_json(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> dict:
+        content = _encode(content, json)
+        start = time.perf_counter()
+        try:
+            result = get_transport(url).post_json(
+                url, headers=headers, timeout=timeout, content=content
+            )
+        except TransportError as e:
+            if e.status_code is not None:
+                self.writer.append(url, content, e.status_code, [])
+            raise
+        body = dumps(result)
+        self.writer.append(url, content, 0, [(body, time.perf_counter() - start)])
+        return result
+
+    def post_stream(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> Iterator[bytes]:
+        content = _encode(content, json)
+        chunks: Chunks = []
+        last = time.perf_counter()
+        it = iter(
+            get_transport(url).post_stream(
+                url, headers=headers, timeout=timeout, content=content
+            )
+        )
+        try:
+            for data in it:
+                now = time.perf_counter()
+                chunks.append((data, now - last))
+                last = now
+                yield data
+        except TransportError as e:
+            if e.status_code is not None and not chunks:
+                self.writer.append(url, content, e.status_code, [])
+            raise
+        except GeneratorExit:
+            # Closed by the client: keep what arrived, flagged so it isn't
+            # mistaken for the backend ending the stream
+            self.writer.append(url, content, 0, chunks, client_closed=True)
+            raise
+        finally:
+            _close(it)
+        # Streams cut short by a transport failure aren't recorded: they
+        # would replay as if the backend had ended them there
+        self.writer.append(url, content, 0, chunks)
+
+    def preconnect(self, url: str, connections: int = 1, timeout: Timeout = 10.0):
+        get_transport(url).preconnect(url, connections, timeout)
+
+
+class AsyncRecordingTransport:
+    def __init__(self, writer: ExchangeWriter):
+        self.writer = writer
+
+    async def post_json(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> dict:
+        content = _encode(content, json)
+        start = time.perf_counter()
+        try:
+            result = await get_async_transport(url).post_json(
+                url, headers=headers, timeout=timeout, content=content
+            )
+        except TransportError as e:
+            if e.status_code is not None:
+                self.writer.append(url, content, e.status_code, [])
+            raise
+        body = dumps(result)
+        self.writer.append(url, content, 0, [(body, time.perf_counter() - start)])
+        return result
+
+    async def post_stream(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> AsyncIterator[bytes]:
+        content = _encode(content, json)
+        chunks: Chunks = []
+        last = time.perf_counter()
+        it = get_async_transport(url).post_stream(
+            url, headers=headers, timeout=timeout, content=content
+        )
+        try:
+            async for data in it:
+                now = time.perf_counter()
+                chunks.append((data, now - last))
+                last = now
+                yield data
+        except TransportError as e:
+            if e.status_code is not None and not chunks:
+                self.writer.append(url, content, e.status_code, [])
+            raise
+        except GeneratorExit:
+            self.writer.append(url, content, 0, chunks, client_closed=True)
+            raise
+        finally:
+            aclose = getattr(it, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        self.writer.append(url, content, 0, chunks)
+
+
+class _Replay:
+    def __init__(self, log: ExchangeLog, speed: Optional[float] = 1.0):
+        self.log = log
+        self.speed = speed
+
+    def _delay(self, seconds: float) -> float:
+        return seconds / self.speed if self.speed else 0.0
+
+
+class ReplayTransport(_Replay):
+    """Serves recorded exchanges instead of contacting the backend.
+
+    ``speed`` scales the recorded delays: 1.0 is real time, 2.0 twice as
+    fast, None no delays at all. A stream the client closed while recording
+    ends after its last recorded chunk.
+    """
+
+    def post_json(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> dict:
+        exchange = self.log.lookup(url, _encode(content, json))
+        delay = self._delay(sum(d for _, d in exchange.chunks))
+        if delay:
+            time.sleep(delay)
+        if exchange.status:
+            raise _status_error(exchange.status, url)
+        return loads(b"".join(bytes(data) for data, _ in exchange.chunks))
+
+    def post_stream(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> Iterator[bytes]:
+        exchange = self.log.lookup(url, _encode(content, json))
+        if exchange.status:
+            raise _status_error(exchange.status, url)
+        deadline = timeout if isinstance(timeout, Deadline) else None
+        for data, delay in exchange.chunks:
+            delay = self._delay(delay)
+            if delay:
+                time.sleep(delay)
+            yield bytes(data)
+            if deadline is not None:
+                deadline.check()
+
+    def preconnect(self, url: str, connections: int = 1, timeout: Timeout = 10.0):
+        pass
+
+
+class AsyncReplayTransport(_Replay):
+    async def post_json(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> dict:
+        import asyncio  # not needed by sync-only callers
+
+        exchange = self.log.lookup(url, _encode(content, json))
+        delay = self._delay(sum(d for _, d in exchange.chunks))
+        if delay:
+            await asyncio.sleep(delay)
+        if exchange.status:
+            raise _status_error(exchange.status, url)
+        return loads(b"".join(bytes(data) for data, _ in exchange.chunks))
+
+    async def post_stream(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        json: Optional[dict] = None,
+        timeout: Timeout = None,
+        content: Optional[bytes] = None,
+    ) -> AsyncIterator[bytes]:
+        import asyncio
+
+        exchange = self.log.lookup(url, _encode(content, json))
+        if exchange.status:
+            raise _status_error(exchange.status, url)
+        deadline = timeout if isinstance(timeout, Deadline) else None
+        for data, delay in exchange.chunks:
+            delay = self._delay(delay)
+            if delay:
+                await asyncio.sleep(delay)
+            yield bytes(data)
+            if deadline is not None:
+                deadline.check()
@@ -0,0 +1,355 @@
+import random
+import threading
+import time
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    TypeVar,
+)
+from urllib.parse import urlsplit
+
+import httpx
+
+from ..errors import CircuitOpenError, TimeoutError, TransportError
+from ..instrumentation import get_instrumentation
+from ..types import RetryPolicy
+
+T = TypeVar("T")
+
+_EMPTY = object()  # marks a stream that ended before its first item
+
+
+def is_retryable(e: BaseException, policy: RetryPolicy) -> bool:
+    """Whether a failed attempt may be safely repeated.
+
+    Connection failures (no status), the policy's retryable statuses and
+    connect timeouts are; other HTTP errors, read timeouts and open circuits
+    are not.
+    """
+    if isinstance(e, CircuitOpenError):
+        return False
+    if isinstance(e, TransportError):
+        return e.status_code is None or e.status_code in policy.retry_statuses
+    if isinstance(e, TimeoutError):
+        return isinstance(e.__cause__, httpx.ConnectTimeout)
+    return False
+
+
+def is_backend_failure(e: BaseException) -> bool:
+    # Failures that say something about the backend's health (not 4xx misuse)
+    if isinstance(e, CircuitOpenError):
+        return False
+    if isinstance(e, TransportError):
+        status = e.status_code
+        return status is None or status >= 500 or status == 429
+    return isinstance(e, TimeoutError)
+
+
+class RetryBudget:
+    """Caps retries to a fraction of traffic so an outage does not amplify load.
+
+    Every first attempt deposits ``ratio`` tokens and every retry withdraws
+    one; ``min_per_s`` tokens are added per second so that low traffic can
+    still retry. Tokens never exceed ``capacity``.
+    """
+
+    def __init__(
+        self, ratio: float = 0.2, min_per_s: float = 10.0, capacity: float = 100.0
+    ):
+        self.ratio = ratio
+        self.min_per_s = min_per_s
+        self.capacity = capacity
+        self._tokens = capacity
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "exhausted": 0}
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.min_per_s)
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1:
+                self._stats["exhausted"] += 1
+                return False
+            self._tokens -= 1
+            self._stats["retries"] += 1
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, tokens=self._tokens)
+
+
+class CircuitBreaker:
+    """Fails fast while an endpoint is down, then probes it for recovery.
+
+    After ``failure_threshold`` consecutive backend failures the breaker opens
+    and requests raise CircuitOpenError without touching the network. After
+    ``reset_timeout_s`` it is half-open: one probe request is let through, and
+    its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout_s: float = 10.0
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._opens = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if (
+                self._state == "open"
+                and time.monotonic() - self._opened_at >= self.reset_timeout_s
+            ):
+                return "half_open"
+            return self._state
+
+    def allow(self) -> None:
+        """Admit a request or raise CircuitOpenError."""
+        with self._lock:
+            if self._state == "closed":
+                return
+            if (
+                self._state == "open"
+                and time.monotonic() - self._opened_at >= self.reset_timeout_s
+            ):
+                self._state = "half_open"
+            if self._state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            self._rejected += 1
+        raise CircuitOpenError(f"circuit open for {self.name}")
+
+    def record(self, error: Optional[BaseException]) -> None:
+        """Record the outcome of an admitted request (None for success)."""
+        with self._lock:
+            self._probing = False
+            if error is None or not is_backend_failure(error):
+                self._state = "closed"
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self._opens += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """An admitted request ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "failures": self._failures,
+                "opens": self._opens,
+                "rejected": self._rejected,
+            }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_breaker_settings = {"failure_threshold": 5, "reset_timeout_s": 10.0}
+
+
+def configure_breakers(
+    failure_threshold: Optional[int] = None, reset_timeout_ms: Optional[int] = None
+) -> None:
+    """Set the settings of breakers created from now on."""
+    if failure_threshold is not None:
+        _breaker_settings["failure_threshold"] = failure_threshold
+    if reset_timeout_ms is not None:
+        _breaker_settings["reset_timeout_s"] = reset_timeout_ms / 1000
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """The circuit breaker of ``url``'s origin (scheme, host and port)."""
+    parts = urlsplit(url)
+    name = f"{parts.scheme}://{parts.netloc}"
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(name, **_breaker_settings)
+    return breaker
+
+
+def breaker_stats() -> dict:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.stats() for b in breakers}
+
+
+def reset_breakers() -> None:
+    with _breakers_lock:
+        _breakers.clear()
+
+
+_budget = RetryBudget()
+
+
+def configure_retry_budget(budget: Optional[RetryBudget]) -> None:
+    """Install the global retry budget (None restores the default)."""
+    global _budget
+    _budget = budget or RetryBudget()
+
+
+def get_retry_budget() -> RetryBudget:
+    return _budget
+
+
+def _backoff(
+    policy: RetryPolicy, attempt: int, error: BaseException, deadline
+) -> Optional[float]:
+    """Delay before retry number ``attempt``, or None if it must not happen."""
+    if attempt >= policy.max_attempts or not is_retryable(error, policy):
+        return None
+    # Full jitter: uniform in [0, capped exponential]
+    cap = min(policy.max_delay_ms, policy.base_delay_ms * 2 ** (attempt - 1))
+    delay = random.uniform(0, cap) / 1000
+    if deadline is not None:
+        try:
+            left = deadline.remaining()
+        except TimeoutError:
+            return None
+        if left is not None and left <= delay:
+            return None
+    if not _budget.withdraw():
+        return None
+    instr = get_instrumentation()
+    if instr.enabled:
+        instr.count("retries", 1)
+    return delay
+
+
+def _close(it) -> None:
+    close = getattr(it, "close", None)
+    if close is not None:
+        close()
+
+
+def retry_call(fn: Callable[[], T], policy: RetryPolicy, deadline=None) -> T:
+    """Call ``fn`` until it succeeds, backing off between retryable failures."""
+    _budget.deposit()
+    attempt = 1
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            delay = _backoff(policy, attempt, e, deadline)
+            if delay is None:
+                raise
+        time.sleep(delay)
+        attempt += 1
+
+
+def retry_stream(
+    fn: Callable[[], Iterable[T]], policy: RetryPolicy, deadline=None
+) -> Iterator[T]:
+    """Like ``retry_call`` for streams; once an item was yielded, errors propagate.
+
+    Retrying later would replay (or lose) output the caller has already seen.
+    """
+    _budget.deposit()
+    attempt = 1
+    while True:
+        it = iter(fn())
+        try:
+            first = next(it, _EMPTY)
+            break
+        except Exception as e:
+            _close(it)
+            delay = _backoff(policy, attempt, e, deadline)
+            if delay is None:
+                raise
+        time.sleep(delay)
+        attempt += 1
+    try:
+        if first is _EMPTY:
+            return
+        yield first
+        yield from it
+    finally:
+        _close(it)
+
+
+async def aretry_call(
+    fn: Callable[[], Awaitable[T]], policy: RetryPolicy, deadline=None
+) -> T:
+    import asyncio  # not needed by sync-only callers
+
+    _budget.deposit()
+    attempt = 1
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            delay = _backoff(policy, attempt, e, deadline)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def aretry_stream(
+    fn: Callable[[], AsyncIterable[T]], policy: RetryPolicy, deadline=None
+) -> AsyncIterator[T]:
+    import asyncio
+
+    _budget.deposit()
+    attempt = 1
+    while True:
+        it = fn().__aiter__()
+        try:
+            try:
+                first = await it.__anext__()
+            except StopAsyncIteration:
+                first = _EMPTY
+            break
+        except Exception as e:
+            aclose = getattr(it, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            delay = _backoff(policy, attempt, e, deadline)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        attempt += 1
+    try:
+        if first is _EMPTY:
+            return
+        yield first
+        async for item in it:
+            yield item
+    finally:
+        aclose = getattr(it, "aclose", None)
+        if aclose is not None:
+            await aclose()
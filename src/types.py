@@ -1,5 +1,15 @@
-from dataclasses import dataclass
-from typing import Literal, Optional, Protocol, Iterable, Any, List
+from dataclasses import dataclass, field
+from typing import (
+    Literal,
+    Optional,
+    Protocol,
+    Iterable,
+    Any,
+    List,
+    AsyncIterator,
+    Sequence,
+    Union,
+)
 
 
 @dataclass(frozen=True)
@@ -16,21 +26,131 @@ class GenerationOptions:
     stop: Optional[List[str]] = None
 
 
+@dataclass(frozen=True)
+class BalancerConfig:
+    strategy: Literal["least_outstanding", "ewma"] = "least_outstanding"
+    # Hedging: duplicate a request to a second replica when the first has not
+    # produced a first byte within the hedge_percentile of recent latencies.
+    hedge: bool = False
+    hedge_percentile: float = 0.95
+    hedge_min_samples: int = 20
+    # Health: eject a replica for eject_ms after this many consecutive failures
+    eject_after_failures: int = 3
+    eject_ms: int = 30_000
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    # Total attempts including the first; 1 disables retries
+    max_attempts: int = 3
+    # Jittered exponential backoff: uniform in [0, min(max, base * 2**n)]
+    base_delay_ms: int = 100
+    max_delay_ms: int = 2_000
+    # Statuses worth retrying; connection errors and connect timeouts always are
+    retry_statuses: tuple[int, ...] = (429, 502, 503, 504)
+
+
+@dataclass(frozen=True)
+class DeliveryConfig:
+    # Coalesced stream delivery: consecutive text tokens are merged into one
+    # token chunk, flushed once any limit is reached (None disables a limit)
+    # and always before a non-token chunk. Limits on bytes and tokens give
+    # deterministic boundaries; max_delay_ms depends on arrival times.
+    max_bytes: Optional[int] = 512
+    max_tokens: Optional[int] = 64
+    max_delay_ms: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class AdmissionConfig:
+    # Client-side limits per provider endpoint; None disables a limit
+    max_in_flight: Optional[int] = None
+    requests_per_s: Optional[float] = None
+    request_burst: Optional[int] = None  # bucket size; default max(1, rate)
+    tokens_per_s: Optional[float] = None  # prompt estimate + max_tokens
+    token_burst: Optional[int] = None
+    # Requests that can't start at once wait, highest priority first
+    max_queue: int = 1024
+    queue_timeout_ms: Optional[int] = None
+
+    def __post_init__(self):
+        for name in ("requests_per_s", "tokens_per_s"):
+            rate = getattr(self, name)
+            if rate is not None and not rate > 0:
+                raise ValueError(
+                    f"AdmissionConfig.{name} must be > 0 (or None for no limit), "
+                    f"got {rate!r}"
+                )
+
+
+@dataclass(frozen=True)
+class CompressionConfig:
+    # Request bodies of at least min_bytes are sent compressed
+    algorithm: Literal["gzip", "zstd"] = "gzip"
+    min_bytes: int = 16384
+    level: Optional[int] = None  # None: a fast level (gzip 1, zstd 3)
+    # Sent as Accept-Encoding; None keeps the HTTP client's default
+    accept_encoding: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ReplayConfig:
+    # A recording made with RuntimeConfig(record=path)
+    path: str
+    # 1.0 replays at recorded speed, 2.0 twice as fast, None without delays
+    speed: Optional[float] = 1.0
+
+    def __post_init__(self):
+        if self.speed is not None and not self.speed > 0:
+            raise ValueError(
+                f"ReplayConfig.speed must be > 0 (or None for no delays), "
+                f"got {self.speed!r}"
+            )
+
+
 @dataclass(frozen=True)
 class RuntimeConfig:
-    type: Literal["url", "kernel"]
+    type: Literal["url", "kernel", "replay"]
     endpoint: Optional[str] = None
     headers: Optional[dict[str, str]] = None
-    timeout_ms: Optional[int] = None
+    timeout_ms: Optional[int] = None  # end-to-end deadline of a call
+    provider: Optional[str] = None  # explicit provider id, e.g. "ollama"
+    connect_timeout_ms: Optional[int] = None
+    idle_timeout_ms: Optional[int] = None  # max wait for each next response chunk
+    endpoints: Optional[List[str]] = None  # replicas of `endpoint`, load balanced
+    balancing: Optional[BalancerConfig] = None
+    retry: Optional[RetryPolicy] = None  # None: RetryPolicy() defaults
+    # Ollama: how long loaded models stay resident, e.g. "30m" or -1 (forever)
+    keep_alive: Optional[Union[str, int]] = None
+    admission: Optional[AdmissionConfig] = None
+    compression: Optional[CompressionConfig] = None
+    record: Optional[str] = None  # append every exchange to this file
+    replay: Optional[ReplayConfig] = None  # required by type="replay"
 
 
 @dataclass(frozen=True)
 class GenerateRequest:
     model: str
-    messages: List[Message]
+    messages: List[Message]  # or a src.conversation.Conversation
     runtime: Optional[RuntimeConfig] = None
     tools: Optional[List[Any]] = None  # ToolDefinition: future
     options: Optional[GenerationOptions] = None
+    # Opt-in response caching; only applied to deterministic (temperature=0) requests
+    cache: bool = False
+    # Opt-in single-flight: identical in-flight requests share one upstream call
+    coalesce: bool = False
+    timeout_ms: Optional[int] = None  # overrides runtime.timeout_ms for this call
+    # Opt-in coalesced stream delivery; None yields one chunk per token
+    delivery: Optional[DeliveryConfig] = None
+    # Opt-in read-ahead: consume the stream on a background reader, buffering
+    # up to this many chunks so a slow consumer doesn't stall the network read
+    read_ahead: Optional[int] = None
+    # What to do when the prompt exceeds the model's context window: None
+    # rejects the request before dispatch, "drop_oldest" drops the oldest
+    # non-system turns until it fits
+    trim: Optional[Literal["drop_oldest"]] = None
+    # Admission queue priority (see RuntimeConfig.admission); higher goes first
+    priority: int = 0
 
 
 @dataclass(frozen=True)
@@ -40,6 +160,13 @@ class GenerateResult:
     metadata: Optional[dict[str, Any]] = None
 
 
+@dataclass(frozen=True)
+class BatchResult:
+    index: int
+    result: Optional[GenerateResult] = None
+    error: Optional[Exception] = None
+
+
 @dataclass(frozen=True)
 class StreamChunk:
     type: Literal["token", "tool_call", "done", "error"]
@@ -52,14 +179,20 @@ class Capabilities:
     tools: bool
     json: bool
     max_tokens: Optional[int] = None
+    context_window: Optional[int] = None  # tokens; None: from the model name
 
 
 @dataclass(frozen=True)
 class InternalRequest:
     model: str
-    messages: List[Message]
+    messages: Sequence[Message]  # a list, or a Conversation snapshot
     tools: Optional[List[Any]] = None
     options: Optional[GenerationOptions] = None
+    # Deadline of the call (src.deadline.Deadline); providers pass it to the transport
+    deadline: Optional[Any] = field(default=None, compare=False)
+    # Token merging for stream(); providers with merges_tokens apply it in
+    # their frame loop (src.delivery.merge_tokens), the core does otherwise
+    delivery: Optional[DeliveryConfig] = field(default=None, compare=False)
 
 
 # Provider protocol — the extension surface
@@ -71,3 +204,15 @@ class Provider(Protocol):
     def generate(self, req: InternalRequest) -> GenerateResult: ...
 
     def stream(self, req: InternalRequest) -> Iterable[StreamChunk]: ...
+
+
+# Async counterpart of Provider. Providers that only implement the sync
+# protocol are run through a thread-offload adapter by the async core.
+class AsyncProvider(Protocol):
+    id: str
+
+    def capabilities(self) -> Capabilities: ...
+
+    async def agenerate(self, req: InternalRequest) -> GenerateResult: ...
+
+    def astream(self, req: InternalRequest) -> AsyncIterator[StreamChunk]: ...
@@ -1,7 +1,16 @@
 from .types import Message, GenerationOptions
 from .errors import SDKValidationError, ValidationError
+from .conversation import Conversation
+
+def validate_messages(messages: list[Message] | Conversation) -> None:
+    if isinstance(messages, Conversation) and len(messages) > 0:
+        # Only messages appended since the last validation need checking
+        pending = messages.unvalidated()
+        if pending:
+            validate_messages(pending)
+        messages.mark_validated()
+        return
 
-def validate_messages(messages: list[Message]) -> None:
     if not isinstance(messages, list) or len(messages) == 0:
         raise SDKValidationError("messages must be a non-empty list")
     
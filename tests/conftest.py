@@ -0,0 +1,30 @@
+import pytest
+
+from src.admission import reset_admission
+from src.capabilities import reset_capabilities
+from src.providers.registry import clear_provider_cache
+from src.transport.http import close_all
+from src.transport.replay import close_recordings
+from src.transport.resilience import configure_retry_budget, reset_breakers
+
+
+@pytest.fixture(autouse=True)
+def _fresh_transports():
+    # Tests swap httpx.Client for mock clients, so pooled clients and the
+    # cached providers holding them must not leak from one test into the next.
+    # Breaker state, the retry budget, admission controllers, discovered
+    # capabilities and open recordings are process-wide for the same reason.
+    clear_provider_cache()
+    close_all()
+    reset_breakers()
+    configure_retry_budget(None)
+    reset_admission()
+    reset_capabilities()
+    close_recordings()
+    yield
+    clear_provider_cache()
+    close_all()
+    reset_breakers()
+    reset_admission()
+    reset_capabilities()
+    close_recordings()
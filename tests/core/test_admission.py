@@ -0,0 +1,215 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.admission import AdmissionController, admission_stats
+from src.core.generate import agenerate, generate
+from src.core.stream import stream
+from src.errors import AdmissionRejectedError
+from src.types import (
+    AdmissionConfig,
+    Capabilities,
+    GenerateRequest,
+    GenerateResult,
+    Message,
+    RuntimeConfig,
+    StreamChunk,
+)
+
+import src.config.resolve_provider as resolver
+
+MESSAGES = [Message(role="user", content="hi")]
+
+
+class CountingProvider:
+    id = "counting"
+    endpoint = "http://backend"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def capabilities(self) -> Capabilities:
+        return Capabilities(streaming=True, tools=False, json=False)
+
+    def generate(self, req):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return GenerateResult(output="ok")
+
+    def stream(self, req):
+        yield StreamChunk(type="token", value="a")
+        yield StreamChunk(type="token", value="b")
+        yield StreamChunk(type="done")
+
+
+def request(admission, **kwargs):
+    rc = RuntimeConfig(type="url", endpoint="http://backend", admission=admission)
+    return GenerateRequest(model="m", messages=MESSAGES, runtime=rc, **kwargs)
+
+
+def test_generate_respects_max_in_flight(monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda rc, model: provider)
+    req = request(AdmissionConfig(max_in_flight=2))
+
+    threads = [threading.Thread(target=generate, args=(req,)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert provider.peak == 2
+    (stats,) = admission_stats().values()
+    assert stats.admitted == 6
+    assert stats.in_flight == 0 and stats.queued == 0
+
+
+def test_agenerate_respects_max_in_flight(monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda rc, model: provider)
+    req = request(AdmissionConfig(max_in_flight=1))
+
+    async def main():
+        return await asyncio.gather(*(agenerate(req) for _ in range(3)))
+
+    assert [r.output for r in asyncio.run(main())] == ["ok"] * 3
+    assert provider.peak == 1
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    controller = AdmissionController(AdmissionConfig(max_in_flight=1))
+    controller.acquire()
+    order = []
+
+    def worker(name, priority):
+        controller.acquire(priority=priority)
+        order.append(name)
+        controller.release()
+
+    threads = []
+    for name, priority in [("low", 0), ("high", 5), ("low2", 0), ("mid", 1)]:
+        t = threading.Thread(target=worker, args=(name, priority))
+        t.start()
+        threads.append(t)
+        while controller.stats().queued < len(threads):
+            time.sleep(0.001)
+
+    controller.release()
+    for t in threads:
+        t.join()
+    assert order == ["high", "mid", "low", "low2"]
+
+
+def test_full_queue_rejects_immediately():
+    controller = AdmissionController(AdmissionConfig(max_in_flight=1, max_queue=0))
+    controller.acquire()
+    with pytest.raises(AdmissionRejectedError) as exc:
+        controller.acquire()
+    assert exc.value.reason == "queue_full"
+    assert controller.stats().rejected_queue_full == 1
+
+
+def test_queue_timeout_rejects_and_leaves_the_queue():
+    controller = AdmissionController(
+        AdmissionConfig(max_in_flight=1, queue_timeout_ms=30)
+    )
+    controller.acquire()
+    with pytest.raises(AdmissionRejectedError) as exc:
+        controller.acquire()
+    assert exc.value.reason == "timeout"
+    stats = controller.stats()
+    assert stats.rejected_timeout == 1 and stats.queued == 0
+    controller.release()
+    controller.acquire()
+
+
+def test_request_rate_is_limited():
+    controller = AdmissionController(
+        AdmissionConfig(requests_per_s=50, request_burst=1)
+    )
+    start = time.monotonic()
+    for _ in range(4):
+        controller.acquire()
+        controller.release()
+    # The first call uses the burst; three more need ~20ms of refill each
+    assert time.monotonic() - start >= 0.05
+
+
+def test_non_positive_rates_are_rejected():
+    for field in ("requests_per_s", "tokens_per_s"):
+        for rate in (0, -5.0):
+            with pytest.raises(ValueError, match=field):
+                AdmissionConfig(**{field: rate})
+
+
+def test_stream_holds_slot_until_closed(monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda rc, model: provider)
+    req = request(AdmissionConfig(max_in_flight=1, queue_timeout_ms=10))
+
+    it = iter(stream(req))
+    assert next(it).value == "a"
+    with pytest.raises(AdmissionRejectedError):
+        generate(req)
+    it.close()
+    assert generate(req).output == "ok"
+
+
+def test_async_waiters_do_not_starve_offloaded_calls(monkeypatch):
+    # CountingProvider is sync-only, so agenerate runs it on the default
+    # executor; queued waiters must not occupy that executor's threads.
+    provider = CountingProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda rc, model: provider)
+    req = request(AdmissionConfig(max_in_flight=1, queue_timeout_ms=3000))
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(2))
+        return await asyncio.gather(*(agenerate(req) for _ in range(10)))
+
+    start = time.monotonic()
+    assert [r.output for r in asyncio.run(main())] == ["ok"] * 10
+    assert time.monotonic() - start < 2
+    assert provider.peak == 1
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    controller = AdmissionController(AdmissionConfig(max_in_flight=1))
+    controller.acquire()
+
+    async def main():
+        task = asyncio.ensure_future(controller.aacquire())
+        while controller.stats().queued == 0:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert controller.stats().queued == 0
+    controller.release()
+    assert controller.stats().in_flight == 0
+
+
+def test_runtimes_with_different_configs_keep_separate_limits(monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda rc, model: provider)
+    strict = request(AdmissionConfig(max_in_flight=1, queue_timeout_ms=10))
+    loose = request(AdmissionConfig(max_in_flight=4))
+
+    it = iter(stream(strict))
+    next(it)
+    # Another config for the same endpoint doesn't reset the strict one
+    assert generate(loose).output == "ok"
+    with pytest.raises(AdmissionRejectedError):
+        generate(strict)
+    it.close()
+    assert len(admission_stats()) == 2
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import pytest
+from src.core.generate import agenerate
+from src.core.stream import astream
+from src.types import (
+    GenerateRequest,
+    Message,
+    StreamChunk,
+    Capabilities,
+    GenerateResult,
+)
+from src.errors import UnsupportedCapabilityError
+
+import src.config.resolve_provider as resolver
+
+
+class SyncProvider:
+    def __init__(self, caps: Capabilities):
+        self.id = "sync"
+        self._caps = caps
+        self.threads = set()
+        self.closed = False
+
+    def capabilities(self) -> Capabilities:
+        return self._caps
+
+    def generate(self, req):
+        self.threads.add(threading.get_ident())
+        return GenerateResult(output="sync hello")
+
+    def stream(self, req):
+        try:
+            for tok in ("a", "b", "c"):
+                self.threads.add(threading.get_ident())
+                yield StreamChunk(type="token", value=tok)
+            yield StreamChunk(type="done")
+        finally:
+            self.closed = True
+
+
+class NativeAsyncProvider:
+    id = "native"
+
+    def capabilities(self) -> Capabilities:
+        return Capabilities(streaming=True, tools=False, json=False)
+
+    def generate(self, req):
+        raise AssertionError("sync path must not be used")
+
+    def stream(self, req):
+        raise AssertionError("sync path must not be used")
+
+    async def agenerate(self, req):
+        return GenerateResult(output="async hello")
+
+    async def astream(self, req):
+        yield StreamChunk(type="token", value="x")
+        yield StreamChunk(type="done")
+
+
+REQ = GenerateRequest(model="x", messages=[Message(role="user", content="hi")])
+
+
+def test_agenerate_offloads_sync_provider(monkeypatch):
+    fake = SyncProvider(Capabilities(streaming=True, tools=False, json=False))
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+
+    res = asyncio.run(agenerate(REQ))
+
+    assert res.output == "sync hello"
+    assert threading.get_ident() not in fake.threads
+
+
+def test_astream_offloads_and_closes_on_early_exit(monkeypatch):
+    fake = SyncProvider(Capabilities(streaming=True, tools=False, json=False))
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+
+    async def first_token():
+        agen = astream(REQ)
+        chunk = await agen.__anext__()
+        await agen.aclose()
+        return chunk
+
+    chunk = asyncio.run(first_token())
+
+    assert chunk.value == "a"
+    assert fake.closed
+
+
+def test_native_async_provider(monkeypatch):
+    monkeypatch.setattr(
+        resolver, "resolve_provider", lambda runtime, model: NativeAsyncProvider()
+    )
+
+    async def run():
+        res = await agenerate(REQ)
+        chunks = [c async for c in astream(REQ)]
+        return res, chunks
+
+    res, chunks = asyncio.run(run())
+    assert res.output == "async hello"
+    assert [c.type for c in chunks] == ["token", "done"]
+
+
+def test_astream_unsupported(monkeypatch):
+    fake = SyncProvider(Capabilities(streaming=False, tools=False, json=False))
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+
+    async def run():
+        return [c async for c in astream(REQ)]
+
+    with pytest.raises(UnsupportedCapabilityError):
+        asyncio.run(run())
@@ -0,0 +1,210 @@
+import threading
+import time
+
+import pytest
+
+from src.core.batch import generate_many, stream_many
+from src.types import (
+    GenerateRequest,
+    GenerateResult,
+    Message,
+    RuntimeConfig,
+    StreamChunk,
+    Capabilities,
+)
+from src.errors import SDKValidationError
+from src.instrumentation import HistogramAggregator, set_instrumentation
+
+import src.config.resolve_provider as resolver
+import src.providers.registry as registry
+from src.providers.kernel import register_kernel, unregister_kernel
+
+
+@pytest.fixture
+def kernels():
+    names = []
+
+    def register(name, fn, **kwargs):
+        names.append(name)
+        register_kernel(name, fn, **kwargs)
+
+    yield register
+    for name in names:
+        unregister_kernel(name)
+
+
+class SlowEchoProvider:
+    id = "echo"
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def capabilities(self) -> Capabilities:
+        return Capabilities(streaming=True, tools=False, json=False)
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def generate(self, req):
+        self._enter()
+        try:
+            text = req.messages[0].content
+            # later requests finish first
+            time.sleep(0.02 / (1 + int(text)))
+            return GenerateResult(output=text)
+        finally:
+            self._exit()
+
+    def stream(self, req):
+        text = req.messages[0].content
+        for ch in text:
+            yield StreamChunk(type="token", value=ch)
+        yield StreamChunk(type="done")
+
+
+def make_requests(n, runtime=None):
+    for i in range(n):
+        yield GenerateRequest(
+            model="m", messages=[Message(role="user", content=str(i))], runtime=runtime
+        )
+
+
+def test_generate_many_ordered_with_bounded_concurrency(monkeypatch):
+    fake = SlowEchoProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+
+    results = list(generate_many(make_requests(20), concurrency=4))
+
+    assert [r.index for r in results] == list(range(20))
+    assert [r.result.output for r in results] == [str(i) for i in range(20)]
+    assert fake.peak <= 4
+
+
+def test_generate_many_completion_order_and_errors(monkeypatch):
+    fake = SlowEchoProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+
+    reqs = list(make_requests(5))
+    reqs.insert(2, GenerateRequest(model="m", messages=[]))
+
+    results = list(generate_many(reqs, concurrency=3, ordered=False))
+
+    assert sorted(r.index for r in results) == list(range(6))
+    failed = [r for r in results if r.error is not None]
+    assert len(failed) == 1 and failed[0].index == 2
+    assert isinstance(failed[0].error, SDKValidationError)
+
+
+def test_generate_many_builds_each_runtime_once(monkeypatch):
+    fake = SlowEchoProvider()
+    built = []
+
+    def factory(runtime, model):
+        built.append(runtime)
+        return fake
+
+    monkeypatch.setitem(registry._factories, "echo", factory)
+    rc = RuntimeConfig(
+        type="url", endpoint="http://a", provider="echo", headers={"k": "v"}
+    )
+
+    list(generate_many(make_requests(10, rc), concurrency=2))
+
+    assert len(built) == 1
+
+
+def test_stream_many_resolves_kernels_per_model(kernels):
+    kernels("plain", lambda req: "whole")
+
+    def gen(req):
+        yield "to"
+        yield "ken"
+
+    kernels("gen", gen)
+    rc = RuntimeConfig(type="kernel")
+    reqs = [
+        GenerateRequest(
+            model=model, messages=[Message(role="user", content="x")], runtime=rc
+        )
+        for model in ("plain", "gen")
+    ]
+
+    chunks = list(stream_many(reqs, concurrency=1, ordered=True))
+
+    # plain can't stream; gen must not inherit plain's capabilities
+    assert [c.type for i, c in chunks if i == 0] == ["error"]
+    assert [(c.type, c.value) for i, c in chunks if i == 1] == [
+        ("token", "to"),
+        ("token", "ken"),
+        ("done", None),
+    ]
+
+
+def test_generate_many_pulls_inputs_lazily(monkeypatch):
+    fake = SlowEchoProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+    pulled = []
+
+    def requests():
+        for req in make_requests(1000):
+            pulled.append(req)
+            yield req
+
+    results = generate_many(requests(), concurrency=2)
+    next(results)
+    results.close()
+
+    assert len(pulled) < 10
+
+
+def test_stream_many_ordered(monkeypatch):
+    fake = SlowEchoProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+
+    reqs = [
+        GenerateRequest(model="m", messages=[Message(role="user", content=text)])
+        for text in ("abc", "de", "f")
+    ]
+    chunks = list(stream_many(reqs, concurrency=3, ordered=True))
+
+    assert [i for i, _ in chunks] == [0, 0, 0, 0, 1, 1, 1, 2, 2]
+    tokens = "".join(c.value for _, c in chunks if c.type == "token")
+    assert tokens == "abcdef"
+
+
+def test_stream_many_captures_errors(monkeypatch):
+    fake = SlowEchoProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+
+    reqs = [
+        GenerateRequest(model="m", messages=[Message(role="user", content="ok")]),
+        GenerateRequest(model="m", messages=[]),
+    ]
+    chunks = list(stream_many(reqs, concurrency=2))
+
+    errors = [(i, c) for i, c in chunks if c.type == "error"]
+    assert len(errors) == 1 and errors[0][0] == 1
+    assert "".join(c.value for i, c in chunks if i == 0 and c.type == "token") == "ok"
+
+
+def test_batch_items_run_the_single_call_pipeline(monkeypatch):
+    fake = SlowEchoProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+    agg = HistogramAggregator()
+    set_instrumentation(agg)
+    try:
+        list(generate_many(make_requests(3), concurrency=2))
+        list(stream_many(make_requests(2), concurrency=2))
+    finally:
+        set_instrumentation(None)
+    timings = agg.snapshot()["timings"]
+    assert timings["total/echo"]["count"] == 5
+    assert timings["ttft"]["count"] == 2
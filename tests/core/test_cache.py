@@ -0,0 +1,122 @@
+import pytest
+import src.cache as cache_module
+from src.cache import ResponseCache, configure_cache, request_key
+from src.core.generate import generate
+from src.normalize import normalize_request
+from src.types import (
+    Capabilities,
+    GenerateRequest,
+    GenerateResult,
+    GenerationOptions,
+    Message,
+    RuntimeConfig,
+)
+
+import src.config.resolve_provider as resolver
+
+
+class CountingProvider:
+    id = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def capabilities(self) -> Capabilities:
+        return Capabilities(streaming=False, tools=False, json=False)
+
+    def generate(self, req):
+        self.calls += 1
+        return GenerateResult(output=f"answer {self.calls}", metadata={"n": 1})
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    fake = CountingProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+    configure_cache(ResponseCache(max_entries=8))
+    yield fake
+    configure_cache(None)
+
+
+def make_request(content="hi", temperature=0.0, cache=True, endpoint="http://a"):
+    return GenerateRequest(
+        model="m",
+        messages=[Message(role="user", content=content)],
+        runtime=RuntimeConfig(type="url", endpoint=endpoint),
+        options=GenerationOptions(temperature=temperature),
+        cache=cache,
+    )
+
+
+def test_deterministic_requests_hit_cache(provider):
+    first = generate(make_request())
+    second = generate(make_request())
+
+    assert first.output == second.output == "answer 1"
+    assert provider.calls == 1
+    stats = cache_module.get_cache().stats()
+    assert (stats.hits, stats.misses) == (1, 1)
+
+
+def test_cache_is_opt_in_and_skips_sampling(provider):
+    generate(make_request(cache=False))
+    generate(make_request(cache=False))
+    generate(make_request(temperature=0.7))
+    generate(make_request(temperature=0.7))
+
+    assert provider.calls == 4
+
+
+def test_key_includes_runtime_identity(provider):
+    generate(make_request(endpoint="http://a"))
+    generate(make_request(endpoint="http://b"))
+
+    assert provider.calls == 2
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = ResponseCache(max_entries=2, ttl_s=10)
+
+    for key in ("a", "b", "c"):
+        cache.set(key, GenerateResult(output=key))
+    assert cache.get("a") is None
+    assert cache.get("c").output == "c"
+
+    now[0] += 11
+    assert cache.get("c") is None
+    stats = cache.stats()
+    assert (stats.evictions, stats.expirations) == (1, 1)
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "responses.db")
+    key = request_key(normalize_request(make_request()), None)
+
+    cache = ResponseCache(path=path)
+    cache.set(key, GenerateResult(output="persisted", tokens=3, metadata={"x": 1}))
+    cache.close()
+
+    reopened = ResponseCache(path=path)
+    result = reopened.get(key)
+    assert result == GenerateResult(output="persisted", tokens=3, metadata={"x": 1})
+    assert reopened.stats().disk_hits == 1
+    reopened.close()
+
+
+def test_disk_hit_keeps_its_expiry(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    path = str(tmp_path / "responses.db")
+    cache = ResponseCache(ttl_s=10, path=path)
+    cache.set("k", GenerateResult(output="v"))
+    cache.close()
+
+    now[0] += 8
+    reopened = ResponseCache(ttl_s=10, path=path)
+    assert reopened.get("k").output == "v"
+    # Promoted to memory, it still expires 10s after it was stored
+    now[0] += 3
+    assert reopened.get("k") is None
+    reopened.close()
@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+from src.capabilities import configure_capability_cache, get_capabilities
+from src.core.generate import generate
+from src.errors import ContextWindowExceededError, TimeoutError, TransportError
+from src.types import (
+    Capabilities,
+    GenerateRequest,
+    GenerateResult,
+    GenerationOptions,
+    Message,
+)
+
+import src.config.resolve_provider as resolver
+
+STATIC = Capabilities(streaming=True, tools=False, json=False)
+
+
+class ProbedProvider:
+    id = "probed"
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.probes = 0
+        self.generate_calls = 0
+        self.fail = False
+        self.probed = threading.Event()
+
+    def capabilities(self) -> Capabilities:
+        return STATIC
+
+    def discover_capabilities(self, model):
+        self.probes += 1
+        self.probed.set()
+        if self.fail:
+            raise TransportError("probe failed")
+        return Capabilities(
+            streaming=True, tools=False, json=False, context_window=self.window
+        )
+
+    def generate(self, req):
+        self.generate_calls += 1
+        return GenerateResult(output="ok")
+
+
+def test_discovered_capabilities_are_cached_per_model():
+    provider = ProbedProvider()
+    assert get_capabilities(provider, "a").context_window == 1000
+    assert get_capabilities(provider, "a").context_window == 1000
+    assert provider.probes == 1
+    get_capabilities(provider, "b")
+    assert provider.probes == 2
+
+
+def test_stale_entry_is_served_while_refreshing():
+    configure_capability_cache(ttl_s=0.01)
+    provider = ProbedProvider()
+    get_capabilities(provider, "a")
+    time.sleep(0.02)
+    provider.window = 2000
+    provider.probed.clear()
+
+    # The stale value comes back at once; the refresh runs in the background
+    assert get_capabilities(provider, "a").context_window == 1000
+    assert provider.probed.wait(1)
+    deadline = time.monotonic() + 1
+    while get_capabilities(provider, "a").context_window != 2000:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_failed_probe_falls_back_to_static_capabilities():
+    provider = ProbedProvider()
+    provider.fail = True
+    assert get_capabilities(provider, "a") == STATIC
+    assert get_capabilities(provider, "a") == STATIC
+    assert provider.probes == 1
+
+
+def test_request_over_discovered_window_fails_locally(monkeypatch):
+    provider = ProbedProvider(window=50)
+    monkeypatch.setattr(resolver, "resolve_provider", lambda rc, model: provider)
+    req = GenerateRequest(
+        model="unknown-model",
+        messages=[Message(role="user", content="hi")],
+        options=GenerationOptions(max_tokens=100),
+    )
+    with pytest.raises(ContextWindowExceededError) as exc:
+        generate(req)
+    assert exc.value.context_window == 50
+    assert provider.generate_calls == 0
+
+
+class SlowProbe(ProbedProvider):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def discover_capabilities(self, model):
+        time.sleep(self.delay)
+        return super().discover_capabilities(model)
+
+
+def test_first_probe_is_bounded_by_the_request_deadline(monkeypatch):
+    provider = SlowProbe(delay=1.0)
+    monkeypatch.setattr(resolver, "resolve_provider", lambda rc, model: provider)
+    req = GenerateRequest(
+        model="m", messages=[Message(role="user", content="hi")], timeout_ms=100
+    )
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        generate(req)
+    assert time.monotonic() - start < 0.5
+    assert provider.generate_calls == 0
+
+
+def test_concurrent_first_requests_share_one_probe():
+    provider = SlowProbe(delay=0.1)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(get_capabilities(provider, "a")))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert provider.probes == 1
+    assert {caps.context_window for caps in results} == {1000}
+
+
+def test_malformed_probe_reply_falls_back_to_static_capabilities():
+    provider = ProbedProvider()
+    provider.discover_capabilities = lambda model: {}.get("x").splitlines()
+    assert get_capabilities(provider, "a") == STATIC
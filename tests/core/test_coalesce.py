@@ -0,0 +1,146 @@
+import threading
+import time
+from dataclasses import replace
+
+import pytest
+
+from src.coalesce import SingleFlight
+from src.core.generate import generate
+from src.core.stream import stream
+from src.errors import TimeoutError
+from src.types import (
+    Capabilities,
+    GenerateRequest,
+    GenerateResult,
+    Message,
+    StreamChunk,
+)
+
+import src.config.resolve_provider as resolver
+
+
+class GatedProvider:
+    id = "gated"
+
+    def __init__(self):
+        self.generate_calls = 0
+        self.stream_calls = 0
+        self.release = threading.Event()
+        self.closed = False
+
+    def capabilities(self) -> Capabilities:
+        return Capabilities(streaming=True, tools=False, json=False)
+
+    def generate(self, req):
+        self.generate_calls += 1
+        self.release.wait(5)
+        return GenerateResult(output="shared")
+
+    def stream(self, req):
+        self.stream_calls += 1
+        try:
+            for tok in ("a", "b", "c"):
+                yield StreamChunk(type="token", value=tok)
+            yield StreamChunk(type="done")
+        finally:
+            self.closed = True
+
+
+REQ = GenerateRequest(
+    model="m", messages=[Message(role="user", content="hi")], coalesce=True
+)
+
+
+def test_concurrent_generate_shares_one_call(monkeypatch):
+    fake = GatedProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(generate(REQ))) for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    # Give every caller time to join the in-flight call before it completes
+    time.sleep(0.2)
+    fake.release.set()
+    for t in threads:
+        t.join()
+
+    assert fake.generate_calls == 1
+    assert [r.output for r in results] == ["shared"] * 5
+
+
+def test_follower_gives_up_at_its_own_deadline(monkeypatch):
+    fake = GatedProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+    results = []
+    leader = threading.Thread(target=lambda: results.append(generate(REQ)))
+    leader.start()
+    while not fake.generate_calls:
+        time.sleep(0.001)
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        generate(replace(REQ, timeout_ms=100))
+    assert time.monotonic() - start < 1
+    fake.release.set()
+    leader.join()
+    assert fake.generate_calls == 1
+    assert [r.output for r in results] == ["shared"]
+
+
+def test_late_stream_joiner_replays_prefix(monkeypatch):
+    fake = GatedProvider()
+    monkeypatch.setattr(resolver, "resolve_provider", lambda runtime, model: fake)
+
+    first = stream(REQ)
+    assert next(first).value == "a"
+    assert next(first).value == "b"
+
+    second = stream(REQ)
+    assert [c.value for c in second] == ["a", "b", "c", None]
+    assert [c.value for c in first] == ["c", None]
+    assert fake.stream_calls == 1
+
+    # The flight is over; a new request starts a new upstream stream
+    list(stream(REQ))
+    assert fake.stream_calls == 2
+
+
+def test_abandoned_stream_closes_upstream():
+    flights = SingleFlight()
+    closed = []
+
+    def source():
+        try:
+            yield StreamChunk(type="token", value="a")
+            yield StreamChunk(type="token", value="b")
+        finally:
+            closed.append(True)
+
+    sub = flights.stream("k", source)
+    next(sub)
+    sub.close()
+
+    assert closed == [True]
+    assert flights.in_flight() == 0
+
+
+def test_errors_reach_every_waiter():
+    flights = SingleFlight()
+
+    def source():
+        yield StreamChunk(type="token", value="a")
+        raise RuntimeError("boom")
+
+    subs = [flights.stream("k", source), flights.stream("k", source)]
+    for sub in subs:
+        assert next(sub).value == "a"
+    for sub in subs:
+        try:
+            next(sub)
+        except RuntimeError as e:
+            assert str(e) == "boom"
+        else:
+            raise AssertionError("expected error")
@@ -0,0 +1,67 @@
+import pytest
+import src.validate as validate
+from src.conversation import Conversation
+from src.errors import SDKValidationError
+from src.normalize import normalize_request
+from src.types import GenerateRequest, Message
+
+HI = Message(role="user", content="hi")
+HELLO = Message(role="assistant", content="hello")
+
+
+def test_append_shares_storage_and_keeps_snapshots():
+    first = Conversation([HI])
+    second = first.append(HELLO)
+
+    assert list(first) == [HI]
+    assert list(second) == [HI, HELLO]
+    assert second._log is first._log
+    assert second[-1] == HELLO
+    assert second[0:1] == [HI]
+
+
+def test_append_to_old_snapshot_branches():
+    root = Conversation([HI])
+    a = root.append(HELLO)
+    b = root.append(Message(role="assistant", content="hey"))
+
+    assert list(a) == [HI, HELLO]
+    assert [m.content for m in b] == ["hi", "hey"]
+    assert b._log is not a._log
+    assert a != b
+
+
+def test_validation_only_checks_new_messages(monkeypatch):
+    checked = []
+    original = validate.validate_messages
+
+    def spy(messages):
+        if isinstance(messages, list):
+            checked.append(len(messages))
+        return original(messages)
+
+    monkeypatch.setattr(validate, "validate_messages", spy)
+    conv = Conversation([HI, HELLO])
+    validate.validate_messages(conv)
+    conv = conv.append(HI)
+    validate.validate_messages(conv)
+    validate.validate_messages(conv)
+
+    assert checked == [2, 1]
+
+
+def test_invalid_message_is_rejected_and_not_cached():
+    conv = Conversation([HI]).append(Message(role="bot", content="x"))  # type: ignore[arg-type]
+    for _ in range(2):
+        with pytest.raises(SDKValidationError):
+            validate.validate_messages(conv)
+    with pytest.raises(SDKValidationError):
+        validate.validate_messages(Conversation())
+
+
+def test_normalize_passes_snapshot_without_copying():
+    conv = Conversation([HI, HELLO])
+    internal = normalize_request(GenerateRequest(model="m", messages=conv))
+
+    assert internal.messages is conv
+    assert conv.unvalidated() == []
@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from src.core.stream import astream, stream
+from src.deadline import Deadline
+from src.errors import TimeoutError, TransportError
+from src.normalize import normalize_request
+from src.providers.generic_url import GenericURLProvider
+from src.types import (
+    Capabilities,
+    GenerateRequest,
+    InternalRequest,
+    Message,
+    RuntimeConfig,
+    StreamChunk,
+)
+
+import src.config.resolve_provider as resolver
+
+
+def mock_client(monkeypatch, handler):
+    transport = httpx.MockTransport(handler)
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+
+def make_request(deadline=None):
+    return InternalRequest(
+        model="m", messages=[Message(role="user", content="hi")], deadline=deadline
+    )
+
+
+def test_deadline_from_request_overrides_runtime():
+    rc = RuntimeConfig(type="url", timeout_ms=5000, idle_timeout_ms=200)
+    req = GenerateRequest(
+        model="m", messages=[Message(role="user", content="hi")], runtime=rc
+    )
+    deadline = normalize_request(req).deadline
+    assert deadline.timeout_s == 5.0
+    assert deadline.phase_timeouts()["read"] == 0.2
+
+    override = GenerateRequest(
+        model="m",
+        messages=[Message(role="user", content="hi")],
+        runtime=rc,
+        timeout_ms=100,
+    )
+    assert normalize_request(override).deadline.timeout_s == 0.1
+
+
+def test_no_timeouts_means_no_deadline():
+    req = GenerateRequest(model="m", messages=[Message(role="user", content="hi")])
+    assert normalize_request(req).deadline is None
+
+
+def test_expired_deadline_raises():
+    deadline = Deadline(timeout_s=0.01)
+    time.sleep(0.02)
+    with pytest.raises(TimeoutError):
+        deadline.check()
+
+
+def test_transport_timeout_maps_to_sdk_timeout(monkeypatch):
+    def handler(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    mock_client(monkeypatch, handler)
+    provider = GenericURLProvider(id="g", endpoint="http://example.com/api/generate")
+    with pytest.raises(TimeoutError):
+        provider.generate(make_request(Deadline(timeout_s=1)))
+
+
+def test_http_status_maps_to_transport_error(monkeypatch):
+    mock_client(monkeypatch, lambda request: httpx.Response(503))
+    provider = GenericURLProvider(id="g", endpoint="http://example.com/api/generate")
+    with pytest.raises(TransportError) as exc:
+        provider.generate(make_request())
+    assert exc.value.status_code == 503
+
+
+def test_stalled_stream_hits_deadline(monkeypatch):
+    def body():
+        yield b"a\n"
+        time.sleep(0.2)
+        yield b"b\n"
+
+    mock_client(monkeypatch, lambda request: httpx.Response(200, content=body()))
+    rc = RuntimeConfig(type="url", endpoint="http://example.com/api/stream")
+    req = GenerateRequest(
+        model="m",
+        messages=[Message(role="user", content="hi")],
+        runtime=rc,
+        timeout_ms=100,
+    )
+
+    chunks = stream(req)
+    assert next(chunks).value == "a"
+    with pytest.raises(TimeoutError):
+        list(chunks)
+
+
+def test_stalled_async_stream_hits_deadline(monkeypatch):
+    class StallingProvider:
+        id = "stalling"
+
+        def capabilities(self):
+            return Capabilities(streaming=True, tools=False, json=False)
+
+        async def agenerate(self, req):
+            raise NotImplementedError
+
+        async def astream(self, req):
+            yield StreamChunk(type="token", value="a")
+            await asyncio.sleep(5)
+            yield StreamChunk(type="token", value="b")
+
+    monkeypatch.setattr(resolver, "resolve_provider", lambda r, m: StallingProvider())
+    req = GenerateRequest(
+        model="m", messages=[Message(role="user", content="hi")], timeout_ms=100
+    )
+
+    async def main():
+        received = []
+        with pytest.raises(TimeoutError):
+            async for chunk in astream(req):
+                received.append(chunk.value)
+        return received
+
+    start = time.monotonic()
+    assert asyncio.run(main()) == ["a"]
+    assert time.monotonic() - start < 1
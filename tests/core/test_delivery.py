@@ -0,0 +1,151 @@
+import asyncio
+import time
+import httpx
+import pytest
+from src.core.stream import astream, stream
+from src.delivery import acoalesce_tokens, coalesce_tokens
+from src.errors import TransportError
+from src.providers.generic_url import GenericURLProvider
+from src.types import (
+    Capabilities,
+    DeliveryConfig,
+    GenerateRequest,
+    InternalRequest,
+    Message,
+    StreamChunk,
+)
+
+import src.config.resolve_provider as resolver
+
+TOKENS = ["Hel", "lo", ", ", "wör", "ld", "!"]
+
+
+def chunks(tokens=TOKENS):
+    for t in tokens:
+        yield StreamChunk(type="token", value=t)
+    yield StreamChunk(type="done")
+
+
+def text(items):
+    return "".join(c.value for c in items if c.type == "token")
+
+
+def test_flushes_on_token_count():
+    out = list(coalesce_tokens(chunks(), DeliveryConfig(max_bytes=None, max_tokens=2)))
+    assert [c.value for c in out] == ["Hello", ", wör", "ld!", None]
+    assert out[-1].type == "done"
+
+
+def test_flushes_on_utf8_byte_count():
+    out = list(coalesce_tokens(chunks(), DeliveryConfig(max_bytes=6, max_tokens=None)))
+    # "wör" is 4 bytes in UTF-8
+    assert [c.value for c in out[:-1]] == ["Hello, ", "wörld", "!"]
+    assert text(out) == "".join(TOKENS)
+
+
+def test_non_token_chunks_flush_immediately():
+    def source():
+        yield StreamChunk(type="token", value="a")
+        yield StreamChunk(type="tool_call", value={"name": "f"})
+        yield StreamChunk(type="token", value="b")
+        yield StreamChunk(type="done")
+
+    out = list(coalesce_tokens(source(), DeliveryConfig()))
+    assert [(c.type, c.value) for c in out] == [
+        ("token", "a"),
+        ("tool_call", {"name": "f"}),
+        ("token", "b"),
+        ("done", None),
+    ]
+
+
+def test_pending_text_is_delivered_before_an_error():
+    def source():
+        yield StreamChunk(type="token", value="partial")
+        raise TransportError("reset")
+
+    it = coalesce_tokens(source(), DeliveryConfig())
+    assert next(it).value == "partial"
+    with pytest.raises(TransportError):
+        next(it)
+
+
+class FakeProvider:
+    id = "fake"
+
+    def capabilities(self):
+        return Capabilities(streaming=True, tools=False, json=False)
+
+    def stream(self, req):
+        return chunks()
+
+
+def test_stream_delivery_matches_per_token_output(monkeypatch):
+    monkeypatch.setattr(resolver, "resolve_provider", lambda r, m: FakeProvider())
+    messages = [Message(role="user", content="hi")]
+    plain = list(stream(GenerateRequest(model="x", messages=messages)))
+    request = GenerateRequest(
+        model="x", messages=messages, delivery=DeliveryConfig(max_tokens=4)
+    )
+    coalesced = list(stream(request))
+
+    async def collect():
+        return [c async for c in astream(request)]
+
+    assert len(coalesced) == 3
+    assert text(coalesced) == text(plain)
+    assert asyncio.run(collect()) == coalesced
+
+
+def test_pending_text_is_flushed_when_max_delay_expires():
+    def source():
+        yield StreamChunk(type="token", value="a")
+        time.sleep(0.5)
+        yield StreamChunk(type="token", value="b")
+        yield StreamChunk(type="done")
+
+    start = time.monotonic()
+    it = coalesce_tokens(source(), DeliveryConfig(max_delay_ms=50))
+    assert next(it).value == "a"
+    # Flushed by the interval, not by the arrival of "b"
+    assert time.monotonic() - start < 0.3
+    assert [(c.type, c.value) for c in it] == [("token", "b"), ("done", None)]
+
+
+def test_async_pending_text_is_flushed_when_max_delay_expires():
+    async def source():
+        yield StreamChunk(type="token", value="a")
+        await asyncio.sleep(0.5)
+        yield StreamChunk(type="token", value="b")
+
+    async def main():
+        start = time.monotonic()
+        out = []
+        async for chunk in acoalesce_tokens(source(), DeliveryConfig(max_delay_ms=50)):
+            out.append((chunk.value, time.monotonic() - start))
+        return out
+
+    (a, at), (b, _) = asyncio.run(main())
+    assert (a, b) == ("a", "b")
+    assert at < 0.3
+
+
+def test_url_provider_merges_tokens_in_its_frame_loop(monkeypatch):
+    body = "".join(f"{t}\n" for t in ["one", "two", "three", "four", "five"])
+    transport = httpx.MockTransport(lambda r: httpx.Response(200, content=body))
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+    provider = GenericURLProvider(id="generic-url", endpoint="http://h/stream")
+    req = InternalRequest(
+        model="m",
+        messages=[Message(role="user", content="hi")],
+        delivery=DeliveryConfig(max_tokens=2),
+    )
+
+    # The provider itself yields merged deltas, not one chunk per frame
+    out = [c.value for c in provider.stream(req) if c.type == "token"]
+    assert out == ["onetwo", "threefour", "five"]
@@ -0,0 +1,101 @@
+import httpx
+import pytest
+from src.core.generate import generate
+from src.core.stream import stream
+from src.instrumentation import (
+    HistogramAggregator,
+    Instrumentation,
+    get_instrumentation,
+    set_instrumentation,
+)
+from src.providers.generic_url import GenericURLProvider
+from src.types import (
+    Capabilities,
+    GenerateRequest,
+    GenerateResult,
+    InternalRequest,
+    Message,
+    StreamChunk,
+)
+
+import src.config.resolve_provider as resolver
+
+
+class FakeProvider:
+    id = "fake"
+
+    def capabilities(self) -> Capabilities:
+        return Capabilities(streaming=True, tools=False, json=False)
+
+    def generate(self, req):
+        return GenerateResult(output="ok")
+
+    def stream(self, req):
+        for tok in ("a", "b", "c"):
+            yield StreamChunk(type="token", value=tok)
+        yield StreamChunk(type="done")
+
+
+@pytest.fixture
+def aggregator(monkeypatch):
+    monkeypatch.setattr(
+        resolver, "resolve_provider", lambda runtime, model: FakeProvider()
+    )
+    agg = HistogramAggregator()
+    set_instrumentation(agg)
+    yield agg
+    set_instrumentation(None)
+
+
+REQ = GenerateRequest(model="m", messages=[Message(role="user", content="hi")])
+
+
+def test_noop_default():
+    assert type(get_instrumentation()) is Instrumentation
+    assert not get_instrumentation().enabled
+
+
+def test_generate_spans(aggregator):
+    generate(REQ)
+    timings = aggregator.snapshot()["timings"]
+    for name in ("validate", "resolve", "capabilities", "total", "total/fake"):
+        assert timings[name]["count"] == 1
+
+
+def test_stream_spans(aggregator):
+    list(stream(REQ))
+    snap = aggregator.snapshot()
+    assert snap["timings"]["ttft"]["count"] == 1
+    assert snap["timings"]["inter_token"]["count"] == 2
+    assert snap["timings"]["total/fake"]["count"] == 1
+    assert snap["counters"]["chunks"] == 4
+
+
+def test_transport_ttfb_and_bytes(aggregator, monkeypatch):
+    body = b"h\ni\nDONE\n"
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+    provider = GenericURLProvider(id="g", endpoint="http://example.com/api/stream")
+    req = InternalRequest(model="m", messages=[Message(role="user", content="hi")])
+    list(provider.stream(req))
+
+    snap = aggregator.snapshot()
+    assert snap["timings"]["ttfb"]["count"] == 1
+    assert snap["counters"]["bytes_received"] == len(body)
+
+
+def test_histogram_percentiles():
+    agg = HistogramAggregator()
+    for ms in range(1, 101):
+        agg.timing("x", ms / 1000)
+    summary = agg.snapshot()["timings"]["x"]
+    assert summary["count"] == 100
+    assert summary["p50"] == pytest.approx(0.050, rel=0.05)
+    assert summary["p99"] == pytest.approx(0.099, rel=0.05)
+    assert summary["max"] == 0.1
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.core.stream import stream
+from src.errors import TransportError
+from src.readahead import aread_ahead, read_ahead
+from src.types import Capabilities, GenerateRequest, Message, StreamChunk
+
+import src.config.resolve_provider as resolver
+
+
+def test_reader_runs_ahead_up_to_buffer_size():
+    produced = []
+
+    def source():
+        for i in range(10):
+            produced.append(i)
+            yield i
+
+    it = read_ahead(source(), 3)
+    assert next(it) == 0
+    time.sleep(0.1)
+    # One item consumed, three buffered, one held by the blocked reader
+    assert len(produced) == 5
+    assert list(it) == list(range(1, 10))
+
+
+def test_errors_arrive_after_preceding_items():
+    def source():
+        yield 1
+        yield 2
+        raise TransportError("reset")
+
+    it = read_ahead(source(), 8)
+    assert next(it) == 1
+    assert next(it) == 2
+    with pytest.raises(TransportError):
+        next(it)
+
+
+def test_early_close_stops_and_closes_source():
+    closed = threading.Event()
+
+    def source():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            closed.set()
+
+    it = read_ahead(source(), 2)
+    assert next(it) == 0
+    it.close()
+    assert closed.wait(1)
+
+
+def test_async_read_ahead():
+    async def source():
+        for i in range(5):
+            yield i
+
+    async def main():
+        return [i async for i in aread_ahead(source(), 2)]
+
+    assert asyncio.run(main()) == [0, 1, 2, 3, 4]
+
+
+def test_stream_with_read_ahead(monkeypatch):
+    class Provider:
+        id = "fake"
+
+        def capabilities(self):
+            return Capabilities(streaming=True, tools=False, json=False)
+
+        def stream(self, req):
+            yield StreamChunk(type="token", value="a")
+            yield StreamChunk(type="done")
+
+    monkeypatch.setattr(resolver, "resolve_provider", lambda r, m: Provider())
+    request = GenerateRequest(
+        model="x", messages=[Message(role="user", content="hi")], read_ahead=4
+    )
+    assert [c.type for c in stream(request)] == ["token", "done"]
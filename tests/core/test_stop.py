@@ -0,0 +1,167 @@
+import asyncio
+import json
+
+import httpx
+
+from src.core.generate import generate
+from src.core.stream import astream, stream
+from src.stop import StopScanner
+from src.types import (
+    Capabilities,
+    GenerateRequest,
+    GenerateResult,
+    GenerationOptions,
+    Message,
+    RuntimeConfig,
+    StreamChunk,
+)
+
+import src.config.resolve_provider as resolver
+
+MESSAGES = [Message(role="user", content="hi")]
+
+
+class EndlessProvider:
+    id = "endless"
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.produced = 0
+        self.closed = False
+
+    def capabilities(self) -> Capabilities:
+        return Capabilities(streaming=True, tools=False, json=False)
+
+    def generate(self, req):
+        return GenerateResult(output="".join(self.pieces))
+
+    def stream(self, req):
+        try:
+            while True:
+                for piece in self.pieces:
+                    self.produced += 1
+                    yield StreamChunk(type="token", value=piece)
+        finally:
+            self.closed = True
+
+
+def request(stop, **kwargs):
+    return GenerateRequest(
+        model="m",
+        messages=MESSAGES,
+        options=GenerationOptions(stop=stop),
+        **kwargs,
+    )
+
+
+def test_scanner_finds_matches_split_across_chunks():
+    scanner = StopScanner(["</end>"])
+    assert scanner.feed("abc</e") == "abc"
+    assert not scanner.matched
+    assert scanner.feed("nd>tail") == ""
+    assert scanner.matched
+
+
+def test_scanner_releases_held_text_that_did_not_match():
+    scanner = StopScanner(["</end>"])
+    assert scanner.feed("a</") == "a"
+    assert scanner.feed("b>") == "</b>"
+    assert scanner.feed("x<") == "x"
+    assert scanner.flush() == "<"
+
+
+def test_stream_truncates_at_stop_and_closes_upstream(monkeypatch):
+    provider = EndlessProvider(["Hello", " wor", "ld. ST", "OP more"])
+    monkeypatch.setattr(resolver, "resolve_provider", lambda rc, model: provider)
+
+    chunks = list(stream(request(["STOP"])))
+
+    assert "".join(c.value for c in chunks if c.type == "token") == "Hello world. "
+    assert chunks[-1].type == "done"
+    assert provider.closed
+    assert provider.produced == 4
+
+
+def test_earliest_of_several_stops_wins(monkeypatch):
+    provider = EndlessProvider(["one\ntwo", "###three"])
+    monkeypatch.setattr(resolver, "resolve_provider", lambda rc, model: provider)
+    chunks = list(stream(request(["###", "\n"])))
+    assert [c.value for c in chunks] == ["one", None]
+
+
+def test_generate_truncates_at_stop(monkeypatch):
+    provider = EndlessProvider(["answer: 42", "\n\nUser: next"])
+    monkeypatch.setattr(resolver, "resolve_provider", lambda rc, model: provider)
+    assert generate(request(["\n\nUser:"])).output == "answer: 42"
+    assert generate(request(None)).output == "answer: 42\n\nUser: next"
+
+
+def test_astream_truncates_at_stop(monkeypatch):
+    provider = EndlessProvider(["a", "b", "<", "|", "c"])
+    monkeypatch.setattr(resolver, "resolve_provider", lambda rc, model: provider)
+
+    async def collect():
+        return [c async for c in astream(request(["<|"]))]
+
+    chunks = asyncio.run(collect())
+    assert [(c.type, c.value) for c in chunks] == [
+        ("token", "a"),
+        ("token", "b"),
+        ("done", None),
+    ]
+    assert provider.closed
+
+
+class TrackedBody(httpx.SyncByteStream):
+    def __init__(self):
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        while True:
+            self.sent += 1
+            yield f"tok{self.sent} \n".encode()
+
+    def close(self):
+        self.closed = True
+
+
+def test_stop_reaches_backend_and_closes_response(monkeypatch):
+    bodies = []
+    body = TrackedBody()
+
+    def handler(req):
+        bodies.append(json.loads(req.content))
+        return httpx.Response(200, stream=body)
+
+    transport = httpx.MockTransport(handler)
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+    rc = RuntimeConfig(type="url", endpoint="http://h/stream")
+    chunks = list(stream(request(["tok3"], runtime=rc)))
+
+    assert bodies[0]["stop"] == ["tok3"]
+    assert "".join(c.value for c in chunks if c.type == "token") == "tok1 tok2 "
+    assert body.closed and body.sent == 3
+
+
+def test_abandoned_stream_closes_response(monkeypatch):
+    body = TrackedBody()
+    transport = httpx.MockTransport(lambda req: httpx.Response(200, stream=body))
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+    rc = RuntimeConfig(type="url", endpoint="http://h/stream")
+    it = iter(stream(GenerateRequest(model="m", messages=MESSAGES, runtime=rc)))
+    assert next(it).value == "tok1 "
+    it.close()
+    assert body.closed
@@ -0,0 +1,104 @@
+import pytest
+from src.core.generate import generate
+from src.errors import ContextWindowExceededError
+from src.tokens import (
+    context_window,
+    estimate_tokens,
+    fit_context,
+    register_context_window,
+    usage_tokens,
+)
+from src.types import (
+    Capabilities,
+    GenerateRequest,
+    GenerateResult,
+    GenerationOptions,
+    InternalRequest,
+    Message,
+)
+
+import src.config.resolve_provider as resolver
+
+
+def turn(role, words):
+    return Message(role=role, content=" ".join(["word"] * words))
+
+
+def test_estimates_and_windows():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("日本語") == 3
+    assert context_window("llama3.1:8b-instruct") == 131072
+    assert context_window("llama3:latest") == 8192
+    assert context_window("unknown-model") is None
+
+
+def test_versions_and_sizes_do_not_inherit_the_family_window():
+    assert context_window("gpt-4-0613") == 8192
+    assert context_window("gpt-4.1") == 1047576
+    assert context_window("gpt-4-32k") == 32768
+    assert context_window("gemma3:12b") is None
+    assert context_window("mistral-nemo") == 131072
+    assert context_window("phi3:mini") == 4096
+    assert context_window("phi3:14b-medium-128k-instruct") == 131072
+    assert context_window("phi3-mini-128k-instruct") == 131072
+
+
+def test_guessed_window_warns_instead_of_rejecting():
+    req = InternalRequest(model="gpt-4", messages=[turn("user", 40000)], options=None)
+    with pytest.warns(UserWarning, match="guessed"):
+        assert fit_context(req) is req
+    # A window reported by the backend is enforced
+    with pytest.raises(ContextWindowExceededError):
+        fit_context(req, window=8192)
+
+
+def test_usage_tokens_from_metadata():
+    assert usage_tokens({"usage": {"completion_tokens": 7}}) == 7
+    assert usage_tokens({"eval_count": 12, "done": True}) == 12
+    assert usage_tokens({"output": "x"}) is None
+
+
+def test_oversized_request_is_rejected_before_dispatch(monkeypatch):
+    register_context_window("tiny-test", 100)
+    calls = []
+
+    class Provider:
+        id = "fake"
+
+        def capabilities(self):
+            return Capabilities(streaming=False, tools=False, json=False)
+
+        def generate(self, req):
+            calls.append(req)
+            return GenerateResult(output="ok")
+
+    monkeypatch.setattr(resolver, "resolve_provider", lambda r, m: Provider())
+    request = GenerateRequest(model="tiny-test", messages=[turn("user", 500)])
+
+    with pytest.raises(ContextWindowExceededError) as exc:
+        generate(request)
+    assert exc.value.context_window == 100
+    assert calls == []
+
+
+def test_drop_oldest_keeps_system_and_latest_turn():
+    register_context_window("tiny-test", 110)
+    messages = [
+        turn("system", 10),
+        turn("user", 40),
+        turn("assistant", 40),
+        turn("user", 20),
+        turn("assistant", 20),
+        Message(role="user", content="latest"),
+    ]
+    req = InternalRequest(
+        model="tiny-test",
+        messages=messages,
+        options=GenerationOptions(max_tokens=20),
+    )
+
+    with pytest.raises(ContextWindowExceededError):
+        fit_context(req)
+    trimmed = fit_context(req, "drop_oldest").messages
+    assert trimmed == [messages[0], messages[3], messages[4], messages[5]]
@@ -0,0 +1,145 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Modules of the package that a kernel-runtime generate() may load. Adding to
+# this list should be a deliberate decision: every entry is cold-start cost.
+KERNEL_PATH_MODULES = {
+    "src",
+    "src.admission",
+    "src.cache",
+    "src.capabilities",
+    "src.coalesce",
+    "src.config",
+    "src.config.resolve_provider",
+    "src.conversation",
+    "src.core",
+    "src.core.generate",
+    "src.deadline",
+    "src.errors",
+    "src.instrumentation",
+    "src.normalize",
+    "src.providers",
+    "src.providers.kernel",
+    "src.providers.registry",
+    "src.providers.threaded",
+    "src.stop",
+    "src.tokens",
+    "src.types",
+    "src.validate",
+}
+
+# Heavy dependencies only the paths that need them may load
+HEAVY = ("httpx", "asyncio", "sqlite3", "importlib.metadata")
+
+# Generous: a cold `import src` + kernel generate() takes ~70ms locally
+COLD_START_BUDGET_S = 0.3
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+before = set(sys.modules)
+import src
+after_package = set(sys.modules) - before
+from src.providers.kernel import register_kernel
+from src.types import GenerateRequest, Message, RuntimeConfig
+register_kernel("echo", lambda req: "ok")
+result = src.generate(GenerateRequest(
+    model="echo",
+    messages=[Message(role="user", content="hi")],
+    runtime=RuntimeConfig(type="kernel"),
+))
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "package": sorted(after_package),
+    "loaded": sorted(sys.modules),
+    "output": result.output,
+    "elapsed": elapsed,
+}))
+"""
+
+
+# Sync generate()/stream() on URL runtimes (httpx mocked) and a kernel stream
+SYNC_SCRIPT = """
+import json, sys
+import httpx
+import src
+from src.providers.kernel import register_kernel
+from src.types import GenerateRequest, Message, RuntimeConfig
+
+def handler(request):
+    if request.url.path == "/stream":
+        return httpx.Response(200, content=b"a\\nb\\nDONE\\n")
+    return httpx.Response(200, json={"output": "ok"})
+
+class MockClient(httpx.Client):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, transport=httpx.MockTransport(handler), **kwargs)
+
+httpx.Client = MockClient
+
+def tokens(req):
+    yield "a"
+
+register_kernel("tokens", tokens)
+messages = [Message(role="user", content="hi")]
+url = RuntimeConfig(type="url", endpoint="http://backend/stream")
+outputs = [
+    src.generate(GenerateRequest(
+        model="m",
+        messages=messages,
+        runtime=RuntimeConfig(type="url", endpoint="http://backend/generate"),
+    )).output,
+    "".join(c.value for c in src.stream(
+        GenerateRequest(model="m", messages=messages, runtime=url)
+    ) if c.type == "token"),
+    "".join(c.value for c in src.stream(
+        GenerateRequest(model="m", messages=messages, runtime=url, read_ahead=4)
+    ) if c.type == "token"),
+    "".join(c.value for c in src.stream(GenerateRequest(
+        model="tokens", messages=messages, runtime=RuntimeConfig(type="kernel")
+    )) if c.type == "token"),
+]
+print(json.dumps({"loaded": sorted(sys.modules), "outputs": outputs}))
+"""
+
+
+def run_cold(script=SCRIPT):
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout)
+
+
+def test_package_import_loads_nothing_else():
+    report = run_cold()
+    assert report["package"] == ["src"]
+
+
+def test_kernel_runtime_does_not_load_the_http_stack():
+    report = run_cold()
+    assert report["output"] == "ok"
+    loaded = set(report["loaded"])
+    assert [m for m in HEAVY if m in loaded] == []
+    assert {m for m in loaded if m.split(".")[0] == "src"} <= KERNEL_PATH_MODULES
+
+
+def test_sync_calls_do_not_load_asyncio():
+    report = run_cold(SYNC_SCRIPT)
+    assert report["outputs"] == ["ok", "ab", "ab", "a"]
+    loaded = set(report["loaded"])
+    # httpx itself loads importlib.metadata
+    assert [m for m in ("asyncio", "sqlite3") if m in loaded] == []
+
+
+def test_cold_start_time():
+    # Best of three, to keep scheduler noise out of the measurement
+    elapsed = min(run_cold()["elapsed"] for _ in range(3))
+    assert elapsed < COLD_START_BUDGET_S
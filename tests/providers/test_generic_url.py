@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 import httpx
 from src.providers.generic_url import GenericURLProvider
@@ -44,3 +45,58 @@ def test_stream_parses_chunks(monkeypatch):
     chunks = list(provider.stream(req))
     assert [c.type for c in chunks if c.type != "done"] == ["token", "token"]
     assert "".join([c.value for c in chunks if c.type == "token"]) == "hi"
+
+
+def test_async_generate_and_stream(monkeypatch):
+    def handler(request):
+        if "stream" in str(request.url):
+            return httpx.Response(200, content=b"h\ni\nDONE\n")
+        return httpx.Response(200, json={"output": "hello"})
+
+    transport = httpx.MockTransport(handler)
+
+    class MockAsyncClient(httpx.AsyncClient):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "AsyncClient", MockAsyncClient)
+
+    provider = GenericURLProvider(id="g", endpoint="http://example.com/api/generate")
+    streamer = GenericURLProvider(id="g", endpoint="http://example.com/api/stream")
+    req = InternalRequest(
+        model="m", messages=[Message(role="user", content="hi")], options=None
+    )
+
+    async def run():
+        res = await provider.agenerate(req)
+        chunks = [c async for c in streamer.astream(req)]
+        return res, chunks
+
+    res, chunks = asyncio.run(run())
+    assert res.output == "hello"
+    assert "".join([c.value for c in chunks if c.type == "token"]) == "hi"
+
+
+def test_stream_sse_framing_with_split_chunks(monkeypatch):
+    body = "data: h\xe9\n\ndata: llo\n\ndata: [DONE]\n\n".encode("utf-8")
+
+    def handler(request):
+        return httpx.Response(200, content=iter([body[:8], body[8:]]))
+
+    transport = httpx.MockTransport(handler)
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+    provider = GenericURLProvider(
+        id="g", endpoint="http://example.com/api/stream", framing="sse"
+    )
+    req = InternalRequest(
+        model="m", messages=[Message(role="user", content="stream")], options=None
+    )
+    chunks = list(provider.stream(req))
+    assert "".join([c.value for c in chunks if c.type == "token"]) == "h\xe9llo"
+    assert chunks[-1].type == "done"
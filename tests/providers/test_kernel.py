@@ -1,23 +1,137 @@
+import threading
 import pytest
-from src.providers.kernel import KernelProvider
-from src.types import InternalRequest, Message
+from src.core.generate import generate
+from src.core.stream import stream
+from src.errors import ProviderError, UnsupportedCapabilityError
+from src.providers.kernel import (
+    KernelProvider,
+    configure_kernel_pools,
+    register_kernel,
+    unregister_kernel,
+)
+from src.types import GenerateRequest, InternalRequest, Message, RuntimeConfig
 
+MESSAGES = [Message(role="user", content="hi")]
 
-def test_kernel_generate_not_implemented():
-    p = KernelProvider()
-    with pytest.raises(NotImplementedError):
-        p.generate(
-            InternalRequest(model="m", messages=[Message(role="user", content="hi")])
+
+def echo(req):
+    return req.messages[-1].content.upper()
+
+
+@pytest.fixture
+def kernels():
+    names = []
+
+    def register(name, fn, **kwargs):
+        names.append(name)
+        register_kernel(name, fn, **kwargs)
+
+    yield register
+    for name in names:
+        unregister_kernel(name)
+
+
+def test_unregistered_model_raises_provider_error():
+    p = KernelProvider("missing")
+    with pytest.raises(ProviderError):
+        p.generate(InternalRequest(model="missing", messages=MESSAGES))
+    assert p.capabilities().streaming is False
+
+
+def test_generate_runs_registered_kernel(kernels):
+    kernels("echo", echo)
+    rc = RuntimeConfig(type="kernel")
+
+    res = generate(GenerateRequest(model="echo", messages=MESSAGES, runtime=rc))
+    assert res.output == "HI"
+    with pytest.raises(UnsupportedCapabilityError):
+        list(stream(GenerateRequest(model="echo", messages=MESSAGES, runtime=rc)))
+
+
+def test_generator_kernel_streams_without_buffering(kernels):
+    release = threading.Event()
+
+    def tokens(req):
+        yield "a"
+        release.wait(1)
+        yield "b"
+
+    kernels("tokens", tokens)
+    rc = RuntimeConfig(type="kernel")
+    it = iter(stream(GenerateRequest(model="tokens", messages=MESSAGES, runtime=rc)))
+
+    # The first token arrives while the kernel is still blocked on the second
+    assert next(it).value == "a"
+    release.set()
+    assert [(c.type, c.value) for c in it] == [("token", "b"), ("done", None)]
+
+
+def test_early_close_stops_the_kernel(kernels):
+    produced = []
+
+    def forever(req):
+        while True:
+            produced.append(1)
+            yield "x"
+
+    kernels("forever", forever)
+    it = iter(
+        KernelProvider("forever").stream(
+            InternalRequest(model="forever", messages=MESSAGES)
         )
+    )
+    next(it)
+    it.close()
+    count = len(produced)
+    threading.Event().wait(0.3)
+    # Bounded by the hand-off queue, and no longer growing
+    assert len(produced) <= count + 1 <= 70
 
 
-def test_kernel_stream_not_implemented():
-    p = KernelProvider()
-    with pytest.raises(NotImplementedError):
-        list(
-            p.stream(
-                InternalRequest(
-                    model="m", messages=[Message(role="user", content="hi")]
-                )
+def test_abandoned_stream_with_a_full_queue_releases_its_worker(kernels):
+    # A single worker: if the abandoned stream kept it, the next call would hang
+    configure_kernel_pools(threads=1)
+    try:
+        kernels("burst", lambda req: iter(["x"] * 65))
+        kernels("echo", echo)
+        it = iter(
+            KernelProvider("burst").stream(
+                InternalRequest(model="burst", messages=MESSAGES)
             )
         )
+        next(it)
+        threading.Event().wait(0.2)  # the queue fills up, the end is pending
+        it.close()
+        result = []
+        worker = threading.Thread(
+            target=lambda: result.append(
+                KernelProvider("echo").generate(
+                    InternalRequest(model="echo", messages=MESSAGES)
+                )
+            ),
+            daemon=True,
+        )
+        worker.start()
+        worker.join(2)
+        assert [r.output for r in result] == ["HI"]
+    finally:
+        configure_kernel_pools()
+
+
+def test_kernel_errors_are_provider_errors(kernels):
+    def broken(req):
+        raise RuntimeError("boom")
+
+    kernels("broken", broken)
+    with pytest.raises(ProviderError):
+        KernelProvider("broken").generate(
+            InternalRequest(model="broken", messages=MESSAGES)
+        )
+
+
+def test_process_executor(kernels):
+    kernels("echo-proc", echo, executor="process")
+    p = KernelProvider("echo-proc")
+    assert (
+        p.generate(InternalRequest(model="echo-proc", messages=MESSAGES)).output == "HI"
+    )
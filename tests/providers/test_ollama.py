@@ -1,6 +1,10 @@
+import json
 import httpx
+import pytest
+from src import generate, warm_up
+from src.errors import ContextWindowExceededError
 from src.providers.ollama import OllamaProvider
-from src.types import InternalRequest, Message
+from src.types import GenerateRequest, InternalRequest, Message, RuntimeConfig
 
 
 def test_ollama_generate(monkeypatch):
@@ -43,3 +47,142 @@ def test_ollama_stream(monkeypatch):
     )
     assert [c.type for c in chunks if c.type != "done"] == ["token", "token"]
     assert "".join([c.value for c in chunks if c.type == "token"]) == "heythere"
+
+
+def mock_client(monkeypatch, handler):
+    transport = httpx.MockTransport(handler)
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+
+def test_ollama_stream_parses_ndjson(monkeypatch):
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        lines = [
+            {"model": "m", "response": "Hel", "done": False},
+            {"model": "m", "response": "", "done": False},
+            {"model": "m", "message": {"role": "assistant", "content": "lo"}},
+            {"model": "m", "response": "", "done": True, "eval_count": 2},
+        ]
+        return httpx.Response(200, content="\n".join(map(json.dumps, lines)))
+
+    mock_client(monkeypatch, handler)
+
+    p = OllamaProvider(endpoint="http://localhost:11434", keep_alive="30m")
+    chunks = list(
+        p.stream(
+            InternalRequest(model="m", messages=[Message(role="user", content="hi")])
+        )
+    )
+    assert [(c.type, c.value) for c in chunks] == [
+        ("token", "Hel"),
+        ("token", "lo"),
+        ("done", None),
+    ]
+    assert bodies[0]["stream"] is True
+    assert bodies[0]["keep_alive"] == "30m"
+
+
+def test_ollama_generate_reads_response_field(monkeypatch):
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": "hi there", "done": True})
+
+    mock_client(monkeypatch, handler)
+
+    p = OllamaProvider(endpoint="http://localhost:11434")
+    res = p.generate(
+        InternalRequest(model="m", messages=[Message(role="user", content="hi")])
+    )
+    assert res.output == "hi there"
+    assert bodies[0]["stream"] is False
+    assert "keep_alive" not in bodies[0]
+
+
+def test_warm_up_preconnects_and_loads_models(monkeypatch):
+    seen = []
+
+    def handler(request):
+        body = json.loads(request.content) if request.content else None
+        seen.append((request.method, request.url.path, body))
+        return httpx.Response(200, json={"done": True})
+
+    mock_client(monkeypatch, handler)
+
+    rc = RuntimeConfig(
+        type="url", endpoint="http://ollama:11434", provider="ollama", keep_alive=-1
+    )
+    loaded = warm_up(rc, ["llama3", "qwen"])
+
+    assert set(loaded) == {"llama3", "qwen"}
+    assert seen[0][:2] == ("HEAD", "/")
+    assert seen[1:] == [
+        (
+            "POST",
+            "/api/generate",
+            {"model": "llama3", "stream": False, "keep_alive": -1},
+        ),
+        ("POST", "/api/generate", {"model": "qwen", "stream": False, "keep_alive": -1}),
+        # Capabilities are discovered up front as well
+        ("POST", "/api/show", {"model": "llama3"}),
+        ("POST", "/api/show", {"model": "qwen"}),
+    ]
+
+
+def test_capabilities_are_discovered_from_api_show(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/api/show":
+            return httpx.Response(
+                200,
+                json={
+                    "parameters": 'num_ctx 4096\nstop "<|eot_id|>"',
+                    "model_info": {"llama.context_length": 131072},
+                    "capabilities": ["completion", "tools"],
+                },
+            )
+        return httpx.Response(200, json={"response": "ok"})
+
+    mock_client(monkeypatch, handler)
+
+    rc = RuntimeConfig(type="url", endpoint="http://ollama:11434", provider="ollama")
+    small = GenerateRequest(
+        model="llama3.1", messages=[Message(role="user", content="hi")], runtime=rc
+    )
+    assert generate(small).output == "ok"
+    assert generate(small).output == "ok"
+    assert calls == ["/api/show", "/api/generate", "/api/generate"]
+
+    # The configured num_ctx, not the model's 128k window, is the limit
+    big = GenerateRequest(
+        model="llama3.1",
+        messages=[Message(role="user", content="x" * 20000)],
+        runtime=rc,
+    )
+    with pytest.raises(ContextWindowExceededError):
+        generate(big)
+    assert calls.count("/api/generate") == 2
+
+
+def test_malformed_api_show_reply_does_not_fail_the_request(monkeypatch):
+    def handler(request):
+        if request.url.path == "/api/show":
+            return httpx.Response(200, json={"parameters": {"num_ctx": 4096}})
+        return httpx.Response(200, json={"response": "ok"})
+
+    mock_client(monkeypatch, handler)
+    rc = RuntimeConfig(type="url", endpoint="http://ollama:11434", provider="ollama")
+    req = GenerateRequest(
+        model="llama3.1", messages=[Message(role="user", content="hi")], runtime=rc
+    )
+    assert generate(req).output == "ok"
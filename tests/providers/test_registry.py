@@ -1,7 +1,18 @@
+import pytest
+import src.providers.registry as registry
 from src.config.resolve_provider import resolve_provider
+from src.providers.registry import register_provider
 from src.types import RuntimeConfig
 
 
+@pytest.fixture(autouse=True)
+def factories(monkeypatch):
+    # Providers registered by a test don't outlive it
+    monkeypatch.setattr(registry, "_factories", dict(registry._factories))
+    yield
+    registry.clear_provider_cache()
+
+
 def test_resolve_generic_url():
     rc = RuntimeConfig(type="url", endpoint="http://example.com")
     provider = resolve_provider(rc, model="m")
@@ -19,3 +30,53 @@ def test_resolve_kernel_stub():
     rc = RuntimeConfig(type="kernel")
     provider = resolve_provider(rc, model="m")
     assert provider.id == "kernel"
+
+
+def test_resolve_caches_equal_runtimes():
+    a = RuntimeConfig(type="url", endpoint="http://example.com", headers={"a": "1"})
+    b = RuntimeConfig(type="url", endpoint="http://example.com", headers={"a": "1"})
+    c = RuntimeConfig(type="url", endpoint="http://example.com", headers={"a": "2"})
+    assert resolve_provider(a, model="m") is resolve_provider(b, model="other")
+    assert resolve_provider(a, model="m") is not resolve_provider(c, model="m")
+
+
+def test_runtimes_differing_in_timeout_share_a_provider():
+    a = RuntimeConfig(type="url", endpoint="http://example.com", timeout_ms=1000)
+    b = RuntimeConfig(type="url", endpoint="http://example.com", timeout_ms=5000)
+    assert resolve_provider(a, model="m") is resolve_provider(b, model="m")
+
+
+def test_explicit_provider_id():
+    rc = RuntimeConfig(type="url", endpoint="http://10.0.0.5:11434", provider="ollama")
+    assert resolve_provider(rc, model="m").id == "ollama"
+
+
+def test_register_custom_provider():
+    built = []
+
+    def factory(runtime, model):
+        built.append(runtime)
+        return type("P", (), {"id": "custom"})()
+
+    register_provider("custom", factory)
+    rc = RuntimeConfig(type="url", endpoint="http://x", provider="custom")
+    assert resolve_provider(rc, model="m").id == "custom"
+    assert resolve_provider(rc, model="m").id == "custom"
+    assert len(built) == 1
+
+
+def test_unknown_provider_loads_entry_point(monkeypatch):
+    class EntryPoint:
+        name = "from-plugin"
+
+        def load(self):
+            return lambda runtime, model: type("P", (), {"id": "from-plugin"})()
+
+    monkeypatch.setattr(registry, "entry_points", lambda group: [EntryPoint()])
+    rc = RuntimeConfig(type="url", endpoint="http://x", provider="from-plugin")
+    assert resolve_provider(rc, model="m").id == "from-plugin"
+
+    with pytest.raises(NotImplementedError):
+        resolve_provider(
+            RuntimeConfig(type="url", endpoint="http://x", provider="missing"), "m"
+        )
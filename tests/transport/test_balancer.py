@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from src.errors import TransportError
+from src.providers.generic_url import GenericURLProvider
+from src.transport.balancer import EndpointPool
+from src.types import BalancerConfig, InternalRequest, Message
+
+HEDGE = BalancerConfig(hedge=True, hedge_min_samples=5, hedge_percentile=0.5)
+
+
+def warm(pool, kind="generate", seconds=0.01):
+    for replica in pool._replicas:
+        for _ in range(5):
+            pool._record(replica, kind, seconds)
+
+
+def test_least_outstanding_spreads_concurrent_calls():
+    pool = EndpointPool(["a", "b", "c"])
+    release = threading.Event()
+    seen = []
+
+    def attempt(endpoint):
+        seen.append(endpoint)
+        release.wait(1)
+        return endpoint
+
+    threads = [threading.Thread(target=pool.call, args=(attempt,)) for _ in range(3)]
+    for t in threads:
+        t.start()
+    while len(seen) < 3:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert sorted(seen) == ["a", "b", "c"]
+    assert all(r["outstanding"] == 0 for r in pool.stats()["replicas"])
+
+
+def test_failing_replica_is_ejected():
+    pool = EndpointPool(["bad", "good"], BalancerConfig(eject_after_failures=2))
+
+    def attempt(endpoint):
+        if endpoint == "bad":
+            raise TransportError("down")
+        return endpoint
+
+    results = []
+    for _ in range(6):
+        try:
+            results.append(pool.call(attempt))
+        except TransportError:
+            results.append("error")
+
+    assert results.count("error") == 2
+    assert results[-3:] == ["good"] * 3
+    assert pool.stats()["replicas"][0]["ejected"]
+
+
+def test_client_errors_do_not_eject_replicas():
+    pool = EndpointPool(["a", "b"], BalancerConfig(eject_after_failures=2))
+
+    def attempt(endpoint):
+        raise TransportError("bad request", status_code=400)
+
+    for _ in range(6):
+        with pytest.raises(TransportError):
+            pool.call(attempt)
+
+    assert not any(r["ejected"] for r in pool.stats()["replicas"])
+    assert all(r["failures"] == 0 for r in pool.stats()["replicas"])
+
+
+def test_hedge_returns_fast_replica():
+    pool = EndpointPool(["slow", "fast"], HEDGE)
+    warm(pool)
+
+    def attempt(endpoint):
+        if endpoint == "slow":
+            time.sleep(0.5)
+        return endpoint
+
+    start = time.monotonic()
+    assert pool.call(attempt) == "fast"
+    assert time.monotonic() - start < 0.4
+    assert pool.stats()["hedges"] == 1
+
+
+def test_hedged_stream_closes_loser():
+    pool = EndpointPool(["slow", "fast"], HEDGE)
+    warm(pool, "stream")
+    closed = []
+
+    def attempt(endpoint):
+        try:
+            if endpoint == "slow":
+                time.sleep(0.3)
+            yield endpoint
+            yield "end"
+        finally:
+            closed.append(endpoint)
+
+    assert list(pool.stream(attempt)) == ["fast", "end"]
+    time.sleep(0.4)
+    assert sorted(closed) == ["fast", "slow"]
+    assert all(r["outstanding"] == 0 for r in pool.stats()["replicas"])
+
+
+def test_async_hedge_cancels_slow_replica():
+    pool = EndpointPool(["slow", "fast"], HEDGE)
+    warm(pool)
+    cancelled = []
+
+    async def attempt(endpoint):
+        if endpoint == "slow":
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(endpoint)
+                raise
+        return endpoint
+
+    assert asyncio.run(pool.acall(attempt)) == "fast"
+    assert cancelled == ["slow"]
+    assert all(r["outstanding"] == 0 for r in pool.stats()["replicas"])
+
+
+def test_provider_balances_across_endpoints(monkeypatch):
+    hosts = []
+
+    def handler(request):
+        hosts.append(request.url.host)
+        return httpx.Response(200, json={"output": request.url.host})
+
+    transport = httpx.MockTransport(handler)
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+    endpoints = ["http://a:8000/gen", "http://b:8000/gen"]
+    provider = GenericURLProvider(
+        id="generic-url", endpoint=endpoints[0], endpoints=endpoints
+    )
+    req = InternalRequest(model="m", messages=[Message(role="user", content="hi")])
+    outputs = {provider.generate(req).output for _ in range(4)}
+
+    assert outputs == {"a", "b"}
+    assert hosts.count("a") >= 1 and hosts.count("b") >= 1
+
+
+def test_pool_requires_endpoints():
+    with pytest.raises(ValueError):
+        EndpointPool([])
@@ -0,0 +1,84 @@
+import json
+import httpx
+import src.transport.codec as codec
+from src.conversation import Conversation
+from src.transport.codec import encode_request, loads
+from src.transport.http import HTTPTransport
+from src.types import Message
+
+
+def test_encode_request_matches_stdlib():
+    messages = [
+        Message(role="system", content="be brief"),
+        Message(role="user", content='quote " and ünïcode ✓\n'),
+    ]
+    body = encode_request("m", messages, stream=True)
+
+    assert json.loads(body) == {
+        "model": "m",
+        "messages": [{"role": m.role, "content": m.content} for m in messages],
+        "stream": True,
+    }
+    assert loads(body) == json.loads(body)
+
+
+def test_short_messages_are_encoded_once():
+    codec._encode_cached.cache_clear()
+    history = [Message(role="user", content=str(i)) for i in range(10)]
+    for turn in range(1, 11):
+        encode_request("m", history[:turn])
+
+    info = codec._encode_cached.cache_info()
+    assert info.misses == 10
+    assert info.hits == sum(range(10))
+
+
+def test_long_messages_are_not_kept_by_the_cache():
+    codec._encode_cached.cache_clear()
+    document = Message(role="user", content="x" * (codec.CACHE_MAX_CHARS + 1))
+    encode_request("m", [document])
+    assert codec._encode_cached.cache_info().currsize == 0
+
+
+def test_conversation_keeps_its_encodings(monkeypatch):
+    encoded = []
+    real = codec._encode
+
+    def counting(message):
+        encoded.append(message)
+        return real(message)
+
+    monkeypatch.setattr(codec, "_encode", counting)
+    document = "x" * (codec.CACHE_MAX_CHARS * 10)
+    conv = Conversation([Message(role="user", content=document)])
+    for turn in range(5):
+        body = encode_request("m", conv)
+        conv = conv.append(Message(role="assistant", content=str(turn)))
+
+    # Each message is encoded once, however many turns re-send it
+    assert len(encoded) == 5
+    assert json.loads(body)["messages"][0]["content"] == document
+
+
+def test_pre_encoded_body_is_sent_verbatim(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append((request.headers["content-type"], request.content))
+        return httpx.Response(200, content=b'{"output":"ok"}')
+
+    transport = httpx.MockTransport(handler)
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+    body = b'{"model":"m","messages":[]}'
+    with HTTPTransport() as t:
+        assert t.post_json("http://example.com", content=body) == {"output": "ok"}
+        t.post_json("http://example.com", json={"a": 1})
+
+    assert seen[0] == ("application/json", body)
+    assert json.loads(seen[1][1]) == {"a": 1}
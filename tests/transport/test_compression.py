@@ -0,0 +1,133 @@
+import gzip
+import json
+import threading
+import zlib
+
+import httpx
+import pytest
+
+from src.core.generate import generate
+from src.core.stream import stream
+from src.providers.generic_url import GenericURLProvider
+from src.transport.compression import RequestCompressor
+from src.types import (
+    CompressionConfig,
+    GenerateRequest,
+    InternalRequest,
+    Message,
+    RuntimeConfig,
+)
+
+
+def mock_client(monkeypatch, handler):
+    transport = httpx.MockTransport(handler)
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+
+def request(content):
+    return InternalRequest(model="m", messages=[Message(role="user", content=content)])
+
+
+def test_small_bodies_are_sent_uncompressed():
+    compress = RequestCompressor(CompressionConfig(min_bytes=100))
+    body, headers, stats = compress(b"{}", {"X-Key": "k"})
+    assert (body, headers, stats) == (b"{}", {"X-Key": "k"}, None)
+
+
+def test_large_prompt_is_gzipped_and_reported(monkeypatch):
+    seen = []
+
+    def handler(req):
+        seen.append(req.headers)
+        body = json.loads(gzip.decompress(req.content))
+        return httpx.Response(200, json={"output": body["messages"][0]["content"][:5]})
+
+    mock_client(monkeypatch, handler)
+    provider = GenericURLProvider(
+        id="g",
+        endpoint="http://h/gen",
+        compression=CompressionConfig(min_bytes=1024, accept_encoding="gzip"),
+    )
+    res = provider.generate(request("context " * 5000))
+
+    assert res.output == "conte"
+    assert seen[0]["content-encoding"] == "gzip"
+    assert seen[0]["accept-encoding"] == "gzip"
+    stats = res.metadata["compression"]
+    assert stats["encoding"] == "gzip"
+    assert stats["compressed_bytes"] < stats["original_bytes"]
+    assert stats["ratio"] > 10 and stats["seconds"] >= 0
+
+
+def test_zstd_compression(monkeypatch):
+    zstandard = pytest.importorskip("zstandard")
+
+    def handler(req):
+        assert req.headers["content-encoding"] == "zstd"
+        body = json.loads(
+            zstandard.ZstdDecompressor().decompressobj().decompress(req.content)
+        )
+        return httpx.Response(200, json={"output": body["model"]})
+
+    mock_client(monkeypatch, handler)
+    provider = GenericURLProvider(
+        id="g",
+        endpoint="http://h/gen",
+        compression=CompressionConfig(algorithm="zstd", min_bytes=0),
+    )
+    assert provider.generate(request("hi")).output == "m"
+
+
+def test_compressed_stream_is_decoded_incrementally(monkeypatch):
+    first_token_seen = threading.Event()
+
+    def body():
+        gz = zlib.compressobj(wbits=31)
+        yield gz.compress(b"hello\n") + gz.flush(zlib.Z_SYNC_FLUSH)
+        # The rest is only sent once the first token reached the caller
+        assert first_token_seen.wait(2)
+        yield gz.compress(b"world\n") + gz.flush()
+
+    def handler(req):
+        return httpx.Response(200, headers={"Content-Encoding": "gzip"}, content=body())
+
+    mock_client(monkeypatch, handler)
+    rc = RuntimeConfig(
+        type="url",
+        endpoint="http://h/stream",
+        compression=CompressionConfig(accept_encoding="gzip"),
+    )
+    tokens = []
+    for chunk in stream(
+        GenerateRequest(
+            model="m", messages=[Message(role="user", content="x")], runtime=rc
+        )
+    ):
+        if chunk.type == "token":
+            tokens.append(chunk.value)
+            first_token_seen.set()
+    assert tokens == ["hello", "world"]
+
+
+def test_runtime_config_enables_compression(monkeypatch):
+    seen = []
+
+    def handler(req):
+        seen.append(req.headers.get("content-encoding"))
+        return httpx.Response(200, json={"output": "ok"})
+
+    mock_client(monkeypatch, handler)
+    rc = RuntimeConfig(
+        type="url",
+        endpoint="http://h/gen",
+        compression=CompressionConfig(min_bytes=10),
+    )
+    msgs = [Message(role="user", content="a long enough prompt")]
+    res = generate(GenerateRequest(model="m", messages=msgs, runtime=rc))
+    assert seen == ["gzip"]
+    assert res.metadata["compression"]["encoding"] == "gzip"
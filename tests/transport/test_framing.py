@@ -0,0 +1,52 @@
+import pytest
+from src.transport.framing import SSEEvent, iter_frames
+
+
+def test_lines_across_chunk_boundaries():
+    chunks = [b"hel", b"lo\r\nwor", b"ld\n\nla", b"st"]
+    assert list(iter_frames(chunks, "lines")) == ["hello", "world", "", "last"]
+
+
+def test_multibyte_utf8_split_between_chunks():
+    data = "héllo €\n".encode("utf-8")
+    chunks = [data[i : i + 1] for i in range(len(data))]
+    assert list(iter_frames(chunks, "lines")) == ["héllo €"]
+
+
+def test_ndjson_documents_split_across_chunks():
+    chunks = [b'{"a": 1}\n{"b"', b': "\xc3', b'\xa9"}\n\n']
+    assert list(iter_frames(chunks, "ndjson")) == [{"a": 1}, {"b": "é"}]
+
+
+def test_sse_events():
+    body = (
+        b": keep-alive\n\n"
+        b"event: delta\nid: 1\ndata: hel\ndata: lo\n\n"
+        b"data: [DONE]"
+    )
+    chunks = [body[i : i + 7] for i in range(0, len(body), 7)]
+    assert list(iter_frames(chunks, "sse")) == [
+        SSEEvent(data="hel\nlo", event="delta", id="1"),
+        SSEEvent(data="[DONE]", id="1"),
+    ]
+
+
+def test_early_exit_closes_source():
+    closed = []
+
+    def source():
+        try:
+            yield b"a\nb\n"
+            yield b"c\n"
+        finally:
+            closed.append(True)
+
+    frames = iter_frames(source(), "lines")
+    assert next(frames) == "a"
+    frames.close()
+    assert closed == [True]
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        list(iter_frames([b""], "xml"))
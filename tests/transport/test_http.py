@@ -0,0 +1,102 @@
+import socket
+import threading
+import time
+import httpx
+from src.readahead import read_ahead
+from src.providers.generic_url import GenericURLProvider
+from src.providers.ollama import OllamaProvider
+from src.transport.http import HTTPTransport, PoolLimits, get_transport
+from src.types import InternalRequest, Message
+
+
+def make_counting_client(monkeypatch, handler):
+    transport = httpx.MockTransport(handler)
+    created = []
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            created.append(kwargs)
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+    return created
+
+
+def test_transport_reuses_one_client(monkeypatch):
+    created = make_counting_client(
+        monkeypatch, lambda request: httpx.Response(200, json={"output": "ok"})
+    )
+
+    with HTTPTransport(limits=PoolLimits(max_connections=4)) as t:
+        for _ in range(3):
+            assert t.post_json("http://example.com/a", json={}) == {"output": "ok"}
+        assert list(t.post_stream("http://example.com/b", json={})) == [
+            b'{"output":"ok"}'
+        ]
+
+    assert len(created) == 1
+    assert created[0]["limits"].max_connections == 4
+
+
+def test_close_releases_and_reconnects_lazily(monkeypatch):
+    created = make_counting_client(
+        monkeypatch, lambda request: httpx.Response(200, json={})
+    )
+
+    t = HTTPTransport()
+    t.post_json("http://example.com", json={})
+    t.close()
+    t.post_json("http://example.com", json={})
+    t.close()
+
+    assert len(created) == 2
+
+
+def test_providers_share_transport_per_origin(monkeypatch):
+    created = make_counting_client(
+        monkeypatch, lambda request: httpx.Response(200, json={"output": "hi"})
+    )
+
+    generic = GenericURLProvider(id="g", endpoint="http://localhost:11434/v1/chat")
+    ollama = OllamaProvider(endpoint="http://localhost:11434")
+    req = InternalRequest(model="m", messages=[Message(role="user", content="hi")])
+
+    generic.generate(req)
+    ollama.generate(req)
+
+    assert generic.transport is ollama.transport
+    assert get_transport("http://other:8080") is not generic.transport
+    assert len(created) == 1
+
+
+def test_read_ahead_close_drops_a_stalled_response():
+    # A backend that sends one chunk and then goes silent
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    dropped = threading.Event()
+
+    def serve():
+        conn, _ = server.accept()
+        conn.sendall(
+            b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n"
+        )
+        conn.settimeout(5)
+        try:
+            while conn.recv(65536):
+                pass  # the rest of the request
+            dropped.set()
+        except OSError:
+            pass
+        conn.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    port = server.getsockname()[1]
+    with HTTPTransport() as t:
+        it = read_ahead(t.post_stream(f"http://127.0.0.1:{port}/", json={}), 4)
+        assert next(it) == b"hello"
+        start = time.monotonic()
+        it.close()
+        assert dropped.wait(1)
+        assert time.monotonic() - start < 0.5
+    server.close()
@@ -0,0 +1,186 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.core.generate import generate
+from src.core.stream import astream, stream
+from src.errors import ProviderError
+from src.transport.replay import ExchangeLog, close_recordings
+from src.types import (
+    GenerateRequest,
+    GenerationOptions,
+    Message,
+    ReplayConfig,
+    RuntimeConfig,
+)
+
+
+class SlowBody(httpx.SyncByteStream):
+    def __iter__(self):
+        for piece in (b"hel", b"lo\nwor", b"ld\n"):
+            time.sleep(0.03)
+            yield piece
+
+
+def record_backend(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path.endswith("/stream"):
+            return httpx.Response(200, stream=SlowBody())
+        return httpx.Response(200, json={"output": "recorded answer"})
+
+    transport = httpx.MockTransport(handler)
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+    return calls
+
+
+def request(endpoint, runtime, content="hi"):
+    return GenerateRequest(
+        model="m",
+        messages=[Message(role="user", content=content)],
+        runtime=RuntimeConfig(endpoint=endpoint, **runtime),
+    )
+
+
+def tokens(req):
+    return [c.value for c in stream(req) if c.type == "token"]
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    path = str(tmp_path / "traffic.rec")
+    calls = record_backend(monkeypatch)
+    rec = {"type": "url", "record": path}
+    assert generate(request("http://backend/gen", rec)).output == "recorded answer"
+    assert tokens(request("http://backend/stream", rec)) == ["hello", "world"]
+    assert calls == ["/gen", "/stream"]
+    close_recordings()
+    yield path
+    close_recordings()
+
+
+def test_recording_keeps_chunk_boundaries_and_timing(recording):
+    log = ExchangeLog(recording)
+    assert len(log) == 2
+    exchange = next(e for e in log if e.url.endswith("/stream"))
+    assert [bytes(data) for data, _ in exchange.chunks] == [b"hel", b"lo\nwor", b"ld\n"]
+    assert all(delay >= 0.02 for _, delay in exchange.chunks)
+
+
+def test_replay_serves_recording_without_network(recording, monkeypatch):
+    def offline(request):
+        raise AssertionError("replay must not touch the network")
+
+    monkeypatch.setattr(httpx, "Client", lambda *a, **kw: offline(None))
+    fast = {"type": "replay", "replay": ReplayConfig(recording, speed=None)}
+
+    start = time.perf_counter()
+    assert generate(request("http://backend/gen", fast)).output == "recorded answer"
+    assert tokens(request("http://backend/stream", fast)) == ["hello", "world"]
+    assert time.perf_counter() - start < 0.05
+
+
+def test_replay_at_recorded_speed(recording):
+    real_time = {"type": "replay", "replay": ReplayConfig(recording, speed=1.0)}
+    start = time.perf_counter()
+    assert tokens(request("http://backend/stream", real_time)) == ["hello", "world"]
+    assert time.perf_counter() - start >= 0.08
+
+
+def test_replay_speed_must_be_positive():
+    for speed in (0, -1.0):
+        with pytest.raises(ValueError, match="speed"):
+            ReplayConfig("traffic.rec", speed=speed)
+    assert ReplayConfig("traffic.rec", speed=float("inf")).speed == float("inf")
+
+
+def test_async_replay(recording):
+    fast = {"type": "replay", "replay": ReplayConfig(recording, speed=None)}
+
+    async def collect():
+        req = request("http://backend/stream", fast)
+        return [c.value async for c in astream(req) if c.type == "token"]
+
+    assert asyncio.run(collect()) == ["hello", "world"]
+
+
+def test_unrecorded_request_fails(recording):
+    fast = {"type": "replay", "replay": ReplayConfig(recording, speed=None)}
+    with pytest.raises(ProviderError):
+        generate(request("http://backend/gen", fast, content="something else"))
+
+
+def test_truncated_tail_is_ignored(recording):
+    with open(recording, "r+b") as f:
+        size = f.seek(0, 2)
+        f.truncate(size - 2)
+    assert len(ExchangeLog(recording)) == 1
+
+
+class EndlessBody(httpx.SyncByteStream):
+    def __iter__(self):
+        yield b"one\n"
+        yield b"two STOP three\n"
+        while True:
+            yield b"more\n"
+
+
+def test_stream_closed_by_stop_sequence_replays(tmp_path, monkeypatch):
+    path = str(tmp_path / "stop.rec")
+    transport = httpx.MockTransport(lambda r: httpx.Response(200, stream=EndlessBody()))
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+    def stop_request(runtime):
+        return GenerateRequest(
+            model="m",
+            messages=[Message(role="user", content="hi")],
+            options=GenerationOptions(stop=["STOP"]),
+            runtime=RuntimeConfig(endpoint="http://backend/stream", **runtime),
+        )
+
+    recorded = tokens(stop_request({"type": "url", "record": path}))
+    close_recordings()
+
+    (exchange,) = ExchangeLog(path)
+    assert exchange.client_closed
+    assert [bytes(data) for data, _ in exchange.chunks] == [
+        b"one\n",
+        b"two STOP three\n",
+    ]
+
+    fast = {"type": "replay", "replay": ReplayConfig(path, speed=None)}
+    assert tokens(stop_request(fast)) == recorded == ["one", "two "]
+
+
+def test_abandoned_stream_is_recorded_up_to_the_close(tmp_path, monkeypatch):
+    path = str(tmp_path / "early.rec")
+    transport = httpx.MockTransport(lambda r: httpx.Response(200, stream=EndlessBody()))
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+    it = iter(stream(request("http://backend/stream", {"type": "url", "record": path})))
+    assert next(it).value == "one"
+    it.close()
+    close_recordings()
+
+    fast = {"type": "replay", "replay": ReplayConfig(path, speed=None)}
+    # The replay ends where the recording was closed
+    assert tokens(request("http://backend/stream", fast)) == ["one"]
@@ -0,0 +1,153 @@
+import asyncio
+import time
+import httpx
+import pytest
+from src.errors import CircuitOpenError, TransportError
+from src.providers.generic_url import GenericURLProvider
+from src.transport.resilience import (
+    CircuitBreaker,
+    RetryBudget,
+    aretry_call,
+    breaker_stats,
+    configure_breakers,
+    configure_retry_budget,
+    get_retry_budget,
+    retry_call,
+    retry_stream,
+)
+from src.types import InternalRequest, Message, RetryPolicy
+
+FAST = RetryPolicy(max_attempts=3, base_delay_ms=1, max_delay_ms=5)
+REQ = InternalRequest(model="m", messages=[Message(role="user", content="hi")])
+
+
+def mock_client(monkeypatch, handler):
+    transport = httpx.MockTransport(handler)
+
+    class MockClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(transport=transport, *args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", MockClient)
+
+
+def flaky(statuses):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        return httpx.Response(status, json={"output": "ok"})
+
+    return handler, calls
+
+
+def test_generate_retries_transient_status(monkeypatch):
+    handler, calls = flaky([503, 502, 200])
+    mock_client(monkeypatch, handler)
+    provider = GenericURLProvider(id="g", endpoint="http://h/gen", retry=FAST)
+
+    assert provider.generate(REQ).output == "ok"
+    assert len(calls) == 3
+    assert get_retry_budget().stats()["retries"] == 2
+
+
+def test_client_errors_are_not_retried(monkeypatch):
+    handler, calls = flaky([400, 200])
+    mock_client(monkeypatch, handler)
+    provider = GenericURLProvider(id="g", endpoint="http://h/gen", retry=FAST)
+
+    with pytest.raises(TransportError) as exc:
+        provider.generate(REQ)
+    assert exc.value.status_code == 400
+    assert len(calls) == 1
+
+
+def test_stream_retries_before_first_chunk(monkeypatch):
+    handler, calls = flaky([503, 200])
+    mock_client(monkeypatch, handler)
+    provider = GenericURLProvider(id="g", endpoint="http://h/gen", retry=FAST)
+
+    chunks = list(provider.stream(REQ))
+    assert chunks[0].value == '{"output":"ok"}'
+    assert len(calls) == 2
+
+
+def test_stream_is_not_retried_after_first_item():
+    opened = []
+
+    def source():
+        opened.append(1)
+        yield "a"
+        raise TransportError("reset")
+
+    it = retry_stream(source, FAST)
+    assert next(it) == "a"
+    with pytest.raises(TransportError):
+        next(it)
+    assert len(opened) == 1
+
+
+def test_exhausted_budget_stops_retries():
+    configure_retry_budget(RetryBudget(ratio=0, min_per_s=0, capacity=0))
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise TransportError("down", status_code=503)
+
+    with pytest.raises(TransportError):
+        retry_call(fail, FAST)
+    assert len(calls) == 1
+    assert get_retry_budget().stats()["exhausted"] == 1
+
+
+def test_async_retry():
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        if len(calls) < 2:
+            raise TransportError("reset")
+        return "ok"
+
+    assert asyncio.run(aretry_call(attempt, FAST)) == "ok"
+    assert len(calls) == 2
+
+
+def test_breaker_opens_then_probes_recovery():
+    breaker = CircuitBreaker("b", failure_threshold=2, reset_timeout_s=0.05)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record(TransportError("down", status_code=503))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    breaker.allow()  # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()  # only one probe at a time
+    breaker.record(None)
+    assert breaker.state == "closed"
+    assert breaker.stats()["opens"] == 1
+
+
+def test_open_breaker_fails_fast_without_network(monkeypatch):
+    configure_breakers(failure_threshold=2)
+    try:
+        handler, calls = flaky([503])
+        mock_client(monkeypatch, handler)
+        provider = GenericURLProvider(
+            id="g", endpoint="http://down/gen", retry=RetryPolicy(max_attempts=1)
+        )
+        for _ in range(2):
+            with pytest.raises(TransportError):
+                provider.generate(REQ)
+        with pytest.raises(CircuitOpenError):
+            provider.generate(REQ)
+        assert len(calls) == 2
+        assert breaker_stats()["http://down"]["state"] == "open"
+    finally:
+        configure_breakers(failure_threshold=5)